@@ -0,0 +1,268 @@
+# cache_listing.py
+
+# ===============
+# === IMPORTS ===
+# ===============
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from .graph import GraphError, iter_batch_children
+from .logger import connecteLogger
+
+# ==============
+# === LOGGER ===
+# ==============
+logger = connecteLogger(__name__)
+
+# ==================
+# === PARAMÈTRES ===
+# ==================
+FICHIER_CACHE = "listing_cache.db"
+TAILLE_MAX_CACHE = 200 * 1024 * 1024 # Octets (JSON compressé) conservés au maximum
+AGE_MAX_CACHE = 0 # Secondes après lesquelles un listing est redemandé quoi qu'il arrive (0 : toujours redemandé)
+AGE_CACHE_LONG = 7 * 24 * 3600 # Âge maximal quand le cache longue durée est activé (voir compte_photos.py)
+
+def validateur(object):
+    """
+    Construit la version d'un dossier à partir de son objet Graph.
+
+    Graph ne renvoie pas de cTag pour les dossiers : on utilise l'eTag du
+    dossier, qui change quand son contenu change, complété par childCount et
+    par size. La taille d'un dossier est celle de tout son sous-arbre : un
+    ajout, une suppression ou une modification de taille en profondeur la
+    change, ainsi que celle de chaque ancêtre jusqu'à la racine (toujours
+    listée), et la chaîne de listings en cache est donc invalidée.
+
+    Limite : sur OneDrive personnel, l'eTag des ancêtres n'est pas toujours
+    mis à jour par une modification profonde. Celles qui ne changent aucune
+    taille (renommage, déplacement à l'intérieur du sous-arbre, réécriture à
+    taille égale) peuvent rester invisibles jusqu'à l'âge maximal des
+    entrées : c'est pourquoi le cache n'est servi par défaut que si
+    l'utilisateur l'active (voir ListingCache.age_max).
+
+    Args:
+        object (dict): Objet dossier tel que renvoyé dans le listing de son parent
+
+    Returns:
+        str: Version du dossier, None si l'objet ne permet pas de la déterminer
+    """
+    tag = object.get('cTag') or object.get('eTag')
+
+    if not tag or not object.get('folder'):
+        return None
+
+    return f"{tag}|{object.get('folder').get('childCount')}|{object.get('size')}"
+
+class ListingCache:
+    """
+    Cache persistant des listings de dossiers Graph.
+
+    Chaque entrée est indexée par endpoint + $select + $expand et conserve la version du
+    dossier (voir validateur) au moment du listing. Tant que la version vue
+    dans le listing du parent est identique, le listing mis en cache est
+    réutilisé sans requête ni analyse JSON des pages Graph.
+
+    Les versions des enfants venant elles-mêmes de listings en cache, un
+    sous-arbre modifié sans que la version de ses ancêtres change reste servi
+    jusqu'à age_max (voir validateur) : age_max borne donc l'ancienneté des
+    résultats. Par défaut (AGE_MAX_CACHE = 0) les dossiers sont toujours
+    relistés et le cache n'est qu'alimenté ; AGE_CACHE_LONG l'active.
+
+    La taille totale est bornée : les entrées les moins récemment utilisées
+    sont supprimées au-delà de taille_max.
+
+    Attributes:
+        taille_max (int): Taille maximale du cache en octets
+        age_max (float): Âge maximal d'une entrée en secondes
+        hits (int): Listings servis depuis le cache
+        misses (int): Listings absents, périmés ou sans version connue
+        evictions (int): Entrées supprimées pour respecter taille_max
+    """
+    def __init__(self, fichier:str = FICHIER_CACHE, taille_max:int = TAILLE_MAX_CACHE, age_max:float = AGE_MAX_CACHE):
+        """
+        Ouvre (ou crée) la base du cache.
+
+        Args:
+            fichier (str): Chemin du fichier SQLite du cache
+            taille_max (int): Taille maximale du cache en octets
+            age_max (float): Âge maximal d'une entrée en secondes
+        """
+        self.taille_max = taille_max
+        self.age_max = age_max
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self.connexion = sqlite3.connect(fichier, check_same_thread = False, isolation_level = None)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.execute("PRAGMA synchronous=NORMAL")
+        self.connexion.execute("""
+            CREATE TABLE IF NOT EXISTS listing_cache (
+                cle TEXT PRIMARY KEY,
+                version TEXT,
+                contenu BLOB,
+                taille INTEGER,
+                cree REAL,
+                dernier_acces REAL
+            )
+        """)
+        self.connexion.execute("CREATE INDEX IF NOT EXISTS idx_listing_cache_acces ON listing_cache (dernier_acces)")
+        self.taille = self.connexion.execute("SELECT COALESCE(SUM(taille), 0) FROM listing_cache").fetchone()[0]
+
+        logger.info(f"Cache des listings ouvert : {fichier} ({self.taille} octets)")
+
+    @staticmethod
+    def cle(endpoint, select = None, expand = None):
+        """
+        Clé d'une entrée : endpoint + champs demandés + relations incluses.
+        """
+        if isinstance(select, list):
+            select = ','.join(select)
+
+        cle = f"{endpoint.strip('/')}|{select or ''}"
+
+        return f"{cle}|{expand}" if expand else cle
+
+    def get(self, cle:str, version:str, age_max:float = None):
+        """
+        Retourne le listing en cache s'il correspond à la version donnée.
+
+        Args:
+            cle (str): Clé de l'entrée (voir ListingCache.cle)
+            version (str): Version actuelle du dossier, None si inconnue
+            age_max (float): Âge maximal de l'entrée en secondes, None pour celui du cache
+
+        Returns:
+            list: Éléments du dossier, None si absent ou périmé
+        """
+        if age_max is None:
+            age_max = self.age_max
+
+        if not version or age_max <= 0:
+            with self._lock:
+                self.misses += 1
+
+            return None
+
+        with self._lock:
+            ligne = self.connexion.execute("SELECT version, contenu, cree FROM listing_cache WHERE cle = ?", (cle,)).fetchone()
+
+            if not ligne or ligne[0] != version or time.time() - ligne[2] > age_max:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.connexion.execute("UPDATE listing_cache SET dernier_acces = ? WHERE cle = ?", (time.time(), cle))
+
+        return json.loads(zlib.decompress(ligne[1]))
+
+    def put(self, cle:str, version:str, items:list):
+        """
+        Enregistre le listing complet d'un dossier.
+
+        Args:
+            cle (str): Clé de l'entrée (voir ListingCache.cle)
+            version (str): Version du dossier au moment du listing
+            items (list): Éléments du dossier, toutes pages confondues
+        """
+        if not version:
+            return
+
+        contenu = zlib.compress(json.dumps(items, separators = (',', ':')).encode('utf-8'))
+        maintenant = time.time()
+
+        with self._lock:
+            ancienne = self.connexion.execute("SELECT taille FROM listing_cache WHERE cle = ?", (cle,)).fetchone()
+            self.connexion.execute("""
+                INSERT OR REPLACE INTO listing_cache (cle, version, contenu, taille, cree, dernier_acces)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (cle, version, contenu, len(contenu), maintenant, maintenant))
+            self.taille += len(contenu) - (ancienne[0] if ancienne else 0)
+
+            if self.taille > self.taille_max:
+                self._eviction()
+
+    def _eviction(self):
+        """
+        Supprime les entrées les moins récemment utilisées jusqu'à repasser sous 90 % de taille_max.
+        """
+        cible = int(self.taille_max * 0.9)
+
+        for cle, taille in self.connexion.execute("SELECT cle, taille FROM listing_cache ORDER BY dernier_acces").fetchall():
+            if self.taille <= cible:
+                break
+
+            self.connexion.execute("DELETE FROM listing_cache WHERE cle = ?", (cle,))
+            self.taille -= taille
+            self.evictions += 1
+
+        logger.debug(f"Éviction du cache des listings : {self.taille} octets restants")
+
+    def stats(self):
+        """
+        Retourne les compteurs du cache (hits, misses, évictions, taille, taux de hit).
+        """
+        with self._lock:
+            total = self.hits + self.misses
+
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'taille': self.taille,
+                'taux_hit': self.hits / total if total else 0.0
+            }
+
+cache_listing = ListingCache()
+
+def iter_batch_children_cache(folder_ids, token, select = None, top = None, versions = None, expand = None, cache = cache_listing, age_max = None):
+    """
+    Variante de iter_batch_children qui sert depuis le cache les dossiers inchangés.
+
+    Seuls les dossiers absents du cache ou dont la version a changé partent en
+    $batch ; leurs listings complets sont ensuite mis en cache.
+
+    Args:
+        folder_ids (list): IDs des dossiers à lister
+        token (str): Token d'accès Microsoft Graph
+        select (list|str): Champs demandés ($select)
+        top (int): Taille de page demandée ($top)
+        versions (dict): ID de dossier -> version vue dans le listing du parent
+        expand (str): Relations incluses dans la réponse ($expand)
+        cache (ListingCache): Cache utilisé
+        age_max (float): Âge maximal des listings servis en secondes, None pour celui du cache
+
+    Yields:
+        tuple: (folder_id, éléments) comme iter_batch_children, les éléments
+               mis en cache étant déjà sous forme de liste
+    """
+    versions = versions or {}
+    a_lister = []
+
+    for folder_id in folder_ids:
+        items = cache.get(cache.cle(f"me/drive/items/{folder_id}/children", select, expand), versions.get(folder_id), age_max)
+
+        if items is None:
+            a_lister.append(folder_id)
+
+        else:
+            yield folder_id, items
+
+    for folder_id, items in iter_batch_children(a_lister, token, select, top, expand):
+        if items is not None and versions.get(folder_id):
+            try:
+                items = list(items)
+
+            except GraphError as e:
+                # Listing incomplet : rien n'est mis en cache pour ce dossier
+                logger.error(f"Listing incomplet du dossier {folder_id}: {e}")
+                items = None
+
+            else:
+                cache.put(cache.cle(f"me/drive/items/{folder_id}/children", select, expand), versions[folder_id], items)
+
+        yield folder_id, items
@@ -0,0 +1,286 @@
+# cache_miniatures.py
+
+# ===============
+# === IMPORTS ===
+# ===============
+import mmap
+import os
+import sqlite3
+import threading
+import time
+
+from .logger import connecteLogger
+
+# ==============
+# === LOGGER ===
+# ==============
+logger = connecteLogger(__name__)
+
+# ==================
+# === PARAMÈTRES ===
+# ==================
+DOSSIER_MINIATURES = "miniatures_cache"
+FICHIER_PACK = "miniatures.pack" # Contenu des miniatures, écrit uniquement en fin de fichier
+FICHIER_INDEX = "miniatures.db" # Index : (ID, rendu) -> position dans le pack
+TAILLE_MAX_MINIATURES = 500 * 1024 * 1024 # Octets de miniatures vivantes conservés au maximum
+SEUIL_COMPACTAGE = 0.5 # Part d'octets morts du pack au-delà de laquelle il est réécrit
+
+class CacheMiniatures:
+    """
+    Cache persistant des miniatures OneDrive sous forme de packfile.
+
+    Les miniatures sont ajoutées à la fin d'un unique fichier pack, lu via mmap ;
+    un index SQLite associe (ID, rendu) à la position, la taille et le cTag du
+    fichier au moment du téléchargement. Une entrée dont le cTag ne correspond
+    plus est ignorée puis remplacée.
+
+    Le volume des entrées vivantes est borné par taille_max : les moins
+    récemment utilisées sortent de l'index, et le pack est réécrit sans les
+    octets morts quand ceux-ci dépassent SEUIL_COMPACTAGE.
+
+    Attributes:
+        dossier (str): Dossier contenant le pack et son index
+        taille_max (int): Octets vivants conservés au maximum
+        hits (int): Miniatures servies depuis le cache
+        misses (int): Miniatures absentes ou périmées
+        evictions (int): Entrées retirées pour respecter taille_max
+    """
+    def __init__(self, dossier:str = DOSSIER_MINIATURES, taille_max:int = TAILLE_MAX_MINIATURES):
+        """
+        Ouvre (ou crée) le pack et son index.
+
+        Args:
+            dossier (str): Dossier du cache
+            taille_max (int): Octets vivants conservés au maximum
+        """
+        self.dossier = dossier
+        self.taille_max = taille_max
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(dossier, exist_ok = True)
+        self.chemin_pack = os.path.join(dossier, FICHIER_PACK)
+
+        self._lock = threading.RLock()
+        self._pack = open(self.chemin_pack, "ab+")
+        self._map = None
+
+        self.connexion = sqlite3.connect(os.path.join(dossier, FICHIER_INDEX), check_same_thread = False, isolation_level = None)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.execute("""
+            CREATE TABLE IF NOT EXISTS miniatures (
+                id TEXT,
+                rendu TEXT,
+                ctag TEXT,
+                position INTEGER,
+                taille INTEGER,
+                dernier_acces REAL,
+                PRIMARY KEY (id, rendu)
+            )
+        """)
+        self.connexion.execute("CREATE INDEX IF NOT EXISTS idx_miniatures_acces ON miniatures (dernier_acces)")
+
+        self.taille = self.connexion.execute("SELECT COALESCE(SUM(taille), 0) FROM miniatures").fetchone()[0]
+        self.taille_pack = os.path.getsize(self.chemin_pack)
+
+        logger.info(f"Cache des miniatures ouvert : {self.taille} octets vivants, pack de {self.taille_pack} octets")
+
+    def _lire(self, position, taille):
+        """
+        Lit une miniature dans le pack via mmap, en remappant si le pack a grandi.
+        """
+        if self._map is None or position + taille > len(self._map):
+            if self._map is not None:
+                self._map.close()
+
+            self._pack.flush()
+            self._map = mmap.mmap(self._pack.fileno(), 0, access = mmap.ACCESS_READ)
+
+        return self._map[position:position + taille]
+
+    def get(self, id:str, rendu:str, ctag:str = None):
+        """
+        Retourne une miniature du cache.
+
+        Args:
+            id (str): ID OneDrive du fichier
+            rendu (str): Rendu de la miniature (small, large...)
+            ctag (str): cTag actuel du fichier, None pour accepter la version en cache
+
+        Returns:
+            bytes: Contenu de la miniature, None si absente ou périmée
+        """
+        with self._lock:
+            ligne = self.connexion.execute("SELECT ctag, position, taille FROM miniatures WHERE id = ? AND rendu = ?", (id, rendu)).fetchone()
+
+            if not ligne or (ctag and ligne[0] != ctag):
+                self.misses += 1
+                return None
+
+            try:
+                data = self._lire(ligne[1], ligne[2])
+
+            except (OSError, ValueError) as e:
+                logger.error(f"Lecture impossible dans le pack des miniatures: {e}")
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.connexion.execute("UPDATE miniatures SET dernier_acces = ? WHERE id = ? AND rendu = ?", (time.time(), id, rendu))
+
+        return data
+
+    def put(self, id:str, rendu:str, ctag:str, data:bytes):
+        """
+        Ajoute une miniature à la fin du pack et l'indexe.
+
+        Args:
+            id (str): ID OneDrive du fichier
+            rendu (str): Rendu de la miniature
+            ctag (str): cTag du fichier au moment du téléchargement
+            data (bytes): Contenu de la miniature
+        """
+        if not data:
+            return
+
+        with self._lock:
+            self._pack.seek(0, os.SEEK_END)
+            position = self._pack.tell()
+            self._pack.write(data)
+            self._pack.flush()
+            self.taille_pack = position + len(data)
+
+            ancienne = self.connexion.execute("SELECT taille FROM miniatures WHERE id = ? AND rendu = ?", (id, rendu)).fetchone()
+            self.connexion.execute("""
+                INSERT OR REPLACE INTO miniatures (id, rendu, ctag, position, taille, dernier_acces)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (id, rendu, ctag, position, len(data), time.time()))
+            self.taille += len(data) - (ancienne[0] if ancienne else 0)
+
+            if self.taille > self.taille_max:
+                self._eviction()
+
+    def _eviction(self):
+        """
+        Retire les entrées les moins récemment utilisées jusqu'à repasser sous 90 % de taille_max.
+        """
+        cible = int(self.taille_max * 0.9)
+
+        for id, rendu, taille in self.connexion.execute("SELECT id, rendu, taille FROM miniatures ORDER BY dernier_acces").fetchall():
+            if self.taille <= cible:
+                break
+
+            self.connexion.execute("DELETE FROM miniatures WHERE id = ? AND rendu = ?", (id, rendu))
+            self.taille -= taille
+            self.evictions += 1
+
+        logger.debug(f"Éviction du cache des miniatures : {self.taille} octets vivants")
+        self._compactage_si_utile()
+
+    def supprimer(self, id:str):
+        """
+        Retire toutes les miniatures d'un fichier supprimé.
+
+        Args:
+            id (str): ID OneDrive du fichier
+        """
+        with self._lock:
+            taille = self.connexion.execute("SELECT COALESCE(SUM(taille), 0) FROM miniatures WHERE id = ?", (id,)).fetchone()[0]
+            self.connexion.execute("DELETE FROM miniatures WHERE id = ?", (id,))
+            self.taille -= taille
+
+    def gc(self, ids_vivants):
+        """
+        Retire les miniatures des fichiers qui ne sont plus dans le catalogue.
+
+        Args:
+            ids_vivants (iterable): IDs des fichiers encore présents
+        """
+        ids_vivants = set(ids_vivants)
+
+        with self._lock:
+            morts = [id for (id,) in self.connexion.execute("SELECT DISTINCT id FROM miniatures").fetchall() if id not in ids_vivants]
+
+            for id in morts:
+                self.supprimer(id)
+
+            logger.info(f"Nettoyage du cache des miniatures : {len(morts)} fichiers disparus retirés")
+            self._compactage_si_utile()
+
+    def _compactage_si_utile(self):
+        """
+        Réécrit le pack quand les octets morts dépassent SEUIL_COMPACTAGE.
+        """
+        if self.taille_pack and (self.taille_pack - self.taille) / self.taille_pack > SEUIL_COMPACTAGE:
+            self.compacter()
+
+    def compacter(self):
+        """
+        Réécrit le pack avec les seules entrées vivantes puis met l'index à jour.
+        """
+        with self._lock:
+            lignes = self.connexion.execute("SELECT id, rendu, position, taille FROM miniatures ORDER BY position").fetchall()
+            chemin_tmp = self.chemin_pack + ".tmp"
+            positions = []
+
+            with open(chemin_tmp, "wb") as nouveau:
+                for id, rendu, position, taille in lignes:
+                    positions.append((nouveau.tell(), id, rendu))
+                    nouveau.write(self._lire(position, taille))
+
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+            self._pack.close()
+            os.replace(chemin_tmp, self.chemin_pack)
+            self._pack = open(self.chemin_pack, "ab+")
+
+            self.connexion.execute("BEGIN")
+            self.connexion.executemany("UPDATE miniatures SET position = ? WHERE id = ? AND rendu = ?", positions)
+            self.connexion.execute("COMMIT")
+
+            ancien = self.taille_pack
+            self.taille_pack = os.path.getsize(self.chemin_pack)
+            logger.info(f"Compactage du pack des miniatures : {ancien} -> {self.taille_pack} octets")
+
+    def stats(self):
+        """
+        Retourne les compteurs du cache (hits, misses, évictions, tailles, taux de hit).
+        """
+        with self._lock:
+            total = self.hits + self.misses
+
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'taille': self.taille,
+                'taille_pack': self.taille_pack,
+                'taux_hit': self.hits / total if total else 0.0
+            }
+
+cache_miniatures = CacheMiniatures()
+
+def miniature(id, rendu, telecharger, ctag = None, cache = cache_miniatures):
+    """
+    Lecture d'une miniature à travers le cache : téléchargée puis conservée si absente.
+
+    Args:
+        id (str): ID OneDrive du fichier
+        rendu (str): Rendu de la miniature
+        telecharger (callable): Fonction sans argument renvoyant le contenu, ou None
+        ctag (str): cTag actuel du fichier, None pour accepter la version en cache
+        cache (CacheMiniatures): Cache utilisé
+
+    Returns:
+        bytes: Contenu de la miniature, None si indisponible
+    """
+    data = cache.get(id, rendu, ctag)
+
+    if data is None:
+        data = telecharger()
+        cache.put(id, rendu, ctag, data)
+
+    return data
@@ -0,0 +1,606 @@
+# comparaison.py
+
+# ===============
+# === IMPORTS ===
+# ===============
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy
+
+from .hamming import popcount, groupes_differents, distances
+from .logger import connecteLogger
+
+# ==============
+# === LOGGER ===
+# ==============
+logger = connecteLogger(__name__)
+
+# ==================
+# === PARAMÈTRES ===
+# ==================
+PROCESSUS_COMPARAISON = os.cpu_count() or 1 # Processus de comparaison des paires de la recherche visuelle
+LOTS_EN_VOL = 4 # Lots soumis d'avance par processus, pour qu'aucun n'attende
+
+class Empreintes:
+    """
+    Empreintes des représentants et règles de comparaison de la recherche visuelle.
+
+    Regroupe les matrices de hash (voir hamming.matrice) et les seuils : un
+    objet identique est reconstruit dans chaque processus de comparaison à
+    partir de la mémoire partagée (voir tableaux et assembler).
+
+    Attributes:
+        seuil (int): Distance maximale entre phash
+        bits (int): Nombre de bits des phash
+        phashes (numpy.ndarray): Matrice des phash
+        autres (dict): Algorithme votant -> (matrice, présence, bits)
+        invariant (tuple): (matrice, présence, bits) du hash invariant
+        grossiers (tuple): (phash 64 bits, invariant grossier, présence des deux)
+        seuil_grossier (float): Seuil du premier étage de la cascade (phash 64 bits)
+        seuil_invariant_grossier (float): Seuil du premier étage de la cascade (invariant grossier)
+    """
+    def __init__(self, seuil, bits, phashes, autres, invariant, grossiers, seuil_grossier, seuil_invariant_grossier):
+        self.seuil = seuil
+        self.bits = bits
+        self.phashes = phashes
+        self.autres = autres
+        self.invariant = invariant
+        self.grossiers = grossiers
+        self.seuil_grossier = seuil_grossier
+        self.seuil_invariant_grossier = seuil_invariant_grossier
+
+    def tableaux(self):
+        """
+        Tableaux NumPy des empreintes, par nom (copiés dans la mémoire partagée).
+        """
+        tableaux = {
+            'phashes': self.phashes,
+            'invariant': self.invariant[0],
+            'presence_invariant': self.invariant[1],
+            'grossier': self.grossiers[0],
+            'invariant_grossier': self.grossiers[1],
+            'presence_grossiers': self.grossiers[2]
+        }
+
+        for algo, (hashes, presence, _) in self.autres.items():
+            tableaux[algo] = hashes
+            tableaux[f"presence_{algo}"] = presence
+
+        return tableaux
+
+    def parametres(self):
+        """
+        Valeurs scalaires des empreintes (transmises aux processus avec chaque lot).
+        """
+        return {
+            'seuil': self.seuil,
+            'bits': self.bits,
+            'bits_autres': {algo: bits for algo, (_, _, bits) in self.autres.items()},
+            'bits_invariant': self.invariant[2],
+            'seuil_grossier': self.seuil_grossier,
+            'seuil_invariant_grossier': self.seuil_invariant_grossier
+        }
+
+    @classmethod
+    def assembler(cls, parametres:dict, tableaux:dict):
+        """
+        Reconstruit des empreintes à partir de parametres() et tableaux().
+        """
+        return cls(
+            parametres['seuil'],
+            parametres['bits'],
+            tableaux['phashes'],
+            {algo: (tableaux[algo], tableaux[f"presence_{algo}"], bits) for algo, bits in parametres['bits_autres'].items()},
+            (tableaux['invariant'], tableaux['presence_invariant'], parametres['bits_invariant']),
+            (tableaux['grossier'], tableaux['invariant_grossier'], tableaux['presence_grossiers']),
+            parametres['seuil_grossier'],
+            parametres['seuil_invariant_grossier']
+        )
+
+    def au_seuil(self, seuil):
+        """
+        Mêmes empreintes avec un autre seuil de distance entre phash.
+        """
+        return Empreintes(seuil, self.bits, self.phashes, self.autres, self.invariant, self.grossiers,
+                          self.seuil_grossier, self.seuil_invariant_grossier)
+
+    def comparer_lot(self, ii, jj, cascade:bool = False, graphe:bool = False):
+        """
+        Compare un lot de paires : une tuile (voir tuiles) ou des candidats d'un index.
+
+        Seules les paires i < j sont considérées ; en cascade, seules celles
+        retenues par les hash 64 bits passent par la comparaison complète.
+
+        Args:
+            ii, jj (numpy.ndarray): Indices des représentants de chaque paire, ou colonne
+                                    et ligne d'une tuile
+            cascade (bool): Écarte d'abord les paires dont les hash 64 bits sont trop éloignés
+            graphe (bool): Renvoie les arêtes du graphe des distances (voir aretes)
+
+        Returns:
+            tuple: (paires similaires (voir comparer) ou arêtes, nombre de paires comparées en 256 bits)
+        """
+        garde = ii < jj
+
+        if cascade:
+            # Seules les paires survivantes, sous forme de listes d'indices
+            garde &= self.survivants(ii, jj)
+            ii, jj = numpy.broadcast_arrays(ii, jj)
+            ii, jj, garde = ii[garde], jj[garde], None
+
+        completes = len(ii) if garde is None else int(garde.sum())
+
+        return (self.aretes if graphe else self.comparer)(ii, jj, garde), completes
+
+    def survivants(self, ii, jj):
+        """
+        Premier étage de la cascade : paires qui méritent la comparaison complète.
+
+        Une image sans hash grossier (calculée avant leur ajout) passe toujours.
+
+        Args:
+            ii, jj (numpy.ndarray): Indices des représentants de chaque paire, ou colonne
+                                    et ligne d'une tuile (voir tuiles)
+
+        Returns:
+            numpy.ndarray: Masque des paires conservées
+        """
+        grossier, invariant_grossier, presence = self.grossiers
+
+        return (~(presence[ii] & presence[jj])
+                | (distances(grossier, grossier, ii, jj) <= self.seuil_grossier)
+                | (distances(invariant_grossier, invariant_grossier, ii, jj) <= self.seuil_invariant_grossier))
+
+    def mesurer(self, ii, jj):
+        """
+        Distances de Hamming de chaque empreinte pour un lot de paires.
+
+        Args:
+            ii, jj (numpy.ndarray): Indices des représentants de chaque paire, ou colonne
+                                    et ligne d'une tuile (voir tuiles)
+
+        Returns:
+            tuple: (distances des phash, {algorithme votant: (distances, présence dans les
+                   deux images, bits)}, (distances, présence, bits) du hash invariant)
+        """
+        distance = distances(self.phashes, self.phashes, ii, jj)
+        autres = {
+            algo: (distances(hashes, hashes, ii, jj), presence[ii] & presence[jj], bits)
+            for algo, (hashes, presence, bits) in self.autres.items()
+        }
+        invariants, presence_invariant, bits_invariant = self.invariant
+
+        return distance, autres, (distances(invariants, invariants, ii, jj), presence_invariant[ii] & presence_invariant[jj], bits_invariant)
+
+    def comparer(self, ii, jj, garde = None):
+        """
+        Comparaison complète d'un lot de paires : vote des empreintes et métriques de similarité.
+
+        Args:
+            ii, jj (numpy.ndarray): Indices des représentants de chaque paire, ou colonne
+                                    et ligne d'une tuile (voir tuiles)
+            garde (numpy.ndarray): Masque des paires à considérer (toutes si None)
+
+        Returns:
+            tuple: Tableaux (i, j, distance, similarité, votes, votants, orientation)
+                   des seules paires similaires
+        """
+        # Calcul de la distance de Hamming entre les empreintes de chaque paire
+        distance, autres, invariant = self.mesurer(ii, jj)
+        votes, votants, retenu, orientation = voter(self.seuil, self.bits, distance, autres.values(), invariant)
+
+        similaires = retenu | orientation
+
+        if garde is not None:
+            similaires &= garde
+
+        ii, jj = numpy.broadcast_arrays(ii, jj)
+        ii, jj = ii[similaires], jj[similaires]
+        orientation_similaires = orientation[similaires]
+
+        # Métriques sur le phash, ou sur les hash invariants, seuls comparables, pour les paires rattrapées
+        distance_similaires = distance[similaires]
+        hash_size = numpy.full(len(ii), self.bits)
+        differents = groupes_differents(self.phashes[ii] ^ self.phashes[jj])
+
+        if orientation_similaires.any():
+            invariants, _, bits_invariant = self.invariant
+            xor_orientation = invariants[ii[orientation_similaires]] ^ invariants[jj[orientation_similaires]]
+            distance_similaires[orientation_similaires] = popcount(xor_orientation)
+            hash_size[orientation_similaires] = bits_invariant
+            differents[orientation_similaires] = groupes_differents(xor_orientation)
+
+        return (ii, jj, distance_similaires, similarite(distance_similaires, hash_size, differents),
+                votes[similaires], votants[similaires], orientation_similaires)
+
+    def aretes(self, ii, jj, garde = None):
+        """
+        Arêtes du graphe des distances : paires similaires au seuil, avec leurs distances brutes.
+
+        Le vote est monotone en seuil : une paire retenue à un seuil l'est à
+        tout seuil supérieur. Chaque arête porte donc le seuil minimal qui la
+        retient, et assez de mesures pour refaire le vote à tout seuil plus
+        petit (voir graphe_distances).
+
+        Args:
+            ii, jj (numpy.ndarray): Indices des représentants de chaque paire, ou colonne
+                                    et ligne d'une tuile (voir tuiles)
+            garde (numpy.ndarray): Masque des paires à considérer (toutes si None)
+
+        Returns:
+            tuple: (i, j, seuil minimal, distance et similarité des phash, distance et
+                   similarité des hash invariants, {algorithme votant: distances}),
+                   distances à -1 pour une empreinte absente de l'une des images
+        """
+        distance, autres, invariant = self.mesurer(ii, jj)
+        _, _, retenu, orientation = voter(self.seuil, self.bits, distance, autres.values(), invariant)
+
+        similaires = retenu | orientation
+
+        if garde is not None:
+            similaires &= garde
+
+        ii, jj = numpy.broadcast_arrays(ii, jj)
+        ii, jj = ii[similaires], jj[similaires]
+        distance = distance[similaires]
+        autres = {algo: (distances_algo[similaires], presents[similaires], bits) for algo, (distances_algo, presents, bits) in autres.items()}
+        invariant = (invariant[0][similaires], invariant[1][similaires], invariant[2])
+
+        # Seuil minimal : premier seuil entier auquel le vote retient l'arête
+        seuil_min = numpy.full(len(ii), self.seuil, dtype = numpy.int32)
+        restantes = numpy.ones(len(ii), dtype = bool)
+
+        for seuil in range(int(self.seuil)):
+            if not restantes.any():
+                break
+
+            _, _, retenu, orientation = voter(seuil, self.bits, distance, autres.values(), invariant)
+            nouvelles = restantes & (retenu | orientation)
+            seuil_min[nouvelles] = seuil
+            restantes &= ~nouvelles
+
+        # Métriques des deux hash : l'orientation d'une arête dépend du seuil de la requête
+        invariants, presence_invariant, bits_invariant = invariant
+        xor_invariant = self.invariant[0][ii] ^ self.invariant[0][jj]
+        similarite_phash = similarite(distance, numpy.full(len(ii), self.bits), groupes_differents(self.phashes[ii] ^ self.phashes[jj]))
+        similarite_invariant = similarite(invariants, numpy.full(len(ii), bits_invariant), groupes_differents(xor_invariant))
+
+        return (ii, jj, seuil_min, distance, similarite_phash,
+                numpy.where(presence_invariant, invariants, -1), numpy.where(presence_invariant, similarite_invariant, -1.0),
+                {algo: numpy.where(presents, distances_algo, -1) for algo, (distances_algo, presents, _) in autres.items()})
+
+def voter(seuil, bits:int, distance, autres, invariant):
+    """
+    Vote des empreintes d'un lot de paires, chacune avec le seuil du phash rapporté à sa taille.
+
+    Args:
+        seuil (float): Distance maximale entre phash
+        bits (int): Nombre de bits des phash
+        distance (numpy.ndarray): Distances des phash
+        autres (iterable): (distances, présence dans les deux images, bits) de chaque algorithme votant
+        invariant (tuple): (distances, présence, bits) du hash invariant
+
+    Returns:
+        tuple: Tableaux (votes, votants, retenu par la majorité, rattrapé par le hash invariant)
+    """
+    seuil_relatif = seuil / bits
+    votes = (distance <= seuil).astype(numpy.int32)
+    votants = numpy.ones_like(votes)
+
+    for distances_algo, presents, bits_algo in autres:
+        votes += presents & (distances_algo <= seuil_relatif * bits_algo)
+        votants += presents
+
+    # Majorité des empreintes sous le seuil : c'est un doublon potentiel
+    retenu = votes * 2 > votants
+
+    # Sinon, rattrapage par le hash invariant des paires qui l'ont toutes deux
+    distances_invariant, presents, bits_invariant = invariant
+    orientation = ~retenu & presents & (distances_invariant <= seuil_relatif * bits_invariant)
+
+    return votes, votants, retenu, orientation
+
+def similarite(distance, hash_size, differents):
+    """
+    Similarité globale (%) de paires à partir de la distance de Hamming de leurs hash.
+
+    Args:
+        distance (numpy.ndarray): Distances de Hamming
+        hash_size (numpy.ndarray): Nombre de bits des hash comparés
+        differents (numpy.ndarray): Groupes de 4 bits avec au moins 2 bits différents
+
+    Returns:
+        numpy.ndarray: Similarités en pourcentage
+    """
+    # === CALCUL DE SIMILARITÉ BASE ===
+    # Pourcentage basé sur la distance de Hamming
+    similarite_base = numpy.maximum(0.0, (hash_size - distance.astype(float)) / hash_size * 100.0)
+
+    # === CALCUL DE SIMILARITÉ FINE ===
+    # Part des bits identiques
+    similarite_fine = ((hash_size - distance) / hash_size) * 100.0
+
+    # === CALCUL DE SIMILARITÉ PAR CLUSTERS ===
+    # Groupes de 4 bits similaires si 75% de leurs bits correspondent (au plus 1 bit différent)
+    cluster_size = 4
+    clusters = hash_size // cluster_size
+    similarite_clusters = ((clusters - differents) / clusters) * 100.0
+
+    # === CALCUL DE SIMILARITÉ GLOBALE ===
+    # Moyenne pondérée des trois métriques
+    ponderees = (similarite_clusters != 0) & (similarite_fine != 0) & (similarite_base != 0)
+
+    return numpy.where(ponderees, similarite_base * 0.5 + similarite_fine * 0.3 + similarite_clusters * 0.2, similarite_base)
+
+# Empreintes du processus de comparaison : (segment de mémoire partagée, Empreintes)
+_empreintes_processus = None
+
+def _attacher(description:dict):
+    """
+    Empreintes d'un processus de comparaison, lues dans la mémoire partagée.
+
+    Le segment reste ouvert pour les lots suivants de la même recherche ;
+    celui d'une recherche précédente est fermé.
+    """
+    global _empreintes_processus
+
+    if _empreintes_processus is not None and _empreintes_processus[0].name != description['nom']:
+        memoire = _empreintes_processus[0]
+
+        # Les tableaux pointent dans le segment : ils doivent disparaître avant sa fermeture
+        _empreintes_processus = None
+
+        try:
+            memoire.close()
+
+        except (BufferError, OSError):
+            pass
+
+    if _empreintes_processus is None:
+        memoire = shared_memory.SharedMemory(name = description['nom'])
+        tableaux = {
+            cle: numpy.ndarray(forme, dtype = numpy.dtype(type), buffer = memoire.buf, offset = decalage)
+            for cle, type, forme, decalage in description['tableaux']
+        }
+        _empreintes_processus = (memoire, Empreintes.assembler(description['parametres'], tableaux))
+
+    return _empreintes_processus[1]
+
+def _comparer_memoire(description:dict, ii, jj, cascade:bool, graphe:bool):
+    """
+    Tâche d'un processus de comparaison : compare un lot de paires (voir Empreintes.comparer_lot).
+    """
+    return _attacher(description).comparer_lot(ii, jj, cascade, graphe)
+
+class PoolComparaison:
+    """
+    Pool de processus qui compare les lots de paires de la recherche visuelle hors du GIL.
+
+    Les matrices d'empreintes sont copiées une seule fois dans un segment de
+    mémoire partagée : chaque tâche ne reçoit que le nom du segment et les
+    indices de son lot, et ne renvoie que les paires similaires. Les
+    résultats sont rendus au fil de leur arrivée, dans un ordre quelconque.
+
+    Les processus ne sont lancés qu'à la première recherche. Avec un seul
+    processus, ou si le pool devient inutilisable, les lots sont comparés
+    dans le thread appelant.
+
+    Attributes:
+        processus (int): Nombre de processus de comparaison
+    """
+    def __init__(self, processus:int = PROCESSUS_COMPARAISON):
+        """
+        Args:
+            processus (int): Nombre de processus de comparaison
+        """
+        self.processus = max(1, processus)
+        self._executeur = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        """
+        Retourne le pool de processus, créé au premier appel.
+        """
+        with self._lock:
+            if self._executeur is None:
+                logger.info(f"Démarrage du pool de comparaison : {self.processus} processus")
+                self._executeur = ProcessPoolExecutor(max_workers = self.processus)
+
+            return self._executeur
+
+    def _reinitialiser(self):
+        """
+        Abandonne un pool inutilisable ; le suivant sera créé à la demande.
+        """
+        with self._lock:
+            self._executeur = None
+
+    def comparer(self, empreintes:Empreintes, lots, cascade:bool = False, graphe:bool = False):
+        """
+        Compare des lots de paires dans les processus.
+
+        Args:
+            empreintes (Empreintes): Empreintes des représentants
+            lots (iterable): Lots (ii, jj) de paires (voir Empreintes.comparer_lot)
+            cascade (bool): Écarte d'abord les paires dont les hash 64 bits sont trop éloignés
+            graphe (bool): Renvoie les arêtes du graphe des distances (voir Empreintes.aretes)
+
+        Yields:
+            tuple: Résultat de Empreintes.comparer_lot, un par lot, dans l'ordre d'arrivée
+        """
+        if self.processus == 1:
+            for ii, jj in lots:
+                yield empreintes.comparer_lot(ii, jj, cascade, graphe)
+
+            return
+
+        try:
+            memoire, description = self._partager(empreintes)
+
+        except OSError as e:
+            logger.warning(f"Mémoire partagée indisponible ({e}), paires comparées sur place")
+
+            for ii, jj in lots:
+                yield empreintes.comparer_lot(ii, jj, cascade, graphe)
+
+            return
+
+        en_vol = {} # Futur -> lot
+        restants = iter(lots)
+
+        try:
+            while True:
+                # Quelques lots d'avance par processus, sans matérialiser toutes les tuiles
+                while len(en_vol) < self.processus * LOTS_EN_VOL:
+                    lot = next(restants, None)
+
+                    if lot is None:
+                        break
+
+                    try:
+                        en_vol[self._pool().submit(_comparer_memoire, description, *lot, cascade, graphe)] = lot
+
+                    except (BrokenProcessPool, RuntimeError) as e:
+                        logger.error(f"Pool de comparaison inutilisable ({e}), lot comparé sur place")
+                        self._reinitialiser()
+                        yield empreintes.comparer_lot(*lot, cascade, graphe)
+
+                if not en_vol:
+                    break
+
+                faits, _ = wait(en_vol, return_when = FIRST_COMPLETED)
+
+                for futur in faits:
+                    lot = en_vol.pop(futur)
+
+                    try:
+                        resultat = futur.result()
+
+                    except BrokenProcessPool as e:
+                        logger.error(f"Pool de comparaison inutilisable ({e}), lot comparé sur place")
+                        self._reinitialiser()
+                        resultat = empreintes.comparer_lot(*lot, cascade, graphe)
+
+                    yield resultat
+
+        finally:
+            # Recherche terminée ou abandonnée : les lots non commencés sont annulés
+            for futur in en_vol:
+                futur.cancel()
+
+            self._liberer(memoire)
+
+    @staticmethod
+    def _partager(empreintes:Empreintes):
+        """
+        Copie les tableaux des empreintes dans un segment de mémoire partagée.
+
+        Returns:
+            tuple: (segment, description transmise aux processus)
+        """
+        tableaux = empreintes.tableaux()
+        decalages = []
+        taille = 0
+
+        for cle, tableau in tableaux.items():
+            decalages.append((cle, tableau.dtype.str, tableau.shape, taille))
+            taille += (tableau.nbytes + 7) // 8 * 8
+
+        memoire = shared_memory.SharedMemory(create = True, size = max(1, taille))
+
+        for (cle, type, forme, decalage), tableau in zip(decalages, tableaux.values()):
+            numpy.ndarray(forme, dtype = numpy.dtype(type), buffer = memoire.buf, offset = decalage)[...] = tableau
+
+        return memoire, {'nom': memoire.name, 'parametres': empreintes.parametres(), 'tableaux': decalages}
+
+    @staticmethod
+    def _liberer(memoire):
+        """
+        Ferme et supprime un segment de mémoire partagée.
+        """
+        try:
+            memoire.close()
+            memoire.unlink()
+
+        except (FileNotFoundError, OSError):
+            pass
+
+    def arreter(self):
+        """
+        Arrête les processus de comparaison sans attendre les lots en cours.
+        """
+        with self._lock:
+            if self._executeur is not None:
+                self._executeur.shutdown(wait = False, cancel_futures = True)
+                self._executeur = None
+
+pool_comparaison = PoolComparaison()
+
+def benchmark_processus(n:int = 20000, seuil:int = 20, processus:tuple = None):
+    """
+    Mesure le passage à l'échelle de la force brute avec le nombre de processus.
+
+    Les empreintes sont aléatoires (quasi aucune paire similaire) : seul le
+    coût des comparaisons est mesuré.
+
+    Args:
+        n (int): Nombre d'empreintes
+        seuil (int): Distance maximale entre phash
+        processus (tuple): Nombres de processus testés (par défaut 1, 2, 4... jusqu'au nombre de cœurs)
+
+    Returns:
+        list: Par nombre de processus, durée (s), paires par seconde, accélération et efficacité
+    """
+    from .hamming import mots, tuiles
+
+    if processus is None:
+        processus = tuple(sorted({min(PROCESSUS_COMPARAISON, 1 << puissance) for puissance in range(PROCESSUS_COMPARAISON.bit_length() + 1)}))
+
+    aleatoire = numpy.random.default_rng(0)
+
+    def hashes(bits):
+        valeurs = aleatoire.integers(0, 1 << 64, size = (n, mots(bits)), dtype = numpy.uint64, endpoint = False)
+        valeurs[:, 0] &= numpy.uint64((1 << (64 - (mots(bits) * 64 - bits))) - 1)
+
+        return valeurs
+
+    presence = numpy.ones(n, dtype = bool)
+    empreintes = Empreintes(
+        seuil, 256, hashes(256),
+        {algo: (hashes(bits), presence, bits) for algo, bits in (("dhash", 256), ("whash", 256), ("colorhash", 42))},
+        (hashes(136), presence, 136),
+        (hashes(64), hashes(36), presence),
+        # Seuils de la cascade, inutilisée ici
+        0.0, 0.0
+    )
+
+    resultats = []
+
+    for nombre in processus:
+        pool = PoolComparaison(nombre)
+        debut = time.perf_counter()
+        lots = sum(1 for _ in pool.comparer(empreintes, tuiles(n)))
+        duree = time.perf_counter() - debut
+        pool.arreter()
+
+        resultats.append({
+            'processus': nombre,
+            'lots': lots,
+            'duree_s': duree,
+            'paires_par_s': n * (n - 1) / 2 / duree,
+            'acceleration': resultats[0]['duree_s'] / duree if resultats else 1.0,
+            'efficacite': (resultats[0]['duree_s'] * resultats[0]['processus'] / duree / nombre) if resultats else 1.0
+        })
+
+    return resultats
+
+if __name__ == "__main__":
+    # python -m fonctions.comparaison [empreintes] : 20 000 empreintes aléatoires par défaut
+    for resultat in benchmark_processus(int(sys.argv[1]) if len(sys.argv) > 1 else 20000):
+        print(" | ".join(f"{cle} : {valeur:.3f}" if isinstance(valeur, float) else f"{cle} : {valeur}" for cle, valeur in resultat.items()))
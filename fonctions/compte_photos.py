@@ -6,7 +6,7 @@
 
 # Interface graphique PyQt5
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QGridLayout, QHBoxLayout, QSizePolicy
-from PyQt5.QtCore import Qt, QThread
+from PyQt5.QtCore import Qt, QThread, QTimer
 from PyQt5.QtGui import QPixmap
 
 # Système et utilitaires
@@ -30,7 +30,10 @@ from widgets import *
 from fonctions.graph import *
 from fonctions.logger import connecteLogger
 from fonctions.sql import *
-from fonctions.threads import ParcoursPhotos
+from fonctions.threads import ParcoursPhotos, HachageDiffere, WORKERS_PARCOURS
+from fonctions.parcours_async import ParcoursAsync, ASYNC_DISPONIBLE
+from fonctions.parcours_delta import ParcoursDelta
+from fonctions.cache_listing import AGE_MAX_CACHE, AGE_CACHE_LONG
 
 # ==============
 # === LOGGER ===
@@ -46,6 +49,20 @@ class ComptePhotos(QWidget):
 
         self.type = ["Images", "Videos", "Documents", "Empty Folder"]
 
+        # Modes de parcours disponibles (le mode asynchrone nécessite httpx)
+        self.modes = ["Standard", "Parallèle"]
+
+        if ASYNC_DISPONIBLE:
+            self.modes.append("Asynchrone")
+
+        # Synchronisation delta : seuls les changements depuis le dernier lancement
+        self.modes.append("Incrémental")
+
+        self.mode = self.modes[0]
+
+        # Calcul des hash perceptuels enchaîné à la fin du parcours
+        self.hachage_apres = False
+
             # Textes
         titre = Text("Compte des Photos", style.cssTitre)
         texte_type = Text("Détecter :")
@@ -53,6 +70,9 @@ class ComptePhotos(QWidget):
             # Boutons
         self.bouton_compte = Bouton("Compter mes photos", self.parcours_photos)
         self.bouton_previsualisation = Bouton("Prévisualisation désactivé", self.prev_turn, True, 350, 70, True)
+        self.bouton_mode = Bouton(f"Mode : {self.mode}", self.mode_change, len(self.modes) > 1, 350, 70)
+        self.bouton_cache = Bouton("Cache des listings désactivé", self.cache_turn, True, 350, 70, True)
+        self.bouton_hachage = Bouton("Calculer les hash", self.hachage, compte_phash_queue() > 0, 350, 70)
         self.bouton_pause = Bouton("Pause", self.pause, False)
         self.bouton_continuer = Bouton("Continuer", self.continuer, False)
         self.bouton_stop = Bouton("Stop", self.stop, False)
@@ -104,6 +124,9 @@ class ComptePhotos(QWidget):
         layout_top_row.addWidget(self.bouton_compte)
         layout_top_row.addWidget(spinbox_container)
         layout_top_row.addWidget(self.bouton_previsualisation)
+        layout_top_row.addWidget(self.bouton_mode)
+        layout_top_row.addWidget(self.bouton_cache)
+        layout_top_row.addWidget(self.bouton_hachage)
         top_row_container.setLayout(layout_top_row)
         
         layout_right_buttons.setContentsMargins(10, 10, 10, 10)
@@ -231,7 +254,7 @@ class ComptePhotos(QWidget):
         
         Cette méthode:
         1. Configure l'interface pour le mode "en cours de traitement"
-        2. Vide la base de données existante
+        2. Vide la base de données existante (sauf en mode incrémental)
         3. Lance un thread ParcoursPhotos pour explorer OneDrive
         4. Configure les connexions de signaux pour le retour d'information
         """
@@ -248,6 +271,9 @@ class ComptePhotos(QWidget):
         # Désactivation des contrôles non pertinents pendant le traitement
         self.bouton_compte.set_button(False)           
         self.bouton_previsualisation.set_button(False) 
+        self.bouton_mode.set_button(False)
+        self.bouton_cache.set_button(False)
+        self.bouton_hachage.set_button(False)
         self.parent_interface.bouton_reconnect.set_button(False)        
         self.bouton_type_image.setEnabled(False)
         self.bouton_type_video.setEnabled(False)
@@ -266,12 +292,34 @@ class ComptePhotos(QWidget):
         else:
             logger.info("La prévisualisation des médias est désactivé")
 
-        # Nettoyage de la base de données pour un nouveau parcours
-        delete_sql()
+        # Listings servis depuis le cache seulement si l'utilisateur l'a activé
+        # (voir cache_listing.validateur pour les modifications qui lui échappent)
+        age_cache = AGE_CACHE_LONG if self.bouton_cache.isChecked() else AGE_MAX_CACHE
+
+        # Les images trouvées sont hachées une fois le parcours terminé
+        self.hachage_apres = prev
+
+        # Nettoyage de la base de données pour un nouveau parcours,
+        # le mode incrémental met à jour la base existante
+        if self.mode != "Incrémental":
+            delete_sql()
         
-        # Configuration du thread de parcours
+        # Configuration du thread de parcours selon le mode choisi
         self.thread = QThread()
-        self.worker = ParcoursPhotos(self.token, self.type, prev)
+
+        if self.mode == "Incrémental":
+            self.worker = ParcoursDelta(self.token, self.type, prev)
+
+        elif self.mode == "Asynchrone":
+            self.worker = ParcoursAsync(self.token, self.type, prev, age_cache = age_cache)
+
+        elif self.mode == "Parallèle":
+            self.worker = ParcoursPhotos(self.token, self.type, prev, workers = WORKERS_PARCOURS, age_cache = age_cache)
+
+        else:
+            self.worker = ParcoursPhotos(self.token, self.type, prev, age_cache = age_cache)
+
+        logger.info(f"Mode de parcours : {self.mode}")
         self.worker.moveToThread(self.thread)
 
         # Configuration des connexions de signaux
@@ -286,6 +334,53 @@ class ComptePhotos(QWidget):
         self.thread.started.connect(self.worker.run)
         self.thread.start()
 
+    def hachage(self):
+        """
+        Lance le calcul des hash perceptuels en attente (file phash_queue).
+
+        Appelée à la fin d'un parcours avec prévisualisation, ou via le bouton
+        pour reprendre un calcul interrompu. Pause, reprise et arrêt se font
+        avec les mêmes boutons que le parcours.
+        """
+        self.cleanup_threads()
+
+        logger.info("Démarrage du calcul des hash perceptuels")
+
+        # Activation des contrôles de gestion du processus
+        self.bouton_stop.set_button(True)
+        self.bouton_pause.set_button(True)
+
+        # Désactivation des contrôles non pertinents pendant le traitement
+        self.bouton_compte.set_button(False)
+        self.bouton_previsualisation.set_button(False)
+        self.bouton_mode.set_button(False)
+        self.bouton_cache.set_button(False)
+        self.bouton_hachage.set_button(False)
+        self.parent_interface.bouton_reconnect.set_button(False)
+        self.bouton_type_image.setEnabled(False)
+        self.bouton_type_video.setEnabled(False)
+        self.bouton_type_documents.setEnabled(False)
+        self.bouton_type_empty_folder.setEnabled(False)
+
+        self.affichage.change_text("Calcul des hash perceptuels...")
+
+        # Configuration du thread de calcul
+        self.thread = QThread()
+        self.worker = HachageDiffere(self.token, self.bouton_previsualisation.isChecked())
+        self.worker.moveToThread(self.thread)
+
+        # Configuration des connexions de signaux
+        self.worker.image_ready.connect(self.afficher_preview)    # Prévisualisations
+        self.worker.progression.connect(self.affichage.setText)   # Messages d'état
+        self.worker.finished.connect(self.thread.quit)           # Nettoyage thread
+        self.worker.finished.connect(self.worker.deleteLater)    # Nettoyage worker
+        self.thread.finished.connect(self.thread.deleteLater)    # Nettoyage thread
+        self.worker.finished.connect(self.thread_finished)       # Restauration interface
+
+        # Démarrage du thread
+        self.thread.started.connect(self.worker.run)
+        self.thread.start()
+
     def thread_finished(self):
         """
         Restaure l'état de l'interface à la fin du parcours OneDrive.
@@ -300,6 +395,8 @@ class ComptePhotos(QWidget):
         
         # Réactivation des contrôles principaux
         self.bouton_previsualisation.set_button(True)
+        self.bouton_mode.set_button(len(self.modes) > 1)
+        self.bouton_cache.set_button(True)
         self.bouton_compte.set_button(True)          
         self.parent_interface.bouton_reconnect.set_button(True)       
         self.bouton_type_image.setEnabled(True)
@@ -307,6 +404,17 @@ class ComptePhotos(QWidget):
         self.bouton_type_documents.setEnabled(True)
         self.bouton_type_empty_folder.setEnabled(True)
 
+        # Hash perceptuels restant à calculer (parcours terminé ou calcul interrompu)
+        en_attente = compte_phash_queue() > 0
+        self.bouton_hachage.set_button(en_attente)
+
+        if self.hachage_apres and en_attente:
+            self.hachage_apres = False
+
+            # Le worker du parcours est terminé (deleteLater) : il ne doit pas être arrêté à nouveau
+            self.worker = None
+            QTimer.singleShot(0, self.hachage)
+
     def afficher_preview(self, image_data:bytes):
         """
         Affiche une prévisualisation d'image en temps réel pendant le parcours.
@@ -411,6 +519,9 @@ class ComptePhotos(QWidget):
         3. Réactive tous les contrôles de configuration
         """
         logger.info("Arrêt du parcours demandé par l'utilisateur")
+
+        # Un arrêt ne doit pas enchaîner sur le calcul des hash
+        self.hachage_apres = False
         
         try:
             # Signal d'arrêt au worker
@@ -496,6 +607,34 @@ class ComptePhotos(QWidget):
             self.bouton_previsualisation.setChecked(True)
             self.bouton_previsualisation.setText("Prévisualisation activé")
 
+    def cache_turn(self):
+        """
+        Bascule l'utilisation du cache des listings pour les prochains parcours.
+
+        Désactivé, chaque dossier est relisté. Activé, un dossier dont la
+        version (voir cache_listing.validateur) n'a pas changé est servi depuis
+        le cache pendant AGE_CACHE_LONG au plus : plus rapide, mais une
+        modification profonde qui ne change aucune taille peut être ignorée
+        jusque-là.
+        """
+        logger.info("Changement d'état du cache des listings")
+
+        if not self.bouton_cache.isChecked():
+            self.bouton_cache.setText("Cache des listings désactivé")
+
+        else:
+            self.bouton_cache.setText("Cache des listings activé")
+
+    def mode_change(self):
+        """
+        Passe au mode de parcours suivant (Standard, Parallèle, Asynchrone, Incrémental).
+        """
+        index = (self.modes.index(self.mode) + 1) % len(self.modes)
+        self.mode = self.modes[index]
+        self.bouton_mode.setText(f"Mode : {self.mode}")
+
+        logger.info(f"Changement du mode de parcours : {self.mode}")
+
     def retour_accueil(self):
         """Retourne à la page d'accueil de l'application."""
         logger.info("Retour à l'accueil depuis la page des doublons")
@@ -24,6 +24,8 @@ if sys.stdin is None:
 import style
 from widgets import *
 from fonctions.graph import *
+from fonctions.cache_miniatures import cache_miniatures
+from fonctions.graphe_distances import graphe_distances
 from fonctions.logger import connecteLogger
 from fonctions.sql import *
 from fonctions.threads import *
@@ -33,6 +35,12 @@ from fonctions.threads import *
 # ==============
 logger = connecteLogger(__name__)
 
+# ==================
+# === PARAMÈTRES ===
+# ==================
+TEXTE_SOUS_TITRE = "Avec quelle méthode souhaitez vous trouver les doublons ?" # Sous-titre affiché hors recherche visuelle
+AFFICHAGE_MAX_DOUBLONS = 5000 # Doublons visuels affichés au plus : au-delà, la recherche est arrêtée
+
 # ================
 # === DOUBLONS ===
 # ================
@@ -78,22 +86,30 @@ class Doublons(QWidget):
         self.current_displayed_doublon = 0
         self.doublons_liste = []
         self.is_suppr = False
+        self.visuel_en_cours = False # Recherche visuelle lancée et pas encore terminée
+        self.limite_atteinte = False # Recherche visuelle arrêtée à AFFICHAGE_MAX_DOUBLONS
         logger.debug(f"Doublons initialisé avec parent: {parent is not None}")
         
         # Eléments de la page
             # Textes informatifs
         titre = Text("Gestion des Doublons", style.cssTitre)
-        sous_titre = Text("Avec quelle méthode souhaitez vous trouver les doublons ?", style.cssSousTitre)
+        self.sous_titre = Text(TEXTE_SOUS_TITRE, style.cssSousTitre)
 
             # Boutons de contrôle principal
         self.bouton_hash_nom_taille = Bouton("Nom, taille et hash", self.hash_nom_taille, True, 350)
         self.bouton_visuel = Bouton("Visuel", self.visuel)
+        self.bouton_video = Bouton("Vidéos", self.video)
         self.bouton_empty_folder = Bouton("Dossiers vides", self.empty_folder_view)
         self.bouton_inutile = Bouton("Inutile", self.useless)
         self.bouton_suppression1 = Bouton("Supprimer", None, False)  # Dynamiquement connecté
         self.bouton_suppression2 = Bouton("Supprimer", None, False)  # Dynamiquement connecté
         self.bouton_retour = Bouton("Retour à l'accueil", self.retour_accueil)
 
+            # Contrôle de la recherche visuelle en cours
+        self.bouton_pause_visuel = Bouton("Pause", self.pause_visuel, False, 150)
+        self.bouton_reprendre_visuel = Bouton("Reprendre", self.reprendre_visuel, False, 150)
+        self.bouton_arreter_visuel = Bouton("Arrêter", self.arreter_visuel, False, 150)
+
         self.verif_boutons()
         
             # Boutons de navigation entre doublons
@@ -141,14 +157,27 @@ class Doublons(QWidget):
         suivant_precedent_container = QWidget()
         suivant_precedent_container.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
 
+        controle_visuel_container = QWidget()
+        controle_visuel_container.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+
         # Configuration du layout des boutons de contrôle
         layout_boutons.setContentsMargins(5, 5, 5, 5)
         layout_boutons.setSpacing(5)
         layout_boutons.addWidget(self.bouton_hash_nom_taille)
         layout_boutons.addWidget(self.bouton_visuel)
+        layout_boutons.addWidget(self.bouton_video)
         layout_boutons.addWidget(self.bouton_empty_folder)
         layout_boutons.addWidget(self.bouton_inutile)
         bouton_container.setLayout(layout_boutons)
+
+        # Configuration du layout de contrôle de la recherche visuelle
+        layout_controle_visuel = QHBoxLayout()
+        layout_controle_visuel.setContentsMargins(5, 0, 5, 0)
+        layout_controle_visuel.setSpacing(10)
+        layout_controle_visuel.addWidget(self.bouton_pause_visuel)
+        layout_controle_visuel.addWidget(self.bouton_reprendre_visuel)
+        layout_controle_visuel.addWidget(self.bouton_arreter_visuel)
+        controle_visuel_container.setLayout(layout_controle_visuel)
         
         # Container pour la première image + chemin + bouton suppression
         image1_container = QWidget()
@@ -192,8 +221,9 @@ class Doublons(QWidget):
 
         # Assemblage final de l'interface
         layout_doublons.addWidget(titre, 0, Qt.AlignCenter)
-        layout_doublons.addWidget(sous_titre, 0, Qt.AlignCenter)
+        layout_doublons.addWidget(self.sous_titre, 0, Qt.AlignCenter)
         layout_doublons.addWidget(bouton_container, 0, Qt.AlignCenter)
+        layout_doublons.addWidget(controle_visuel_container, 0, Qt.AlignCenter)
         layout_doublons.addWidget(texte_pixamp_container, 0, Qt.AlignCenter)
         layout_doublons.addWidget(self.bouton_retour, 0, Qt.AlignCenter)
 
@@ -209,11 +239,13 @@ class Doublons(QWidget):
 
         len_db_picture_video = 0
         phash = []
+        videos = []
         len_db_empty_folder = 0
 
         if curseur:
             len_db_picture_video = compte_db(curseur)
             phash = recup_phash(curseur)
+            videos = recup_videos(curseur)
             len_db_empty_folder = compte_db(curseur, db = "empty_folder")
 
             logger.debug(f"len de picture_video: {len_db_picture_video} | len de empty_folder: {len_db_empty_folder} | nombre de phash: {len(phash)}")
@@ -234,6 +266,14 @@ class Doublons(QWidget):
             self.bouton_visuel.set_button(False)
             self.etat_bouton_visuel = False
 
+        if len(videos) > 1:
+            self.bouton_video.set_button(True)
+            self.etat_bouton_video = True
+
+        else:
+            self.bouton_video.set_button(False)
+            self.etat_bouton_video = False
+
         if len_db_empty_folder != 0:
             self.bouton_empty_folder.set_button(True)
             self.etat_bouton_empty_folder = True
@@ -300,16 +340,36 @@ class Doublons(QWidget):
         """
         self.stop_existing_thread('thread_visuel')
 
+        # Doublons par seuil d'après le dernier graphe des distances, pour guider le choix
+        texte = "Choisissez le seuil de similarité (0-100):"
+        resume = graphe_distances.resume()
+
+        if resume:
+            texte += f"\n\nDoublons par seuil (dernière analyse) :\n{resume}"
+
         # Pop-up pour demander le seuil
         seuil, ok = InputDialog.getInt(
             self,
             "Seuil visuel", 
-            "Choisissez le seuil de similarité (0-100):", 
+            texte, 
             20,  # Valeur par défaut
             0, 
             100
         )
         
+        if not ok:  # Utilisateur a annulé
+            return
+
+        # Pop-up pour demander le mode de recherche
+        mode, ok = InputDialog.getItem(
+            self,
+            "Mode de recherche",
+            "Exhaustif : toutes les paires proches en 256 bits, servies par le graphe des distances tant que le catalogue ne change pas\nCascade : tri par hash 64 bits puis 256 bits\nComparaison : toutes les recherches, avec rappel et vitesse",
+            MODES_VISUEL,
+            0,  # Index par défaut (premier élément)
+            False  # Non éditable
+        )
+
         if not ok:  # Utilisateur a annulé
             return
 
@@ -318,6 +378,10 @@ class Doublons(QWidget):
         self.current_number = 0
         self.current_displayed_doublon = 0
         self.doublons_liste =  []
+        self.visuel_en_cours = True
+        self.limite_atteinte = False
+        self.bouton_pause_visuel.set_button(True)
+        self.bouton_arreter_visuel.set_button(True)
 
         # Nettoyage de la liste précédente
         while self.vbox.count():
@@ -327,19 +391,159 @@ class Doublons(QWidget):
 
         # Configuration et lancement du thread de détection visuelle
         self.thread_visuel = QThread()
-        self.worker_visuel = ThreadVisuel(seuil)  # Passage du seuil de similarité
+        self.worker_visuel = ThreadVisuel(seuil, mode)  # Passage du seuil de similarité et du mode
         self.worker_visuel.moveToThread(self.thread_visuel)
 
         # Connexions des signaux
         self.worker_visuel.progression.connect(self.ajouter_layout)
+        self.worker_visuel.lot_doublons.connect(self.ajouter_doublons)
+        self.worker_visuel.avancement.connect(self.afficher_avancement)
+        self.worker_visuel.rapport.connect(self.afficher_rapport)
         self.thread_visuel.started.connect(self.worker_visuel.distance)
         self.worker_visuel.finished.connect(self.thread_visuel.quit)
         self.worker_visuel.finished.connect(self.worker_visuel.deleteLater)
         self.thread_visuel.finished.connect(self.thread_visuel.deleteLater)
-        self.thread_visuel.finished.connect(self.end)
+        self.thread_visuel.finished.connect(self.fin_visuel)
 
         self.thread_visuel.start()
 
+    def video(self):
+        """
+        Lance la détection de vidéos quasi identiques (facette video et miniatures).
+
+        Similaire à visuel() mais utilise ThreadVideo, qui ne compare que les
+        vidéos de même format et de durées proches.
+        """
+        self.stop_existing_thread('thread_video')
+
+        # Pop-up pour demander le seuil
+        seuil, ok = InputDialog.getInt(
+            self,
+            "Seuil vidéo",
+            "Choisissez le seuil de similarité des miniatures (0-100):",
+            20,  # Valeur par défaut
+            0,
+            100
+        )
+
+        if not ok:  # Utilisateur a annulé
+            return
+
+        # Réinitialisation de l'état
+        self.begin()
+        self.current_number = 0
+        self.current_displayed_doublon = 0
+        self.doublons_liste =  []
+
+        # Nettoyage de la liste précédente
+        while self.vbox.count():
+            child = self.vbox.takeAt(0)
+            if child.widget():
+                child.widget().deleteLater()
+
+        # Configuration et lancement du thread de détection vidéo
+        self.thread_video = QThread()
+        self.worker_video = ThreadVideo(seuil)
+        self.worker_video.moveToThread(self.thread_video)
+
+        # Connexions des signaux
+        self.worker_video.progression.connect(self.ajouter_layout)
+        self.thread_video.started.connect(self.worker_video.recherche)
+        self.worker_video.finished.connect(self.thread_video.quit)
+        self.worker_video.finished.connect(self.worker_video.deleteLater)
+        self.thread_video.finished.connect(self.thread_video.deleteLater)
+        self.thread_video.finished.connect(self.end)
+
+        self.thread_video.start()
+
+    def ajouter_doublons(self, lot:list):
+        """
+        Affiche un lot de doublons visuels, puis libère sa place dans le tampon de la recherche.
+
+        Au-delà de AFFICHAGE_MAX_DOUBLONS doublons affichés, plus rien n'est
+        émis et la recherche s'arrête (un graphe des distances en construction
+        est terminé, pour les recherches suivantes) : la page garde ainsi une
+        taille bornée quel que soit le seuil.
+
+        Args:
+            lot (list): Doublons (texte, ids, chemins) émis par ThreadVisuel
+        """
+        for texte, ids, chemins in lot:
+            if len(self.doublons_liste) >= AFFICHAGE_MAX_DOUBLONS:
+                if not self.limite_atteinte:
+                    self.limite_atteinte = True
+                    logger.warning(f"Plus de {AFFICHAGE_MAX_DOUBLONS} doublons visuels, fin de l'affichage")
+                    self.worker_visuel.assez()
+                    self.ajouter_layout(f"Aucun autre doublon affiché : plus de {AFFICHAGE_MAX_DOUBLONS} doublons trouvés.\nChoisissez un seuil plus bas pour affiner les résultats.\n", None, None)
+
+                break
+
+            self.ajouter_layout(texte, ids, chemins)
+
+        self.worker_visuel.lot_affiche()
+
+    def pause_visuel(self):
+        """
+        Met en pause la recherche visuelle en cours ; les doublons déjà affichés restent consultables.
+        """
+        self.worker_visuel.pause_clear()
+        self.bouton_pause_visuel.set_button(False)
+        self.bouton_reprendre_visuel.set_button(True)
+        self.sous_titre.setText("Recherche visuelle en pause")
+
+    def reprendre_visuel(self):
+        """
+        Reprend la recherche visuelle après une pause.
+        """
+        self.worker_visuel.pause_set()
+        self.bouton_pause_visuel.set_button(True)
+        self.bouton_reprendre_visuel.set_button(False)
+
+    def arreter_visuel(self):
+        """
+        Arrête la recherche visuelle en cours ; les doublons déjà affichés sont conservés.
+        """
+        logger.info("Arrêt de la recherche visuelle demandé par l'utilisateur")
+        self.worker_visuel.stop()
+        self.bouton_pause_visuel.set_button(False)
+        self.bouton_reprendre_visuel.set_button(False)
+        self.bouton_arreter_visuel.set_button(False)
+        self.sous_titre.setText("Arrêt de la recherche visuelle...")
+
+    def fin_visuel(self):
+        """
+        Fin de la recherche visuelle, terminée ou arrêtée : réactive les contrôles.
+        """
+        self.visuel_en_cours = False
+        self.bouton_pause_visuel.set_button(False)
+        self.bouton_reprendre_visuel.set_button(False)
+        self.bouton_arreter_visuel.set_button(False)
+        self.end()
+
+    def afficher_avancement(self, faits:int, total:int):
+        """
+        Affiche l'avancement de la recherche visuelle sous le titre.
+
+        Args:
+            faits (int): Lots de paires comparés
+            total (int): Nombre total de lots
+        """
+        if self.bouton_pause_visuel.isEnabled():
+            self.sous_titre.setText(f"Recherche visuelle : {faits} / {total} lots de paires comparés ({faits * 100 // max(1, total)}%)")
+
+    def afficher_rapport(self, texte:str):
+        """
+        Affiche le rapport du mode Comparaison de la recherche visuelle.
+
+        Args:
+            texte (str): Rappel et vitesse de chaque recherche face à la force brute
+        """
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle("Comparaison des recherches")
+        msg_box.setText(texte)
+        msg_box.setIcon(QMessageBox.Information)
+        msg_box.exec_()
+
     def empty_folder_view(self):
         """
         Lance la détection des dossiers vides
@@ -696,6 +900,7 @@ class Doublons(QWidget):
         # Désactivation des boutons de détection
         self.bouton_hash_nom_taille.set_button(False)
         self.bouton_visuel.set_button(False)
+        self.bouton_video.set_button(False)
         self.bouton_empty_folder.set_button(False)
         self.bouton_inutile.set_button(False)
         self.bouton_retour.set_button(False)
@@ -723,20 +928,28 @@ class Doublons(QWidget):
             id1, id2 (str): IDs des fichiers en cours de prévisualisation
             doublon_number (int): Numéro du doublon affiché
         """
-        # Réactivation des boutons principaux
-        if self.etat_bouton_hash_nom_taille:
-            self.bouton_hash_nom_taille.set_button(True)
+        # Prévisualisation pendant la recherche visuelle : les détections restent bloquées jusqu'à sa fin
+        if not self.visuel_en_cours:
+            # Effacement de l'avancement de la recherche visuelle
+            self.sous_titre.setText(TEXTE_SOUS_TITRE)
 
-        if self.etat_bouton_visuel:
-            self.bouton_visuel.set_button(True)
+            # Réactivation des boutons principaux
+            if self.etat_bouton_hash_nom_taille:
+                self.bouton_hash_nom_taille.set_button(True)
 
-        if self.etat_bouton_empty_folder:
-            self.bouton_empty_folder.set_button(True)
+            if self.etat_bouton_visuel:
+                self.bouton_visuel.set_button(True)
 
-        if self.etat_bouton_useless:
-            self.bouton_inutile.set_button(True)
-            
-        self.bouton_retour.set_button(True)
+            if self.etat_bouton_video:
+                self.bouton_video.set_button(True)
+
+            if self.etat_bouton_empty_folder:
+                self.bouton_empty_folder.set_button(True)
+
+            if self.etat_bouton_useless:
+                self.bouton_inutile.set_button(True)
+
+            self.bouton_retour.set_button(True)
 
         # Si on affiche une prévisualisation, activer les contrôles spécifiques
         if prev:
@@ -833,6 +1046,10 @@ class Doublons(QWidget):
         response = call_web_api(endpoint, self.token, None, "delete")
         logger.debug(f"Réponse API suppression: {response}")
 
+        # Les miniatures d'un fichier supprimé ne serviront plus
+        if response in (204, 404):
+            cache_miniatures.supprimer(id)
+
         # Traitement de la réponse
         if response == 204:
             # Suppression réussie
@@ -1,5 +1,15 @@
 # graph.py
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+
 import requests
+from requests.adapters import HTTPAdapter
 
 from .logger import connecteLogger
 
@@ -8,45 +18,442 @@ from .logger import connecteLogger
 # ==============
 logger = connecteLogger(__name__)
 
-def call_web_api(endpoint, token, select = None, request_type = "get"):
+# ==================
+# === PARAMÈTRES ===
+# ==================
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+NOMBRE_WORKERS = 16 # Nombre de connexions keep-alive conservées dans le pool
+TIMEOUT_CONNEXION = 5 # Secondes pour établir la connexion TCP/TLS
+TIMEOUT_LECTURE = 30 # Secondes d'attente maximale entre deux octets reçus
+TAILLE_PAGE = 200 # Nombre d'éléments demandés par page ($top) lors des listings
+TAILLE_BATCH = 20 # Nombre maximal de sous-requêtes acceptées par /$batch
+TENTATIVES_BATCH = 3 # Nombre d'envois d'une sous-requête avant abandon
+TENTATIVES_MAX = 5 # Nouvelles tentatives d'une requête en échec transitoire
+DELAI_BASE = 1.0 # Secondes, premier palier du backoff exponentiel
+DELAI_MAX = 60.0 # Secondes, plafond d'un palier du backoff
+ATTENTE_MAX = 300.0 # Secondes d'attente cumulées au-delà desquelles on abandonne une requête
+STATUTS_TRANSITOIRES = (429, 500, 502, 503, 504)
+STATUTS_SATURATION = (429, 503) # Réponses indiquant que Graph limite notre trafic
+CONCURRENCE_INITIALE = 4 # Requêtes simultanées autorisées au démarrage
+SEUIL_LATENCE = 2.0 # Latence récente / latence de référence au-delà de laquelle on ralentit
+
+class GraphError(Exception):
+    """
+    Erreur levée quand un listing Graph ne peut pas être complété malgré les nouvelles tentatives.
+    """
+
+class DeltaExpire(GraphError):
+    """
+    Erreur levée quand Graph refuse un jeton delta (410 Gone) : une énumération complète est nécessaire.
+    """
+
+class RetryPolicy:
+    """
+    Politique de nouvelles tentatives pour les erreurs transitoires de Graph.
+
+    Les réponses 429/503 avec en-tête Retry-After sont rejouées après le délai
+    demandé par le serveur. Les autres erreurs transitoires (5xx, connexions
+    coupées, timeouts) utilisent un backoff exponentiel avec jitter complet.
+
+    Attributes:
+        tentatives (int): Nombre maximal de nouvelles tentatives par requête
+        delai_base (float): Délai du premier palier de backoff, en secondes
+        delai_max (float): Plafond d'un palier de backoff, en secondes
+        attente_max (float): Budget d'attente cumulée par requête, en secondes
+        statuts (tuple): Codes HTTP considérés comme transitoires
+    """
+    def __init__(self, tentatives:int = TENTATIVES_MAX, delai_base:float = DELAI_BASE, delai_max:float = DELAI_MAX,
+                 attente_max:float = ATTENTE_MAX, statuts:tuple = STATUTS_TRANSITOIRES):
+        self.tentatives = tentatives
+        self.delai_base = delai_base
+        self.delai_max = delai_max
+        self.attente_max = attente_max
+        self.statuts = statuts
+
+    def delai(self, tentative:int, retry_after:float = None):
+        """
+        Calcule le délai avant la tentative suivante.
+
+        Args:
+            tentative (int): Numéro de la tentative échouée (0 pour la première)
+            retry_after (float): Délai imposé par le serveur, prioritaire s'il est connu
+
+        Returns:
+            float: Délai en secondes
+        """
+        if retry_after is not None:
+            return retry_after
+
+        return random.uniform(0, min(self.delai_max, self.delai_base * 2 ** tentative))
+
+    @staticmethod
+    def retry_after(headers):
+        """
+        Extrait l'en-tête Retry-After (secondes ou date HTTP), None s'il est absent ou invalide.
+        """
+        valeur = headers.get('Retry-After') or headers.get('retry-after')
+
+        if not valeur:
+            return None
+
+        try:
+            return max(0.0, float(valeur))
+
+        except ValueError:
+            pass
+
+        try:
+            return max(0.0, parsedate_to_datetime(valeur).timestamp() - time.time())
+
+        except (TypeError, ValueError):
+            return None
+
+class AdaptiveLimiter:
+    """
+    Limiteur de concurrence AIMD partagé par tout le trafic Graph.
+
+    Le nombre de requêtes simultanées augmente d'environ une unité par
+    « fenêtre » de requêtes réussies (augmentation additive) et est divisé
+    par deux sur une réponse 429/503, un taux d'erreurs élevé ou un pic de
+    latence (diminution multiplicative). Une seule réduction est appliquée
+    par intervalle de latence pour ne pas s'effondrer sur une rafale d'erreurs.
+
+    Attributes:
+        limite_min (int): Concurrence minimale
+        limite_max (int): Concurrence maximale (taille du pool de connexions)
+        latence (float): Latence récente observée (moyenne mobile), en secondes
+        latence_reference (float): Latence de référence (moyenne mobile lente), en secondes
+        taux_erreurs (float): Proportion récente de requêtes en erreur
+    """
+    def __init__(self, limite_initiale:int = CONCURRENCE_INITIALE, limite_min:int = 1, limite_max:int = NOMBRE_WORKERS,
+                 facteur_reduction:float = 0.5, seuil_latence:float = SEUIL_LATENCE):
+        """
+        Initialise le limiteur.
+
+        Args:
+            limite_initiale (int): Concurrence autorisée au démarrage
+            limite_min (int): Concurrence minimale
+            limite_max (int): Concurrence maximale
+            facteur_reduction (float): Facteur appliqué à la limite en cas de saturation
+            seuil_latence (float): Rapport latence récente / référence considéré comme un pic
+        """
+        self.limite_min = limite_min
+        self.limite_max = limite_max
+        self.facteur_reduction = facteur_reduction
+        self.seuil_latence = seuil_latence
+
+        self._condition = threading.Condition()
+        self._limite = float(min(max(limite_initiale, limite_min), limite_max))
+        self._en_vol = 0
+        self._derniere_reduction = 0.0
+
+        self.latence = None
+        self.latence_reference = None
+        self.taux_erreurs = 0.0
+
+    @property
+    def limite(self):
+        """Nombre de requêtes simultanées actuellement autorisées."""
+        return int(self._limite)
+
+    @property
+    def en_vol(self):
+        """Nombre de requêtes actuellement en cours."""
+        return self._en_vol
+
+    def acquire(self):
+        """
+        Attend qu'une place se libère sous la limite courante puis la réserve.
+        """
+        with self._condition:
+            while self._en_vol >= self.limite:
+                self._condition.wait()
+
+            self._en_vol += 1
+
+    async def acquire_async(self, intervalle:float = 0.01):
+        """
+        Équivalent non bloquant de acquire() pour les moteurs asyncio.
+
+        Args:
+            intervalle (float): Délai entre deux vérifications de la limite, en secondes
+        """
+        while True:
+            with self._condition:
+                if self._en_vol < self.limite:
+                    self._en_vol += 1
+                    return
+
+            await asyncio.sleep(intervalle)
+
+    def release(self, latence:float = None, statut:int = None, erreur:bool = False):
+        """
+        Libère une place et ajuste la limite selon le résultat de la requête.
+
+        Args:
+            latence (float): Durée de la requête en secondes
+            statut (int): Code HTTP reçu, None en cas d'erreur réseau
+            erreur (bool): True si la requête a échoué (réseau ou statut transitoire)
+        """
+        with self._condition:
+            self._en_vol -= 1
+            erreur = erreur or statut in STATUTS_TRANSITOIRES
+            self.taux_erreurs = 0.9 * self.taux_erreurs + 0.1 * (1.0 if erreur else 0.0)
+
+            if latence is not None and not erreur:
+                self.latence = latence if self.latence is None else 0.8 * self.latence + 0.2 * latence
+                self.latence_reference = latence if self.latence_reference is None else 0.98 * self.latence_reference + 0.02 * latence
+
+            pic_latence = (self.latence_reference and self.latence > self.seuil_latence * self.latence_reference)
+
+            if statut in STATUTS_SATURATION or self.taux_erreurs > 0.2 or pic_latence:
+                self._reduire(statut)
+
+            elif not erreur and self._limite < self.limite_max:
+                # Environ +1 par fenêtre complète de requêtes réussies
+                self._limite = min(self.limite_max, self._limite + 1.0 / self._limite)
+
+            self._condition.notify_all()
+
+    def _reduire(self, statut):
+        """
+        Diminution multiplicative, au plus une fois par intervalle de latence.
+        """
+        maintenant = time.monotonic()
+
+        if maintenant - self._derniere_reduction < (self.latence or 1.0):
+            return
+
+        self._derniere_reduction = maintenant
+        ancienne = self.limite
+        self._limite = max(float(self.limite_min), self._limite * self.facteur_reduction)
+        logger.info(f"Concurrence Graph réduite de {ancienne} à {self.limite} (statut: {statut}, latence: {self.latence})")
+
+    @contextmanager
+    def slot(self):
+        """
+        Réserve une place pour la durée d'une requête.
+
+        Le dictionnaire fourni doit recevoir la clé 'statut' (code HTTP reçu) ;
+        une exception levée dans le bloc est comptée comme une erreur.
+        """
+        self.acquire()
+        resultat = {'statut': None}
+        debut = time.monotonic()
+
+        try:
+            yield resultat
+
+        except Exception:
+            self.release(time.monotonic() - debut, None, True)
+            raise
+
+        else:
+            self.release(time.monotonic() - debut, resultat['statut'])
+
+    def stats(self):
+        """
+        Retourne l'état courant du limiteur (limite, requêtes en cours, latences, taux d'erreurs).
+        """
+        with self._condition:
+            return {
+                'limite': self.limite,
+                'en_vol': self._en_vol,
+                'latence': self.latence,
+                'latence_reference': self.latence_reference,
+                'taux_erreurs': self.taux_erreurs
+            }
+
+class GraphClient:
+    """
+    Client HTTP partagé pour l'API Microsoft Graph et le téléchargement des miniatures.
+
+    Une seule session requests est conservée pour toute l'application afin de
+    réutiliser les connexions TLS (keep-alive) au lieu d'en ouvrir une nouvelle
+    à chaque requête. La session peut être utilisée depuis plusieurs threads.
+
+    Attributes:
+        session (requests.Session): Session portant le pool de connexions
+        timeout (tuple): Timeouts (connexion, lecture) appliqués à chaque requête
+        retry (RetryPolicy): Politique de nouvelles tentatives sur erreur transitoire
+        limiteur (AdaptiveLimiter): Limiteur de concurrence partagé, None si désactivé
+    """
+    def __init__(self, workers:int = NOMBRE_WORKERS, timeout:tuple = (TIMEOUT_CONNEXION, TIMEOUT_LECTURE), retry:RetryPolicy = None,
+                 limiteur:AdaptiveLimiter = None):
+        """
+        Initialise la session et son pool de connexions.
+
+        Args:
+            workers (int): Taille du pool, à aligner sur le nombre de workers concurrents
+            timeout (tuple): Timeouts (connexion, lecture) en secondes
+            retry (RetryPolicy): Politique de nouvelles tentatives, RetryPolicy() par défaut
+            limiteur (AdaptiveLimiter): Limiteur de concurrence, None pour ne pas limiter
+        """
+        self.timeout = timeout
+        self.workers = workers
+        self.retry = retry or RetryPolicy()
+        self.limiteur = limiteur
+
+        # pool_block évite d'ouvrir plus de connexions que de workers
+        adapter = HTTPAdapter(pool_connections = 4, pool_maxsize = workers, pool_block = True)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+
+        # Les en-têtes ne sont reconstruits qu'au changement de token
+        self._lock = threading.Lock()
+        self._token = None
+        self._headers = {}
+
+        logger.debug(f"GraphClient initialisé - pool: {workers}, timeout: {timeout}")
+
+    def headers(self, token:str):
+        """
+        Retourne les en-têtes d'authentification pour le token donné.
+        """
+        with self._lock:
+            if token != self._token:
+                self._token = token
+                self._headers = {
+                    'Authorization': 'Bearer ' + token,
+                    'Accept': 'application/json',
+                    'Content-Type': 'application/json'
+                }
+
+            return self._headers
+
+    def request(self, method:str, url:str, token:str = None, retry:bool = True, **kwargs):
+        """
+        Exécute une requête HTTP sur la session partagée.
+
+        Les erreurs transitoires (429, 5xx, connexion coupée, timeout) sont
+        rejouées selon self.retry tant que le budget de tentatives le permet.
+
+        Args:
+            method (str): Verbe HTTP ("get", "delete", "post", ...)
+            url (str): URL absolue, ou endpoint relatif à GRAPH_URL
+            token (str): Token d'accès, None pour les URLs pré-authentifiées
+            retry (bool): Active les nouvelles tentatives
+            **kwargs: Paramètres transmis à requests (params, json, headers...)
+
+        Returns:
+            requests.Response: Dernière réponse reçue du serveur
+
+        Raises:
+            requests.RequestException: Erreur réseau persistante après toutes les tentatives
+        """
+        if not url.startswith("http"):
+            url = f"{GRAPH_URL}/{url.lstrip('/')}"
+
+        if token:
+            headers = dict(self.headers(token))
+            headers.update(kwargs.pop('headers', None) or {})
+            kwargs['headers'] = headers
+
+        kwargs.setdefault('timeout', self.timeout)
+
+        tentatives = self.retry.tentatives if retry else 0
+        attente_totale = 0.0
+
+        for tentative in range(tentatives + 1):
+            try:
+                response = self._envoi(method, url, **kwargs)
+
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                delai = self.retry.delai(tentative)
+
+                if tentative >= tentatives or attente_totale + delai > self.retry.attente_max:
+                    raise
+
+                logger.warning(f"Erreur réseau transitoire ({e}), nouvelle tentative dans {delai:.1f}s")
+
+            else:
+                if response.status_code not in self.retry.statuts:
+                    return response
+
+                delai = self.retry.delai(tentative, self.retry.retry_after(response.headers))
+
+                if tentative >= tentatives or attente_totale + delai > self.retry.attente_max:
+                    return response
+
+                logger.warning(f"Réponse {response.status_code} de Graph, nouvelle tentative dans {delai:.1f}s")
+
+            attente_totale += delai
+            time.sleep(delai)
+
+    def _envoi(self, method:str, url:str, **kwargs):
+        """
+        Envoie une requête unique en respectant la limite de concurrence.
+        """
+        if not self.limiteur:
+            return self.session.request(method.upper(), url, **kwargs)
+
+        with self.limiteur.slot() as resultat:
+            response = self.session.request(method.upper(), url, **kwargs)
+            resultat['statut'] = response.status_code
+
+        return response
+
+    def download(self, url:str):
+        """
+        Télécharge le contenu binaire d'une URL pré-authentifiée (miniatures).
+
+        Returns:
+            bytes: Contenu téléchargé, None en cas d'erreur
+        """
+        try:
+            response = self.request("get", url)
+
+        except requests.RequestException as e:
+            logger.error(f"ERREUR de téléchargement : {e}")
+            return None
+
+        if response.status_code != 200:
+            logger.error(f"ERREUR de téléchargement {response.status_code} - URL: {url}")
+            return None
+
+        return response.content
+
+# Budget de concurrence commun au parcours et au téléchargement des miniatures
+limiteur = AdaptiveLimiter()
+graph_client = GraphClient(limiteur = limiteur)
+
+# Préchargement des pages suivantes pendant le traitement de la page courante
+_prefetch = ThreadPoolExecutor(max_workers = NOMBRE_WORKERS, thread_name_prefix = "graph-prefetch")
+
+def call_web_api(endpoint, token, select = None, request_type = "get", params = None):
     """
     Method use for make a request to the endpoind in parameter
     """
     if not token:
         logger.error("Token manquant ou None - impossible de faire l'appel API")
         return None
-        
-    url = f'https://graph.microsoft.com/v1.0/{endpoint}'
-    logger.debug(f"Appel API {request_type.upper()}: {endpoint}")
 
-    headers = {
-        'Authorization': 'Bearer ' + token,
-        'Accept': 'application/json',
-        'Content-Type': 'application/json'
-    }
+    logger.debug(f"Appel API {request_type.upper()}: {endpoint}")
 
-    params = {}
+    params = dict(params) if params else {}
 
     if select:
         params['$select'] = ','.join(select) if isinstance(select, list) else select
 
-    if request_type == "get":
-        data = requests.get(url, headers = headers, params = params)
-        
-    elif request_type == "delete":
-        data = requests.delete(url, headers = headers, params = params)
+    try:
+        data = graph_client.request(request_type, endpoint, token, params = params)
+
+    except requests.RequestException as e:
+        logger.error(f"ERREUR réseau: {e} - Endpoint: {endpoint}")
+
+        return None
 
-        if data.status_code == 404:
-            logger.warning(f"ERREUR : {data.status_code} {data.text}")
+    if request_type == "delete" and data.status_code == 404:
+        logger.warning(f"ERREUR : {data.status_code} {data.text}")
 
-            return data.status_code
+        return data.status_code
 
     if data.status_code == 200:
         response = data.json()
         logger.debug(f"Réponse API 200 OK - Endpoint: {endpoint}")
 
         return response
-    
+
     elif data.status_code == 204:
         logger.info(f"Requête DELETE réussie - Endpoint: {endpoint}")
 
@@ -56,3 +463,254 @@ def call_web_api(endpoint, token, select = None, request_type = "get"):
         logger.error(f"ERREUR API {data.status_code}: {data.text} - Endpoint: {endpoint}")
 
         return None
+
+def iter_pages(endpoint, token, select = None, top = TAILLE_PAGE, prefetch = True, expand = None):
+    """
+    Parcourt toutes les pages d'un listing Graph en suivant @odata.nextLink.
+
+    La page suivante est demandée en arrière-plan dès que la page courante est
+    reçue, pendant que l'appelant traite ses éléments.
+
+    Args:
+        endpoint (str): Endpoint du listing (ex: me/drive/items/{id}/children)
+        token (str): Token d'accès Microsoft Graph
+        select (list|str): Champs demandés ($select)
+        top (int): Taille de page demandée ($top), None pour la valeur serveur
+        prefetch (bool): Précharge la page suivante en arrière-plan
+        expand (str): Relations incluses dans la réponse ($expand), ex: thumbnails
+
+    Yields:
+        list: Éléments de chaque page, dans l'ordre de réception
+
+    Raises:
+        GraphError: Une page n'a pas pu être chargée malgré les nouvelles tentatives
+    """
+    params = {'$top': top} if top else {}
+
+    if expand:
+        params['$expand'] = expand
+
+    page = call_web_api(endpoint, token, select, params = params)
+    suivante = None
+
+    if page is None:
+        raise GraphError(f"Listing impossible : {endpoint}")
+
+    try:
+        while page:
+            next_link = page.get('@odata.nextLink')
+
+            # Le nextLink contient déjà $select et $top
+            if next_link and prefetch:
+                suivante = _prefetch.submit(call_web_api, next_link, token)
+
+            yield page.get('value', [])
+
+            if not next_link:
+                break
+
+            logger.debug(f"Page suivante pour {endpoint}")
+            page = suivante.result() if suivante else call_web_api(next_link, token)
+            suivante = None
+
+            if page is None:
+                # Une page manquante rendrait le listing incomplet sans le signaler
+                raise GraphError(f"Page suivante impossible à charger : {endpoint}")
+
+    finally:
+        # Itération abandonnée par l'appelant : la page préchargée est inutile
+        if suivante:
+            suivante.cancel()
+
+def iter_children(endpoint, token, select = None, top = TAILLE_PAGE, prefetch = True, expand = None):
+    """
+    Itère élément par élément sur un listing Graph paginé.
+
+    Voir iter_pages pour les paramètres.
+    """
+    for page in iter_pages(endpoint, token, select, top, prefetch, expand):
+        yield from page
+
+def url_relative(endpoint, select = None, params = None):
+    """
+    Construit l'URL relative d'une sous-requête $batch (ex: /me/drive/items/{id}/children?$select=...).
+    """
+    params = dict(params) if params else {}
+
+    if select:
+        params['$select'] = ','.join(select) if isinstance(select, list) else select
+
+    url = '/' + endpoint.strip('/')
+
+    if params:
+        url += '?' + urlencode(params, safe = '$,()=;')
+
+    return url
+
+def call_batch(requetes, token):
+    """
+    Envoie jusqu'à TAILLE_BATCH requêtes GET en un seul aller-retour via /$batch.
+
+    Args:
+        requetes (list): Liste de tuples (clé, url relative) à regrouper
+        token (str): Token d'accès Microsoft Graph
+
+    Returns:
+        dict: {clé: (status, headers, body)} pour chaque sous-réponse reçue,
+              None si l'appel $batch lui-même a échoué
+    """
+    if not token:
+        logger.error("Token manquant ou None - impossible de faire l'appel API")
+        return None
+
+    cles = {}
+    payload = {'requests': []}
+
+    for index, (cle, url) in enumerate(requetes[:TAILLE_BATCH]):
+        cles[str(index)] = cle
+        payload['requests'].append({'id': str(index), 'method': 'GET', 'url': url})
+
+    logger.debug(f"Appel API $batch: {len(cles)} sous-requêtes")
+
+    try:
+        data = graph_client.request("post", "$batch", token, json = payload)
+
+    except requests.RequestException as e:
+        logger.error(f"ERREUR réseau $batch: {e}")
+        return None
+
+    if data.status_code != 200:
+        logger.error(f"ERREUR API $batch {data.status_code}: {data.text}")
+        return None
+
+    reponses = {}
+
+    for sous_reponse in data.json().get('responses', []):
+        cle = cles.get(sous_reponse.get('id'))
+
+        if cle is not None:
+            reponses[cle] = (sous_reponse.get('status'), sous_reponse.get('headers') or {}, sous_reponse.get('body'))
+
+    return reponses
+
+def _suite_listing(page, token):
+    """
+    Itère sur les éléments d'une première page déjà reçue puis sur les pages suivantes.
+    """
+    yield from page.get('value', [])
+
+    next_link = page.get('@odata.nextLink')
+
+    if next_link:
+        yield from iter_children(next_link, token, top = None)
+
+def iter_batch_children(folder_ids, token, select = None, top = TAILLE_PAGE, expand = None):
+    """
+    Liste les enfants de plusieurs dossiers en regroupant les appels dans des /$batch.
+
+    Les dossiers sont envoyés par groupes de TAILLE_BATCH. Une sous-requête en
+    échec est renvoyée seule dans un lot suivant, jusqu'à TENTATIVES_BATCH envois.
+    Les pages suivantes (@odata.nextLink) sont chargées à la demande.
+
+    Args:
+        folder_ids (list): IDs des dossiers à lister
+        token (str): Token d'accès Microsoft Graph
+        select (list|str): Champs demandés ($select)
+        top (int): Taille de page demandée ($top)
+        expand (str): Relations incluses dans la réponse ($expand)
+
+    Yields:
+        tuple: (folder_id, éléments) où éléments est un itérable, ou None si le
+               listing a définitivement échoué
+    """
+    params = {'$top': top} if top else {}
+
+    if expand:
+        params['$expand'] = expand
+
+    tentatives = {folder_id: 0 for folder_id in folder_ids}
+    en_attente = list(tentatives)
+
+    while en_attente:
+        lot = en_attente[:TAILLE_BATCH]
+        en_attente = en_attente[TAILLE_BATCH:]
+
+        requetes = [(folder_id, url_relative(f"me/drive/items/{folder_id}/children", select, params)) for folder_id in lot]
+        reponses = call_batch(requetes, token) or {}
+        attente = None
+
+        for folder_id in lot:
+            status, headers, body = reponses.get(folder_id, (None, {}, None))
+
+            if status == 200 and body is not None:
+                yield folder_id, _suite_listing(body, token)
+                continue
+
+            tentatives[folder_id] += 1
+
+            if tentatives[folder_id] < TENTATIVES_BATCH:
+                # Seule la sous-requête en échec est renvoyée
+                logger.warning(f"Sous-requête $batch en échec ({status}) pour {folder_id}, nouvelle tentative")
+                en_attente.append(folder_id)
+                delai = graph_client.retry.delai(tentatives[folder_id] - 1, RetryPolicy.retry_after(headers))
+                attente = delai if attente is None else max(attente, delai)
+
+            else:
+                logger.error(f"ERREUR $batch {status} pour {folder_id} après {TENTATIVES_BATCH} tentatives")
+                yield folder_id, None
+
+        if attente and en_attente:
+            logger.info(f"Limitation Graph : attente de {attente:.1f}s avant le lot suivant")
+            time.sleep(attente)
+
+def iter_delta(token, lien = None, select = None, top = TAILLE_PAGE):
+    """
+    Parcourt les pages d'une requête delta sur le OneDrive (me/drive/root/delta).
+
+    Sans lien, la requête énumère tout le OneDrive. Avec le deltaLink d'une
+    synchronisation précédente, seuls les éléments ajoutés, modifiés ou
+    supprimés depuis sont renvoyés.
+
+    Args:
+        token (str): Token d'accès Microsoft Graph
+        lien (str): deltaLink de la synchronisation précédente, None pour une énumération complète
+        select (list|str): Champs demandés ($select)
+        top (int): Taille de page demandée ($top)
+
+    Yields:
+        tuple: (éléments de la page, deltaLink) où deltaLink n'est renseigné que sur la dernière page
+
+    Raises:
+        DeltaExpire: Le jeton delta n'est plus accepté par Graph
+        GraphError: Une page n'a pas pu être chargée malgré les nouvelles tentatives
+    """
+    if lien:
+        # Le deltaLink contient déjà le jeton, $select et $top
+        url, params = lien, None
+
+    else:
+        url, params = "me/drive/root/delta", {}
+
+        if select:
+            params['$select'] = ','.join(select) if isinstance(select, list) else select
+
+        if top:
+            params['$top'] = top
+
+    while url:
+        try:
+            response = graph_client.request("get", url, token, params = params)
+
+        except requests.RequestException as e:
+            raise GraphError(f"ERREUR réseau sur la requête delta : {e}")
+
+        if response.status_code == 410:
+            raise DeltaExpire(f"Jeton delta expiré : {response.text}")
+
+        if response.status_code != 200:
+            raise GraphError(f"ERREUR API {response.status_code} sur la requête delta : {response.text}")
+
+        page = response.json()
+        url, params = page.get('@odata.nextLink'), None
+
+        yield page.get('value', []), page.get('@odata.deltaLink')
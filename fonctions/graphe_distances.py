@@ -0,0 +1,411 @@
+# graphe_distances.py
+
+# ===============
+# === IMPORTS ===
+# ===============
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import numpy
+
+from .comparaison import voter
+from .logger import connecteLogger
+
+# ==============
+# === LOGGER ===
+# ==============
+logger = connecteLogger(__name__)
+
+# ==================
+# === PARAMÈTRES ===
+# ==================
+FICHIER_GRAPHE = "graphe_distances.db"
+SEUIL_GRAPHE = 32 # Seuil minimal (bits de phash) auquel le graphe est construit, pour servir les seuils plus petits
+FORMAT_GRAPHE = 1 # À incrémenter si le vote ou les métriques changent : les graphes existants sont alors ignorés
+VOTANTS = ("dhash", "whash", "colorhash") # Algorithmes votants, une colonne de distances chacun
+TAILLE_LOT_REQUETE = 5000 # Arêtes lues à la fois par une requête sur le graphe
+
+def version_catalogue(images):
+    """
+    Version du catalogue d'images pour le graphe des distances.
+
+    Ne dépend que des IDs et des empreintes : renommer ou déplacer une
+    image garde le graphe, ajouter, supprimer ou hacher à nouveau une image
+    en demande un nouveau.
+
+    Args:
+        images (iterable): (ID, phash, empreintes (voir recup_hashes)) de chaque image
+
+    Returns:
+        str: Empreinte SHA-256 du catalogue
+    """
+    version = hashlib.sha256(f"{FORMAT_GRAPHE}\n".encode('utf-8'))
+
+    for id, phash, empreintes in sorted(images, key = lambda image: image[0]):
+        version.update(f"{id}|{phash}|{sorted(empreintes.items())}\n".encode('utf-8'))
+
+    return version.hexdigest()
+
+def revoter(seuil:int, parametres:dict, distance, similarite, distance_invariant, similarite_invariant, autres):
+    """
+    Refait le vote d'arêtes du graphe à un seuil, à partir de leurs distances enregistrées.
+
+    L'orientation d'une arête (phash ou phash invariant) peut changer avec le
+    seuil : distance et similarité sont celles de l'empreinte retenue.
+
+    Args:
+        seuil (int): Distance maximale entre phash
+        parametres (dict): Bits des empreintes (voir Empreintes.parametres)
+        distance, similarite (numpy.ndarray): Distance et similarité des phash
+        distance_invariant, similarite_invariant (numpy.ndarray): Idem pour le phash invariant, -1 si absent
+        autres (list): Distances de chaque algorithme de VOTANTS, -1 si absent
+
+    Returns:
+        dict: Tableaux distance, similarite, votes, votants et orientation (voir Empreintes.comparer)
+    """
+    autres = [(distances, distances >= 0, parametres['bits_autres'][algo]) for algo, distances in zip(VOTANTS, autres)]
+    votes, votants, _, orientation = voter(seuil, parametres['bits'], distance, autres,
+                                           (distance_invariant, distance_invariant >= 0, parametres['bits_invariant']))
+
+    return {
+        'distance': numpy.where(orientation, distance_invariant, distance),
+        'similarite': numpy.where(orientation, similarite_invariant, similarite),
+        'votes': votes,
+        'votants': votants,
+        'orientation': orientation
+    }
+
+class GrapheDistances:
+    """
+    Graphe persistant des paires proches de la recherche visuelle, par version du catalogue.
+
+    Le graphe est calculé une fois à un seuil maximal : chaque arête relie
+    deux empreintes distinctes (par l'ID d'une de leurs images) et porte le
+    seuil minimal qui la retient, les distances de chaque empreinte et les
+    similarités. Tout seuil plus petit est alors servi par une requête
+    filtrée sur seuil_min, suivie du vote refait sur les distances
+    enregistrées : le résultat est celui de la recherche complète.
+
+    Seul le graphe de la dernière version est conservé ; le précédent reste
+    servi jusqu'à ce que le nouveau soit complet.
+
+    Attributes:
+        fichier (str): Chemin du fichier SQLite du graphe
+        requetes (int): Recherches servies depuis le graphe
+        constructions (int): Graphes enregistrés
+    """
+    def __init__(self, fichier:str = FICHIER_GRAPHE):
+        """
+        Ouvre (ou crée) la base du graphe.
+
+        Args:
+            fichier (str): Chemin du fichier SQLite du graphe
+        """
+        self.fichier = fichier
+        self.requetes = 0
+        self.constructions = 0
+        self._lock = threading.Lock()
+        self.connexion = sqlite3.connect(fichier, check_same_thread = False, isolation_level = None)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.execute("PRAGMA synchronous=NORMAL")
+        self.connexion.execute("""
+            CREATE TABLE IF NOT EXISTS graphe (
+                version TEXT PRIMARY KEY,
+                seuil_max INTEGER,
+                parametres TEXT,
+                histogramme TEXT,
+                aretes INTEGER,
+                cree REAL
+            )
+        """)
+        self.connexion.execute(f"""
+            CREATE TABLE IF NOT EXISTS arete (
+                version TEXT,
+                seuil_min INTEGER,
+                id1 TEXT,
+                id2 TEXT,
+                distance INTEGER,
+                similarite REAL,
+                distance_invariant INTEGER,
+                similarite_invariant REAL,
+                {", ".join(f"{algo} INTEGER" for algo in VOTANTS)},
+                PRIMARY KEY (version, seuil_min, id1, id2)
+            ) WITHOUT ROWID
+        """)
+
+        logger.info(f"Graphe des distances ouvert : {fichier}")
+
+    def seuil_max(self, version:str):
+        """
+        Seuil auquel le graphe d'une version a été construit.
+
+        Args:
+            version (str): Version du catalogue (voir version_catalogue)
+
+        Returns:
+            int: Seuil maximal servi, None si aucun graphe n'existe pour cette version
+        """
+        with self._lock:
+            ligne = self.connexion.execute("SELECT seuil_max FROM graphe WHERE version = ?", (version,)).fetchone()
+
+        return ligne[0] if ligne else None
+
+    def couvre(self, version:str, seuil:int):
+        """
+        Indique si le graphe de la version sert ce seuil (voir requete).
+        """
+        seuil_max = self.seuil_max(version)
+
+        return seuil_max is not None and seuil <= seuil_max
+
+    def construction(self, version:str, seuil_max:int, parametres:dict):
+        """
+        Commence l'enregistrement du graphe d'une version (voir ConstructionGraphe).
+
+        Le graphe précédent de la même version (calculé à un seuil plus petit)
+        et les arêtes d'une construction interrompue sont supprimés.
+
+        Args:
+            version (str): Version du catalogue (voir version_catalogue)
+            seuil_max (int): Seuil auquel les arêtes sont calculées
+            parametres (dict): Bits des empreintes (voir Empreintes.parametres), pour refaire le vote
+
+        Returns:
+            ConstructionGraphe: Graphe en cours d'enregistrement
+        """
+        self._supprimer(version)
+
+        return ConstructionGraphe(self, version, seuil_max, parametres)
+
+    def _ecrire_aretes(self, version:str, ids1:list, ids2:list, colonnes):
+        """
+        Écrit un lot d'arêtes dans sa propre transaction courte.
+        """
+        seuil_min, distance, similarite, distance_invariant, similarite_invariant, votants = colonnes
+        colonnes = [seuil_min.tolist(), distance.tolist(), similarite.tolist(), distance_invariant.tolist(), similarite_invariant.tolist()]
+        colonnes += [votants[algo].tolist() for algo in VOTANTS]
+
+        with self._lock:
+            self.connexion.execute("BEGIN")
+
+            try:
+                self.connexion.executemany(f"""
+                    INSERT OR REPLACE INTO arete (version, id1, id2, seuil_min, distance, similarite, distance_invariant,
+                        similarite_invariant, {", ".join(VOTANTS)})
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, {", ".join("?" for _ in VOTANTS)})
+                """, ((version,) + ligne for ligne in zip(ids1, ids2, *colonnes)))
+                self.connexion.execute("COMMIT")
+
+            except Exception:
+                self.connexion.execute("ROLLBACK")
+                raise
+
+    def _publier(self, version:str, seuil_max:int, parametres:dict, histogramme:list, aretes:int):
+        """
+        Rend visible le graphe complet d'une version et supprime ceux des autres versions.
+        """
+        with self._lock:
+            self.connexion.execute("BEGIN")
+
+            try:
+                self.connexion.execute("""
+                    INSERT INTO graphe (version, seuil_max, parametres, histogramme, aretes, cree) VALUES (?, ?, ?, ?, ?, ?)
+                """, (version, seuil_max, json.dumps(parametres), json.dumps(histogramme), aretes, time.time()))
+                self.connexion.execute("DELETE FROM arete WHERE version != ?", (version,))
+                self.connexion.execute("DELETE FROM graphe WHERE version != ?", (version,))
+                self.connexion.execute("COMMIT")
+
+            except Exception:
+                self.connexion.execute("ROLLBACK")
+                raise
+
+            self.constructions += 1
+
+    def _supprimer(self, version:str):
+        """
+        Supprime le graphe d'une version et ses arêtes, complètes ou non.
+        """
+        with self._lock:
+            self.connexion.execute("BEGIN")
+            self.connexion.execute("DELETE FROM graphe WHERE version = ?", (version,))
+            self.connexion.execute("DELETE FROM arete WHERE version = ?", (version,))
+            self.connexion.execute("COMMIT")
+
+    def requete(self, version:str, seuil:int, taille_lot:int = TAILLE_LOT_REQUETE):
+        """
+        Paires similaires à un seuil, servies depuis le graphe de la version par lots.
+
+        Les arêtes sont lues par ordre de seuil minimal : les paires les plus
+        proches arrivent en premier. Chaque requête a sa propre connexion,
+        pour ne pas bloquer le graphe pendant qu'elle est consommée.
+
+        Args:
+            version (str): Version du catalogue (voir version_catalogue)
+            seuil (int): Distance maximale entre phash, au plus le seuil du graphe (voir couvre)
+            taille_lot (int): Arêtes lues par lot
+
+        Yields:
+            dict: Listes ids1, ids2 et tableaux distance, similarite, votes, votants et
+                  orientation (voir Empreintes.comparer) d'un lot d'arêtes
+        """
+        debut = time.perf_counter()
+        connexion = sqlite3.connect(self.fichier)
+        aretes = 0
+
+        try:
+            ligne = connexion.execute("SELECT seuil_max, parametres FROM graphe WHERE version = ?", (version,)).fetchone()
+
+            if not ligne or seuil > ligne[0]:
+                raise ValueError(f"Pas de graphe des distances au seuil {seuil} pour cette version")
+
+            parametres = json.loads(ligne[1])
+            curseur = connexion.execute(f"""
+                SELECT id1, id2, distance, similarite, distance_invariant, similarite_invariant, {", ".join(VOTANTS)}
+                FROM arete WHERE version = ? AND seuil_min <= ?
+                ORDER BY seuil_min
+            """, (version, seuil))
+
+            with self._lock:
+                self.requetes += 1
+
+            while lignes := curseur.fetchmany(taille_lot):
+                aretes += len(lignes)
+                colonnes = list(zip(*lignes))
+                distance = numpy.array(colonnes[2], dtype = numpy.int64)
+                similarite = numpy.array(colonnes[3], dtype = float)
+                distance_invariant = numpy.array(colonnes[4], dtype = numpy.int64)
+                similarite_invariant = numpy.array(colonnes[5], dtype = float)
+                autres = [numpy.array(distances, dtype = numpy.int64) for distances in colonnes[6:]]
+
+                aretes_lot = revoter(seuil, parametres, distance, similarite, distance_invariant, similarite_invariant, autres)
+                aretes_lot['ids1'] = list(colonnes[0])
+                aretes_lot['ids2'] = list(colonnes[1])
+
+                yield aretes_lot
+
+        finally:
+            connexion.close()
+            logger.info(f"Graphe des distances : {aretes} arêtes lues au seuil {seuil} en {time.perf_counter() - debut:.3f} s")
+
+    def histogramme(self, version:str = None):
+        """
+        Paires de fichiers retenues par seuil minimal, pour aider à choisir le seuil.
+
+        La somme des valeurs jusqu'à un seuil est le nombre de doublons que la
+        recherche visuelle trouve à ce seuil.
+
+        Args:
+            version (str): Version du catalogue, la plus récente si None
+
+        Returns:
+            list: Paires de fichiers par seuil, de 0 au seuil du graphe ; None sans graphe
+        """
+        with self._lock:
+            if version is None:
+                ligne = self.connexion.execute("SELECT histogramme FROM graphe ORDER BY cree DESC LIMIT 1").fetchone()
+
+            else:
+                ligne = self.connexion.execute("SELECT histogramme FROM graphe WHERE version = ?", (version,)).fetchone()
+
+        return json.loads(ligne[0]) if ligne else None
+
+    def resume(self, pas:int = 4, version:str = None):
+        """
+        Texte court du nombre de doublons par seuil (cumul de l'histogramme).
+
+        Args:
+            pas (int): Écart entre deux seuils affichés
+            version (str): Version du catalogue, la plus récente si None
+
+        Returns:
+            str: Doublons à chaque seuil multiple de pas, None sans graphe
+        """
+        histogramme = self.histogramme(version)
+
+        if histogramme is None:
+            return None
+
+        cumul = numpy.cumsum(histogramme)
+        seuils = sorted(set(range(0, len(cumul), pas)) | {len(cumul) - 1})
+
+        return " | ".join(f"{seuil} : {int(cumul[seuil])}" for seuil in seuils)
+
+    def stats(self):
+        """
+        Retourne les compteurs du graphe (requêtes, constructions, arêtes enregistrées).
+        """
+        with self._lock:
+            aretes = self.connexion.execute("SELECT COALESCE(SUM(aretes), 0) FROM graphe").fetchone()[0]
+
+            return {
+                'requetes': self.requetes,
+                'constructions': self.constructions,
+                'aretes': aretes
+            }
+
+class ConstructionGraphe:
+    """
+    Graphe d'une version en cours d'enregistrement, lot par lot (voir GrapheDistances.construction).
+
+    Chaque lot est écrit dans sa propre transaction courte : entre deux
+    lots, aucun verrou ni transaction n'est tenu, si bien que celui qui les
+    produit peut se mettre en pause ou émettre des doublons sans bloquer la
+    base. Le graphe n'est visible (voir GrapheDistances.seuil_max) qu'une
+    fois terminé ; en cas d'arrêt ou d'erreur, celui qui le construit
+    l'abandonne pour supprimer les arêtes déjà écrites.
+
+    Attributes:
+        version (str): Version du catalogue
+        seuil_max (int): Seuil auquel les arêtes sont calculées
+        histogramme (numpy.ndarray): Paires de fichiers par seuil minimal, de 0 à seuil_max
+        aretes (int): Arêtes écrites
+    """
+    def __init__(self, graphe:GrapheDistances, version:str, seuil_max:int, parametres:dict):
+        """
+        Args:
+            graphe (GrapheDistances): Graphe où les arêtes sont écrites
+            version (str): Version du catalogue (voir version_catalogue)
+            seuil_max (int): Seuil auquel les arêtes sont calculées
+            parametres (dict): Bits des empreintes (voir Empreintes.parametres)
+        """
+        self.graphe = graphe
+        self.version = version
+        self.seuil_max = seuil_max
+        self.parametres = parametres
+        self.histogramme = numpy.zeros(seuil_max + 1, dtype = numpy.int64)
+        self.aretes = 0
+        self._debut = time.perf_counter()
+
+    def ajouter(self, ids1:list, ids2:list, colonnes, histogramme):
+        """
+        Écrit un lot d'arêtes.
+
+        Args:
+            ids1, ids2 (list): ID d'une image de chaque extrémité
+            colonnes (tuple): Colonnes à partir du seuil minimal (voir Empreintes.aretes)
+            histogramme (numpy.ndarray): Paires de fichiers du lot par seuil minimal, de 0 à seuil_max
+        """
+        if len(ids1):
+            self.graphe._ecrire_aretes(self.version, ids1, ids2, colonnes)
+
+        self.histogramme += numpy.asarray(histogramme, dtype = numpy.int64)
+        self.aretes += len(ids1)
+
+    def terminer(self):
+        """
+        Rend le graphe visible et supprime ceux des versions précédentes.
+        """
+        self.graphe._publier(self.version, self.seuil_max, self.parametres, self.histogramme.tolist(), self.aretes)
+        logger.info(f"Graphe des distances enregistré : {self.aretes} arêtes au seuil {self.seuil_max} en {time.perf_counter() - self._debut:.3f} s")
+
+    def abandonner(self):
+        """
+        Supprime les arêtes déjà écrites (arrêt ou erreur) : aucune version partielle n'est conservée.
+        """
+        self.graphe._supprimer(self.version)
+        logger.info("Enregistrement du graphe des distances abandonné")
+
+graphe_distances = GrapheDistances()
@@ -0,0 +1,459 @@
+# hachage.py
+
+# ===============
+# === IMPORTS ===
+# ===============
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from multiprocessing import shared_memory
+
+# Traitement d'images
+import imagehash
+import numpy
+import scipy.fftpack
+from PIL import Image
+
+from .logger import connecteLogger
+
+# ==============
+# === LOGGER ===
+# ==============
+logger = connecteLogger(__name__)
+
+# ==================
+# === PARAMÈTRES ===
+# ==================
+PROCESSUS_HACHAGE = os.cpu_count() or 1 # Processus de calcul des hash perceptuels
+TAILLE_HASH = 16 # Côté du hash perceptuel (16 -> 256 bits)
+FACTEUR_FREQUENCES = 4 # Côté de l'image transformée par la DCT / côté du hash (highfreq_factor d'imagehash)
+BITS_COULEUR = 3 # Bits par classe de teinte du hash couleur (14 classes -> 42 bits)
+ALGORITHMES = ("phash", "dhash", "whash", "colorhash", "phash_invariant", "phash_grossier", "invariant_grossier") # Empreintes calculées pour chaque image
+TAILLE_GROSSIER = 8 # Côté des hash grossiers (8 -> 64 bits) du premier étage de la recherche visuelle
+
+def image_reduite(image_data:bytes, cote:int, mode:str = "L"):
+    """
+    Décode une image directement dans le mode voulu, à la plus petite taille utile.
+
+    Les JPEG passent en mode brouillon (draft) : la mise à l'échelle se fait
+    dans la DCT, sans décoder les pixels en pleine résolution. Les autres
+    formats sont décodés puis réduits d'un facteur entier (reduce). Dans les
+    deux cas l'image garde au moins cote pixels de côté.
+
+    Args:
+        image_data (bytes): Contenu de l'image
+        cote (int): Côté minimal de l'image renvoyée
+        mode (str): Mode PIL de l'image renvoyée (L : niveaux de gris, RGB : couleur)
+
+    Returns:
+        Image: Image réduite
+    """
+    img = Image.open(BytesIO(image_data))
+
+    # Sans effet hors JPEG
+    img.draft(mode, (cote, cote))
+    img = img.convert(mode)
+
+    facteur = min(img.width, img.height) // cote
+
+    if facteur > 1:
+        img = img.reduce(facteur)
+
+    return img
+
+def phash_bytes(image_data:bytes, hash_size:int = TAILLE_HASH):
+    """
+    Décode une miniature et calcule son hash perceptuel.
+
+    Args:
+        image_data (bytes): Contenu de l'image
+        hash_size (int): Côté du hash perceptuel
+
+    Returns:
+        str: Hash perceptuel hexadécimal
+    """
+    img = image_reduite(image_data, hash_size * FACTEUR_FREQUENCES)
+
+    return hex_hash(imagehash.phash(img, hash_size = hash_size, highfreq_factor = FACTEUR_FREQUENCES))
+
+def empreintes(img, hash_size:int = TAILLE_HASH):
+    """
+    Calcule toutes les empreintes d'une image déjà décodée et réduite.
+
+    La conversion en niveaux de gris et le redimensionnement au carré de la
+    DCT sont faits une seule fois et partagés entre les algorithmes.
+
+    Args:
+        img (Image): Image couleur réduite (voir image_reduite)
+        hash_size (int): Côté des hash phash, dhash et whash
+
+    Returns:
+        dict: Algorithme -> (taille, hash hexadécimal), taille étant le côté
+              du hash (ou de la DCT pour phash_invariant) ou, pour colorhash,
+              les bits par classe
+    """
+    cote = hash_size * FACTEUR_FREQUENCES
+    gris = img.convert("L")
+    carre = gris.resize((cote, cote), Image.LANCZOS)
+    basses = dct_basses(carre, hash_size)
+    grossieres = basses[:TAILLE_GROSSIER, :TAILLE_GROSSIER]
+
+    # Le hash couleur ne mesure que des proportions de pixels : une vignette suffit
+    vignette = img.resize((hash_size * 2, hash_size * 2), Image.BOX)
+
+    return {
+        'phash': (hash_size, hex_hash(imagehash.ImageHash(basses > numpy.median(basses)))),
+        'dhash': (hash_size, hex_hash(imagehash.dhash(gris, hash_size = hash_size))),
+        'whash': (hash_size, hex_hash(whash_haar(carre, hash_size))),
+        'colorhash': (BITS_COULEUR, hex_hash(imagehash.colorhash(vignette, binbits = BITS_COULEUR))),
+        'phash_invariant': (hash_size, hex_hash(phash_invariant(basses))),
+        # Coin basse fréquence de la même DCT : hash 64 bits pour la cascade
+        'phash_grossier': (TAILLE_GROSSIER, hex_hash(imagehash.ImageHash(grossieres > numpy.median(grossieres)))),
+        'invariant_grossier': (TAILLE_GROSSIER, hex_hash(phash_invariant(grossieres)))
+    }
+
+def dct_basses(carre, hash_size:int = TAILLE_HASH):
+    """
+    Basses fréquences de la DCT 2D d'une image carrée, comme dans imagehash.phash.
+
+    Args:
+        carre (Image): Image carrée en niveaux de gris (côté hash_size * FACTEUR_FREQUENCES)
+        hash_size (int): Côté du bloc de basses fréquences conservé
+
+    Returns:
+        numpy.ndarray: Coefficients [hash_size, hash_size]
+    """
+    pixels = numpy.asarray(carre)
+    dct = scipy.fftpack.dct(scipy.fftpack.dct(pixels, axis = 0), axis = 1)
+
+    return dct[:hash_size, :hash_size]
+
+def phash_invariant(basses):
+    """
+    Hash perceptuel invariant aux rotations d'un quart de tour et aux miroirs.
+
+    Les huit transformations du carré ne font que changer le signe des
+    coefficients de la DCT (un miroir multiplie c(u, v) par (-1)^v ou (-1)^u)
+    et, pour les quarts de tour, transposer la matrice. |c(u, v)| + |c(v, u)|
+    est donc identique pour les huit orientations d'une même image : le hash
+    compare ces valeurs, sur le triangle supérieur, à leur médiane.
+
+    Args:
+        basses (numpy.ndarray): Basses fréquences de la DCT (voir dct_basses)
+
+    Returns:
+        ImageHash: Hash de n(n+1)/2 bits (136 pour un côté de 16)
+    """
+    amplitudes = numpy.abs(basses)
+    symetriques = (amplitudes + amplitudes.T)[numpy.triu_indices(len(basses))]
+
+    return imagehash.ImageHash(symetriques > numpy.median(symetriques))
+
+def hex_hash(hash):
+    """
+    Forme hexadécimale d'un ImageHash, identique à str(hash).
+
+    str() convertit les bits un par un en Python ; packbits fait de même en
+    une opération quand le nombre de bits est un multiple de 8.
+    """
+    bits = hash.hash.flatten()
+
+    if bits.size % 8:
+        return str(hash)
+
+    return numpy.packbits(bits).tobytes().hex()
+
+def whash_haar(carre, hash_size:int = TAILLE_HASH):
+    """
+    Hash par ondelettes de Haar, équivalent à imagehash.whash(mode = "haar").
+
+    Retirer la composante LL de plus haut niveau revient, en Haar, à soustraire
+    la moyenne de l'image ; la bande LL suivante est la moyenne de blocs
+    carrés. Le calcul se résume donc à des moyennes de blocs comparées à leur
+    médiane, sans transformée (le seuil à la médiane n'est pas affecté par la
+    moyenne retirée). Seuls les blocs exactement égaux à la médiane peuvent
+    différer de imagehash, qui les départage par ses erreurs d'arrondi.
+
+    Args:
+        carre (Image): Image carrée en niveaux de gris dont le côté est un multiple de hash_size
+        hash_size (int): Côté du hash
+
+    Returns:
+        ImageHash: Hash par ondelettes
+    """
+    bloc = carre.width // hash_size
+    pixels = numpy.asarray(carre, dtype = numpy.float64).reshape(hash_size, bloc, hash_size, bloc)
+    moyennes = pixels.mean(axis = (1, 3))
+
+    return imagehash.ImageHash(moyennes > numpy.median(moyennes))
+
+def empreintes_bytes(image_data:bytes, hash_size:int = TAILLE_HASH):
+    """
+    Décode une miniature une seule fois et calcule toutes ses empreintes (voir empreintes).
+    """
+    return empreintes(image_reduite(image_data, hash_size * FACTEUR_FREQUENCES, "RGB"), hash_size)
+
+def hash_depuis_hex(algo:str, taille:int, valeur:str):
+    """
+    Reconstruit un ImageHash à partir de sa forme enregistrée en base.
+
+    Args:
+        algo (str): Algorithme (voir ALGORITHMES)
+        taille (int): Taille enregistrée avec le hash
+        valeur (str): Hash hexadécimal
+
+    Returns:
+        ImageHash: Hash comparable par soustraction (distance de Hamming)
+    """
+    if algo == "colorhash":
+        return imagehash.hex_to_flathash(valeur, taille)
+
+    if algo in ("phash_invariant", "invariant_grossier"):
+        # Hash non carré de n(n+1)/2 bits
+        nombre = taille * (taille + 1) // 2
+
+        if nombre % 8:
+            entier = int(valeur, 16)
+            bits = numpy.array([(entier >> (nombre - 1 - i)) & 1 for i in range(nombre)])
+
+        else:
+            bits = numpy.unpackbits(numpy.frombuffer(bytes.fromhex(valeur), dtype = numpy.uint8))
+
+        return imagehash.ImageHash(bits.astype(bool))
+
+    return imagehash.hex_to_hash(valeur)
+
+def bits_hash(algo:str, taille:int):
+    """
+    Nombre de bits d'une empreinte enregistrée (voir hash_depuis_hex).
+
+    Args:
+        algo (str): Algorithme (voir ALGORITHMES)
+        taille (int): Taille enregistrée avec le hash
+
+    Returns:
+        int: Nombre de bits du hash
+    """
+    if algo == "colorhash":
+        return taille * 14
+
+    if algo in ("phash_invariant", "invariant_grossier"):
+        return taille * (taille + 1) // 2
+
+    return taille * taille
+
+def phash_complet(image_data:bytes, hash_size:int = TAILLE_HASH):
+    """
+    Hash perceptuel après décodage en pleine résolution (référence du benchmark).
+    """
+    img = Image.open(BytesIO(image_data))
+
+    return str(imagehash.phash(img, hash_size = hash_size, highfreq_factor = FACTEUR_FREQUENCES))
+
+def _empreintes_memoire(nom:str, taille:int, hash_size:int = TAILLE_HASH):
+    """
+    Tâche d'un processus de hachage : lit la miniature dans la mémoire partagée.
+
+    Args:
+        nom (str): Nom du segment de mémoire partagée
+        taille (int): Nombre d'octets utiles du segment
+        hash_size (int): Côté du hash perceptuel
+
+    Returns:
+        dict: Empreintes de la miniature (voir empreintes)
+    """
+    memoire = shared_memory.SharedMemory(name = nom)
+
+    try:
+        # Le segment peut être plus grand que demandé (arrondi à la page)
+        return empreintes_bytes(bytes(memoire.buf[:taille]), hash_size)
+
+    finally:
+        memoire.close()
+
+class PoolHachage:
+    """
+    Pool de processus qui calcule les empreintes des images hors du GIL.
+
+    Chaque miniature est copiée une seule fois dans un segment de mémoire
+    partagée : seuls son nom et sa taille sont transmis au processus. Le
+    segment est libéré dès que le calcul est terminé.
+
+    Les processus ne sont lancés qu'au premier calcul. Si le pool devient
+    inutilisable, les hash sont calculés dans le thread appelant.
+
+    Attributes:
+        processus (int): Nombre de processus de calcul
+    """
+    def __init__(self, processus:int = PROCESSUS_HACHAGE):
+        """
+        Args:
+            processus (int): Nombre de processus de calcul
+        """
+        self.processus = max(1, processus)
+        self._executeur = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        """
+        Retourne le pool de processus, créé au premier appel.
+        """
+        with self._lock:
+            if self._executeur is None:
+                logger.info(f"Démarrage du pool de hachage : {self.processus} processus")
+                self._executeur = ProcessPoolExecutor(max_workers = self.processus)
+
+            return self._executeur
+
+    def soumettre(self, image_data:bytes, hash_size:int = TAILLE_HASH):
+        """
+        Lance le calcul des empreintes d'une miniature.
+
+        Args:
+            image_data (bytes): Contenu de l'image
+            hash_size (int): Côté du hash perceptuel
+
+        Returns:
+            Future: Futur des empreintes (voir empreintes)
+        """
+        try:
+            memoire = shared_memory.SharedMemory(create = True, size = len(image_data))
+
+        except OSError as e:
+            logger.warning(f"Mémoire partagée indisponible ({e}), hash calculé sur place")
+            return self._sur_place(image_data, hash_size)
+
+        memoire.buf[:len(image_data)] = image_data
+
+        try:
+            futur = self._pool().submit(_empreintes_memoire, memoire.name, len(image_data), hash_size)
+
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.error(f"Pool de hachage inutilisable ({e}), hash calculé sur place")
+            self._liberer(memoire)
+
+            with self._lock:
+                self._executeur = None
+
+            return self._sur_place(image_data, hash_size)
+
+        futur.add_done_callback(lambda _: self._liberer(memoire))
+
+        return futur
+
+    @staticmethod
+    def _liberer(memoire):
+        """
+        Ferme et supprime un segment de mémoire partagée.
+        """
+        try:
+            memoire.close()
+            memoire.unlink()
+
+        except (FileNotFoundError, OSError):
+            pass
+
+    @staticmethod
+    def _sur_place(image_data, hash_size):
+        """
+        Calcule les empreintes dans le thread appelant et les renvoie sous forme de futur terminé.
+        """
+        futur = Future()
+
+        try:
+            futur.set_result(empreintes_bytes(image_data, hash_size))
+
+        except Exception as e:
+            futur.set_exception(e)
+
+        return futur
+
+    def arreter(self):
+        """
+        Arrête les processus de calcul sans attendre les tâches en cours.
+        """
+        with self._lock:
+            if self._executeur is not None:
+                self._executeur.shutdown(wait = False, cancel_futures = True)
+                self._executeur = None
+
+pool_hachage = PoolHachage()
+
+def benchmark_decodage(images:list, hash_size:int = TAILLE_HASH, repetitions:int = 3):
+    """
+    Compare le décodage réduit au décodage complet : débit et accord des hash.
+
+    Args:
+        images (list): Contenus d'images (bytes)
+        hash_size (int): Côté du hash perceptuel
+        repetitions (int): Passes chronométrées sur la liste, la meilleure est retenue
+
+    Returns:
+        dict: Images par seconde de chaque méthode (et des quatre empreintes
+              d'un même décodage), accélération, part de hash identiques,
+              distance de Hamming moyenne et maximale (en bits)
+    """
+    def debit(fonction):
+        meilleure = None
+
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            hashes = [fonction(data, hash_size) for data in images]
+            duree = time.perf_counter() - debut
+            meilleure = duree if meilleure is None else min(meilleure, duree)
+
+        return len(images) / meilleure, hashes
+
+    debit_complet, complets = debit(phash_complet)
+    debit_reduit, reduits = debit(phash_bytes)
+    debit_empreintes, _ = debit(empreintes_bytes)
+
+    distances = [int(imagehash.hex_to_hash(a) - imagehash.hex_to_hash(b)) for a, b in zip(complets, reduits)]
+
+    return {
+        'images': len(images),
+        'complet_par_s': debit_complet,
+        'reduit_par_s': debit_reduit,
+        'empreintes_par_s': debit_empreintes,
+        'acceleration': debit_reduit / debit_complet,
+        'identiques': distances.count(0) / len(distances),
+        'distance_moyenne': sum(distances) / len(distances),
+        'distance_max': max(distances)
+    }
+
+if __name__ == "__main__":
+    # python -m fonctions.hachage [images...] : sans argument, miniatures JPEG synthétiques
+    if len(sys.argv) > 1:
+        images = []
+
+        for chemin in sys.argv[1:]:
+            with open(chemin, "rb") as fichier:
+                images.append(fichier.read())
+
+    else:
+        import random
+        from PIL import ImageDraw
+
+        # Formes colorées aux tailles des rendus small, medium et d'une grande image
+        images = []
+
+        for cote in (96, 176, 800):
+            for graine in range(20):
+                aleatoire = random.Random(graine)
+                img = Image.new("RGB", (cote, cote * 3 // 4), (aleatoire.randrange(256),) * 3)
+                dessin = ImageDraw.Draw(img)
+
+                for _ in range(12):
+                    x, y, r = aleatoire.randrange(cote), aleatoire.randrange(cote), aleatoire.randrange(cote // 8, cote // 3)
+                    dessin.ellipse((x - r, y - r, x + r, y + r), fill = tuple(aleatoire.randrange(256) for _ in range(3)))
+
+                tampon = BytesIO()
+                img.save(tampon, "JPEG", quality = 85)
+                images.append(tampon.getvalue())
+
+    for cle, valeur in benchmark_decodage(images).items():
+        print(f"{cle:>18} : {valeur:.3f}" if isinstance(valeur, float) else f"{cle:>18} : {valeur}")
@@ -0,0 +1,570 @@
+# hamming.py
+
+# ===============
+# === IMPORTS ===
+# ===============
+import sys
+import time
+from itertools import combinations
+
+import numpy
+
+from .logger import connecteLogger
+
+# ==============
+# === LOGGER ===
+# ==============
+logger = connecteLogger(__name__)
+
+# ==================
+# === PARAMÈTRES ===
+# ==================
+TAILLE_TUILE = 512 # Côté des tuiles de paires comparées en une opération (512 x 512 paires)
+TAILLE_LOT_INDEX = 4096 # Lignes dont les candidats sont cherchés ensemble dans un index
+RAYON_SOUS_CHAINE_MAX = 2 # Bits modifiés au plus par les sondes d'une sous-chaîne
+LARGEUR_MIN = 4 # Bits minimaux d'une sous-chaîne
+LARGEUR_MAX = 20 # Bits maximaux d'une sous-chaîne (table d'adressage direct de 2^20 entrées)
+ECHANTILLON_PLAN = 2048 # Lignes de l'index d'essai du planificateur
+LIMITE_FORCE_BRUTE = 20000 # Au-delà, le benchmark extrapole la force brute depuis quelques tuiles
+
+# Coûts du planificateur en nanosecondes (ordres de grandeur mesurés par python -m fonctions.hamming)
+COUT_PAIRE = 12 # Distance d'une paire pour un hash de 256 bits, en force brute
+COUT_TRI = 100 # Ligne d'une sous-chaîne à la construction de l'index (tri)
+COUT_TABLE = 8 # Entrée d'une table d'adressage direct à la construction de l'index
+COUT_SONDE = 20 # Sonde d'une sous-chaîne (lecture de la table d'adressage direct)
+COUT_CANDIDAT = 1000 # Paire candidate d'un index (dédoublonnage et comparaison complète)
+
+# Nombre de bits à 1 de chaque valeur sur 16 bits (NumPy antérieur à 2.0, sans bitwise_count)
+POPCOUNT_16 = numpy.array([bin(valeur).count("1") for valeur in range(1 << 16)], dtype = numpy.uint8)
+_bitwise_count = getattr(numpy, "bitwise_count", None)
+
+# Masques des demi-octets (4 bits) pour le comptage par groupes
+_M1 = numpy.uint64(0x5555555555555555)
+_M2 = numpy.uint64(0x3333333333333333)
+_M4 = numpy.uint64(0x1111111111111111)
+
+def mots(bits:int):
+    """
+    Nombre de mots de 64 bits nécessaires pour un hash de bits bits.
+    """
+    return (bits + 63) // 64
+
+def matrice(valeurs:list, bits:int):
+    """
+    Empile des hash hexadécimaux dans une matrice de mots de 64 bits.
+
+    Chaque hash est aligné à droite (bits de poids fort à zéro) : l'ordre
+    des bits de imagehash est conservé, les bits de remplissage sont nuls et
+    n'influencent pas les distances.
+
+    Args:
+        valeurs (list): Hash hexadécimaux, None pour une ligne absente (mise à zéro)
+        bits (int): Nombre de bits des hash
+
+    Returns:
+        numpy.ndarray: Matrice uint64 [len(valeurs), mots(bits)]
+    """
+    octets = mots(bits) * 8
+    tampon = b"".join(int(valeur, 16).to_bytes(octets, "big") if valeur else bytes(octets) for valeur in valeurs)
+
+    return numpy.frombuffer(tampon, dtype = ">u8").astype(numpy.uint64).reshape(len(valeurs), mots(bits))
+
+def bits_a_un(x):
+    """
+    Nombre de bits à 1 de chaque élément d'un tableau uint64.
+
+    Utilise numpy.bitwise_count quand il existe, sinon la table POPCOUNT_16.
+    """
+    if _bitwise_count is not None:
+        return _bitwise_count(x)
+
+    # Quatre valeurs de 16 bits par mot, consécutives sur le dernier axe
+    moities = POPCOUNT_16[numpy.ascontiguousarray(x).view(numpy.uint16)]
+
+    return moities[..., 0::4] + moities[..., 1::4] + moities[..., 2::4] + moities[..., 3::4]
+
+def popcount(x):
+    """
+    Nombre de bits à 1 de chaque ligne d'une matrice uint64.
+
+    Les mots sont comptés puis additionnés colonne par colonne : une somme
+    sur le dernier axe, de quelques éléments seulement, coûte plus cher que
+    le comptage lui-même.
+
+    Args:
+        x (numpy.ndarray): Matrice uint64 [..., mots]
+
+    Returns:
+        numpy.ndarray: Nombre de bits à 1 par ligne (int32)
+    """
+    total = bits_a_un(x[..., 0]).astype(numpy.int32)
+
+    for mot in range(1, x.shape[-1]):
+        total += bits_a_un(x[..., mot])
+
+    return total
+
+def groupes_differents(x):
+    """
+    Nombre de groupes de 4 bits ayant au moins 2 bits à 1, par ligne.
+
+    Appliqué au XOR de deux hash, c'est le nombre de groupes de 4 bits qui
+    ne sont pas « similaires » (moins de 3 bits sur 4 identiques).
+
+    Args:
+        x (numpy.ndarray): Matrice uint64 [..., mots]
+
+    Returns:
+        numpy.ndarray: Nombre de groupes par ligne (int32)
+    """
+    # Nombre de bits à 1 de chaque groupe de 4 bits, dans le groupe lui-même
+    n = x - ((x >> numpy.uint64(1)) & _M1)
+    n = (n & _M2) + ((n >> numpy.uint64(2)) & _M2)
+
+    # Un compte de 2 à 4 a son bit 1 ou son bit 2 à 1
+    return popcount(((n >> numpy.uint64(1)) | (n >> numpy.uint64(2))) & _M4)
+
+def distances(a, b, ii, jj):
+    """
+    Distances de Hamming des paires (a[ii], b[jj]).
+
+    ii et jj sont des indices de paires, ou des indices qui se diffusent
+    l'un contre l'autre (colonne [n, 1] et ligne [1, m]) pour obtenir les
+    distances d'une tuile entière sans copier les lignes de chaque paire.
+    Le XOR et le comptage se font mot par mot.
+
+    Args:
+        a, b (numpy.ndarray): Matrices de hash (voir matrice)
+        ii, jj (numpy.ndarray): Indices des paires
+
+    Returns:
+        numpy.ndarray: Distances (int32), de la forme diffusée de ii et jj
+    """
+    total = bits_a_un(a[ii, 0] ^ b[jj, 0]).astype(numpy.int32)
+
+    for mot in range(1, a.shape[1]):
+        total += bits_a_un(a[ii, mot] ^ b[jj, mot])
+
+    return total
+
+def nombre_tuiles(n:int, taille:int = TAILLE_TUILE):
+    """
+    Nombre de tuiles produites par tuiles(n, taille).
+    """
+    cotes = -(-n // taille)
+
+    return cotes * (cotes + 1) // 2
+
+def tuiles(n:int, taille:int = TAILLE_TUILE):
+    """
+    Découpe les paires (i < j) de n éléments en tuiles de taille x taille.
+
+    Args:
+        n (int): Nombre d'éléments
+        taille (int): Côté des tuiles
+
+    Yields:
+        tuple: (ii, jj) indices en colonne [t, 1] et en ligne [1, t] des
+               éléments de la tuile, seules les tuiles où i < j existe
+    """
+    for i0 in range(0, n, taille):
+        ii = numpy.arange(i0, min(n, i0 + taille))[:, None]
+
+        for j0 in range(i0, n, taille):
+            yield ii, numpy.arange(j0, min(n, j0 + taille))[None, :]
+
+def sous_chaine(hashes, debut:int, largeur:int):
+    """
+    Extrait une sous-chaîne de bits de chaque ligne d'une matrice de hash.
+
+    Args:
+        hashes (numpy.ndarray): Matrice uint64 (voir matrice)
+        debut (int): Position du premier bit (0 : bit de poids fort du premier mot)
+        largeur (int): Nombre de bits, 64 au plus
+
+    Returns:
+        numpy.ndarray: Sous-chaînes (uint64), une par ligne
+    """
+    mot, decalage = divmod(debut, 64)
+    valeurs = hashes[:, mot] << numpy.uint64(decalage)
+
+    if decalage + largeur > 64:
+        valeurs |= hashes[:, mot + 1] >> numpy.uint64(64 - decalage)
+
+    return valeurs >> numpy.uint64(64 - largeur)
+
+def masques(largeur:int, rayon:int):
+    """
+    Masques XOR de largeur bits ayant au plus rayon bits à 1 (sondes d'une sous-chaîne).
+    """
+    sondes = [0]
+
+    for nombre in range(1, rayon + 1):
+        sondes += [sum(1 << bit for bit in bits) for bits in combinations(range(largeur), nombre)]
+
+    return numpy.array(sondes, dtype = numpy.uint64)
+
+class IndexMultiple:
+    """
+    Index de hachage multiple (multi-index hashing) pour les recherches par rayon de Hamming.
+
+    Chaque hash est découpé en sous_chaines sous-chaînes. Deux hash à distance
+    au plus rayon ont au moins une sous-chaîne à distance au plus
+    rayon // sous_chaines (principe des tiroirs). Les lignes sont triées par
+    sous-chaîne, avec une table d'adressage direct des valeurs : les
+    candidats d'une ligne sont les lignes dont une sous-chaîne égale la
+    sienne à un masque de sonde près, lues sans dichotomie. Toutes les
+    paires sous le rayon sont candidates ; la distance exacte est vérifiée
+    ensuite par l'appelant.
+
+    Attributes:
+        bits (int): Nombre de bits des hash
+        rayon (int): Distance maximale recherchée
+        sous_chaines (int): Nombre de sous-chaînes
+        rayon_sous_chaine (int): Bits modifiés au plus par chaque sonde
+        lignes (numpy.ndarray): Indices des lignes indexées dans la matrice d'origine
+    """
+    def __init__(self, hashes, bits:int, rayon:int, sous_chaines:int, lignes = None):
+        """
+        Args:
+            hashes (numpy.ndarray): Matrice des hash indexés (voir matrice)
+            bits (int): Nombre de bits des hash
+            rayon (int): Distance maximale recherchée
+            sous_chaines (int): Nombre de sous-chaînes (LARGEUR_MAX bits au plus chacune)
+            lignes (numpy.ndarray): Indices d'origine des lignes de hashes (par défaut 0..n-1)
+        """
+        self.bits = bits
+        self.rayon = rayon
+        self.sous_chaines = sous_chaines
+        self.rayon_sous_chaine = rayon // sous_chaines
+        self.lignes = numpy.arange(len(hashes)) if lignes is None else lignes
+
+        # Sous-chaînes de largeurs égales à un bit près, sur les bits utiles (après le remplissage)
+        debut = hashes.shape[1] * 64 - bits
+        self.tables = [] # (clés par ligne, début de chaque valeur dans l'ordre de tri, ordre de tri, masques de sonde)
+
+        for numero in range(sous_chaines):
+            largeur = bits // sous_chaines + (numero < bits % sous_chaines)
+            cles = sous_chaine(hashes, debut, largeur).astype(numpy.int64)
+            ordre = numpy.argsort(cles, kind = "stable")
+
+            # Table d'adressage direct : les lignes de valeur v sont ordre[debuts[v]:debuts[v + 1]]
+            debuts = numpy.zeros((1 << largeur) + 1, dtype = numpy.int64)
+            numpy.cumsum(numpy.bincount(cles, minlength = 1 << largeur), out = debuts[1:])
+
+            self.tables.append((cles, debuts, ordre, masques(largeur, self.rayon_sous_chaine).astype(numpy.int64)))
+            debut += largeur
+
+    def sondes(self):
+        """
+        Nombre de valeurs lues dans les tables pour une ligne.
+        """
+        return sum(len(table[3]) for table in self.tables)
+
+    def candidats(self, locales):
+        """
+        Paires candidates (i < j) des lignes demandées, sans doublons.
+
+        Args:
+            locales (numpy.ndarray): Positions des lignes dans l'index
+
+        Returns:
+            tuple: (ii, jj) positions dans l'index, triées
+        """
+        codes = []
+
+        for cles, debuts, ordre, sondes in self.tables:
+            # Toutes les sondes de toutes les lignes en une fois
+            cherchees = (cles[locales, None] ^ sondes[None, :]).ravel()
+            bas = debuts[cherchees]
+            nombres = debuts[cherchees + 1] - bas
+            total = int(nombres.sum())
+
+            if not total:
+                continue
+
+            # Développement des intervalles [bas, bas + nombre) de chaque sonde
+            decalages = numpy.repeat(bas - (numpy.cumsum(nombres) - nombres), nombres)
+            ii = numpy.repeat(numpy.repeat(locales, len(sondes)), nombres)
+            jj = ordre[numpy.arange(total) + decalages]
+
+            garde = ii < jj
+            codes.append(ii[garde].astype(numpy.int64) * len(self.lignes) + jj[garde])
+
+        if not codes:
+            vide = numpy.zeros(0, dtype = numpy.int64)
+            return vide, vide
+
+        codes = numpy.unique(numpy.concatenate(codes))
+
+        return codes // len(self.lignes), codes % len(self.lignes)
+
+    def contient(self, ii, jj):
+        """
+        Paires que cet index propose comme candidates, sans parcourir ses tables.
+
+        Une paire est candidate si ses deux lignes sont indexées et si l'une
+        de leurs sous-chaînes diffère d'au plus rayon_sous_chaine bits.
+
+        Args:
+            ii, jj (numpy.ndarray): Indices d'origine (voir lignes) de chaque paire
+
+        Returns:
+            numpy.ndarray: Masque des paires candidates
+        """
+        if not len(self.lignes):
+            return numpy.zeros(len(ii), dtype = bool)
+
+        positions_i = numpy.minimum(numpy.searchsorted(self.lignes, ii), len(self.lignes) - 1)
+        positions_j = numpy.minimum(numpy.searchsorted(self.lignes, jj), len(self.lignes) - 1)
+        proches = numpy.zeros(len(positions_i), dtype = bool)
+
+        for cles, _, _, _ in self.tables:
+            proches |= bits_a_un((cles[positions_i] ^ cles[positions_j]).astype(numpy.uint64)) <= self.rayon_sous_chaine
+
+        return proches & (self.lignes[positions_i] == ii) & (self.lignes[positions_j] == jj)
+
+    def nombre_lots(self, taille_lot:int = TAILLE_LOT_INDEX):
+        """
+        Nombre de lots produits par paires(taille_lot).
+        """
+        return -(-len(self.lignes) // taille_lot)
+
+    def paires(self, taille_lot:int = TAILLE_LOT_INDEX):
+        """
+        Parcourt toutes les paires candidates de l'index, par lots de lignes.
+
+        Yields:
+            tuple: (ii, jj) indices d'origine (voir lignes), i < j
+        """
+        for debut in range(0, len(self.lignes), taille_lot):
+            ii, jj = self.candidats(numpy.arange(debut, min(len(self.lignes), debut + taille_lot)))
+
+            # lignes est croissant : l'ordre i < j est conservé
+            yield self.lignes[ii], self.lignes[jj]
+
+def paires_index(indexes:list, taille_lot:int = TAILLE_LOT_INDEX):
+    """
+    Parcourt les paires candidates de plusieurs index, chacune une seule fois.
+
+    Une paire candidate de plusieurs index n'est rendue que par le premier :
+    les suivants écartent celles que les précédents proposent (voir
+    IndexMultiple.contient), sans garder trace des paires déjà rendues.
+
+    Args:
+        indexes (list): Index (voir IndexMultiple) sur les mêmes indices d'origine
+        taille_lot (int): Lignes par lot (voir IndexMultiple.paires)
+
+    Yields:
+        tuple: (ii, jj) indices d'origine, i < j
+    """
+    for numero, indexe in enumerate(indexes):
+        for ii, jj in indexe.paires(taille_lot):
+            if numero:
+                deja = numpy.logical_or.reduce([precedent.contient(ii, jj) for precedent in indexes[:numero]])
+                ii, jj = ii[~deja], jj[~deja]
+
+            yield ii, jj
+
+def configurations(bits:int, rayon:int):
+    """
+    Découpages envisagés pour un index : un par rayon de sous-chaîne de 0 à RAYON_SOUS_CHAINE_MAX.
+
+    Returns:
+        list: Nombres de sous-chaînes, sans doublon
+    """
+    minimum = -(-bits // LARGEUR_MAX)
+    nombres = []
+
+    for rayon_sous_chaine in range(RAYON_SOUS_CHAINE_MAX + 1):
+        # Plus petit nombre de sous-chaînes tel que rayon // sous_chaines <= rayon_sous_chaine
+        sous_chaines = max(minimum, rayon // (rayon_sous_chaine + 1) + 1)
+
+        if sous_chaines <= bits // LARGEUR_MIN and sous_chaines not in nombres:
+            nombres.append(sous_chaines)
+
+    return nombres
+
+def cout_construction(bits:int, sous_chaines:int, total:int):
+    """
+    Coût (ns) de construction d'un index : tri des lignes et tables d'adressage direct.
+    """
+    largeurs = [bits // sous_chaines + (numero < bits % sous_chaines) for numero in range(sous_chaines)]
+
+    return sum(total * COUT_TRI + ((1 << largeur) + 1) * COUT_TABLE for largeur in largeurs)
+
+def estimer_index(hashes, bits:int, rayon:int, sous_chaines:int, total:int):
+    """
+    Estime le coût (ns) d'une recherche par index sur un échantillon.
+
+    Un index est construit sur ECHANTILLON_PLAN lignes au plus ; les paires
+    candidates trouvées y sont extrapolées au carré du nombre de lignes.
+
+    Args:
+        hashes (numpy.ndarray): Matrice des hash à indexer
+        bits (int): Nombre de bits des hash
+        rayon (int): Distance maximale recherchée
+        sous_chaines (int): Nombre de sous-chaînes
+        total (int): Nombre de lignes de la recherche complète
+
+    Returns:
+        tuple: (coût estimé en ns, paires candidates estimées)
+    """
+    echantillon = numpy.random.default_rng(0).choice(len(hashes), min(len(hashes), ECHANTILLON_PLAN), replace = False)
+    index = IndexMultiple(hashes[numpy.sort(echantillon)], bits, rayon, sous_chaines)
+    ii, _ = index.candidats(numpy.arange(len(echantillon)))
+
+    taux = len(ii) / max(1, len(echantillon) * (len(echantillon) - 1) / 2)
+    candidats = taux * total * (total - 1) / 2
+    cout = cout_construction(bits, sous_chaines, total) + total * index.sondes() * COUT_SONDE + candidats * COUT_CANDIDAT
+
+    return cout, candidats
+
+def planifier(recherches:list, n:int, empreintes:int = 1):
+    """
+    Choisit entre la force brute et des index pour trouver les paires proches.
+
+    Le coût de la force brute est proportionnel au nombre de paires ; celui
+    d'un index au nombre de sondes et de paires candidates estimées (voir
+    estimer_index). Chaque recherche reçoit son meilleur découpage ; les
+    index ne sont retenus que si leur coût cumulé est inférieur à celui de
+    la force brute.
+
+    Args:
+        recherches (list): (nom, matrice, lignes présentes, bits, rayon) de
+                           chaque hash à indexer ; les paires proches pour l'un
+                           d'eux au moins doivent contenir tous les doublons
+        n (int): Nombre total de lignes comparées
+        empreintes (int): Hash de 256 bits comparés par paire en force brute
+
+    Returns:
+        dict: index (liste d'IndexMultiple, None pour la force brute),
+              cout_force_brute et cout_index (ns), candidats estimés, texte
+    """
+    cout_force_brute = n * (n - 1) / 2 * COUT_PAIRE * empreintes
+    cout_index = 0.0
+    candidats = 0.0
+    choix = []
+
+    for nom, hashes, lignes, bits, rayon in recherches:
+        if len(lignes) < 2:
+            continue
+
+        nombres = configurations(bits, rayon)
+
+        # Petites recherches : la construction seule coûte plus que la force brute, inutile d'estimer
+        if not nombres or cout_index + min(cout_construction(bits, nombre, len(lignes)) for nombre in nombres) >= cout_force_brute:
+            cout_index = float("inf")
+            break
+
+        estimations = [(estimer_index(hashes[lignes], bits, rayon, nombre, len(lignes)), nombre) for nombre in nombres]
+        (cout, paires), sous_chaines = min(estimations)
+        cout_index += cout
+        candidats += paires
+        choix.append((nom, hashes, lignes, bits, rayon, sous_chaines))
+
+    if cout_index < cout_force_brute:
+        index = [IndexMultiple(hashes[lignes], bits, rayon, sous_chaines, lignes) for _, hashes, lignes, bits, rayon, sous_chaines in choix]
+        texte = "Index (" + ", ".join(f"{nom} en {indexe.sous_chaines} sous-chaînes à {indexe.rayon_sous_chaine} bit(s) près" for (nom, *_), indexe in zip(choix, index)) + ")"
+
+    else:
+        index = None
+        texte = "Force brute"
+
+    logger.info(f"Plan de recherche : {texte} | force brute {cout_force_brute / 1e9:.1f} s, index {cout_index / 1e9:.1f} s estimées, {candidats:.0f} candidats")
+
+    return {
+        'index': index,
+        'cout_force_brute': cout_force_brute,
+        'cout_index': cout_index,
+        'candidats': candidats,
+        'texte': texte
+    }
+
+def benchmark_index(tailles:tuple = (10_000, 100_000, 1_000_000), bits:int = 256, rayon:int = 20, part_doublons:float = 0.01):
+    """
+    Compare la force brute et le plan choisi sur des hash aléatoires avec des quasi-doublons plantés.
+
+    Au-delà de LIMITE_FORCE_BRUTE lignes, la force brute est chronométrée sur
+    quelques tuiles puis extrapolée au nombre total de paires.
+
+    Args:
+        tailles (tuple): Nombres de hash testés
+        bits (int): Nombre de bits des hash
+        rayon (int): Distance maximale recherchée
+        part_doublons (float): Part des hash copiés d'un autre avec au plus rayon bits modifiés
+
+    Returns:
+        list: Par taille, plan choisi, durées (s), candidats, paires trouvées et rappel des doublons plantés
+    """
+    resultats = []
+
+    for n in tailles:
+        aleatoire = numpy.random.default_rng(n)
+        hashes = aleatoire.integers(0, 1 << 64, size = (n, mots(bits)), dtype = numpy.uint64, endpoint = False)
+        hashes[:, 0] &= numpy.uint64((1 << (64 - (mots(bits) * 64 - bits))) - 1)
+
+        # Quasi-doublons plantés : copie d'un autre hash avec quelques bits inversés
+        plantes = int(n * part_doublons)
+        permutation = aleatoire.permutation(n)
+        sources, copies = permutation[:plantes], permutation[plantes:2 * plantes]
+        hashes[copies] = hashes[sources]
+        debut_hash = mots(bits) * 64 - bits
+
+        for copie in copies:
+            for bit in aleatoire.choice(bits, aleatoire.integers(0, rayon + 1), replace = False):
+                mot, decalage = divmod(debut_hash + int(bit), 64)
+                hashes[copie, mot] ^= numpy.uint64(1 << (63 - decalage))
+
+        # Plan et recherche par index (ou force brute si le planificateur la préfère)
+        debut = time.perf_counter()
+        plan = planifier([(f"hash {bits} bits", hashes, numpy.arange(n), bits, rayon)], n)
+        candidats = 0
+        trouves = set()
+
+        lots = plan['index'][0].paires() if plan['index'] else tuiles(n)
+
+        for ii, jj in lots:
+            proches = distances(hashes, hashes, ii, jj) <= rayon
+            proches &= ii < jj
+            ii, jj = numpy.broadcast_arrays(ii, jj)
+            candidats += ii.size
+            trouves.update(zip(ii[proches].tolist(), jj[proches].tolist()))
+
+        duree_plan = time.perf_counter() - debut
+
+        # Force brute, complète ou extrapolée
+        debut = time.perf_counter()
+        paires = 0
+
+        for ii, jj in tuiles(n):
+            (distances(hashes, hashes, ii, jj) <= rayon) & (ii < jj)
+            paires += ii.size * jj.size
+
+            if n > LIMITE_FORCE_BRUTE and paires >= 50 * TAILLE_TUILE * TAILLE_TUILE:
+                break
+
+        duree_force_brute = (time.perf_counter() - debut) * (n * n / 2) / paires if n > LIMITE_FORCE_BRUTE else time.perf_counter() - debut
+
+        attendus = {(min(a, b), max(a, b)) for a, b in zip(sources.tolist(), copies.tolist())}
+
+        resultats.append({
+            'hash': n,
+            'plan': plan['texte'],
+            'plan_s': duree_plan,
+            'force_brute_s': duree_force_brute,
+            'force_brute_estimee': n > LIMITE_FORCE_BRUTE,
+            'acceleration': duree_force_brute / duree_plan,
+            'candidats': candidats,
+            'paires': len(trouves),
+            'rappel': len(attendus & trouves) / len(attendus) if attendus else 1.0
+        })
+
+    return resultats
+
+if __name__ == "__main__":
+    # python -m fonctions.hamming [tailles...] : 10k, 100k et 1M hash de 256 bits par défaut
+    tailles = tuple(int(taille) for taille in sys.argv[1:]) or (10_000, 100_000, 1_000_000)
+
+    for resultat in benchmark_index(tailles):
+        print(" | ".join(f"{cle} : {valeur:.3f}" if isinstance(valeur, float) else f"{cle} : {valeur}" for cle, valeur in resultat.items()))
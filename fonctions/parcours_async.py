@@ -0,0 +1,343 @@
+# parcours_async.py
+
+# ===============
+# === IMPORTS ===
+# ===============
+# Système et utilitaires
+import asyncio
+import sqlite3
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Client HTTP asynchrone (optionnel : le mode asynchrone est masqué s'il manque)
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Modules locaux
+from fonctions.graph import *
+from fonctions.cache_listing import cache_listing, AGE_MAX_CACHE
+from fonctions.logger import connecteLogger
+from fonctions.threads import ParcoursPhotos, SELECT_PARCOURS
+
+# ==============
+# === LOGGER ===
+# ==============
+logger = connecteLogger(__name__)
+
+# Le mode asynchrone n'est proposé que si httpx est installé
+ASYNC_DISPONIBLE = httpx is not None
+
+# Nombre de coroutines qui listent des dossiers en parallèle
+CONCURRENCE_ASYNC = NOMBRE_WORKERS
+
+class ParcoursAsync(ParcoursPhotos):
+    """
+    Variante asyncio du parcours OneDrive.
+
+    Les dossiers sont listés par CONCURRENCE_ASYNC coroutines qui partagent une
+    file d'attente, avec un client httpx asynchrone au lieu d'une boucle de
+    requêtes bloquantes. Le traitement des éléments (insertion SQL, signaux de
+    progression, prévisualisation) reste celui de ParcoursPhotos : il s'exécute
+    dans un thread dédié qui détient la seule connexion SQLite du parcours.
+
+    Signaux, pause et arrêt sont hérités de ParcoursPhotos.
+
+    Attributes:
+        concurrence (int): Nombre de dossiers listés simultanément
+    """
+    def __init__(self, token:str, types:list, prev:bool, taille_page:int = TAILLE_PAGE, concurrence:int = CONCURRENCE_ASYNC, age_cache:float = AGE_MAX_CACHE):
+        """
+        Initialise le parcours asynchrone.
+
+        Args:
+            token (str): Token d'authentification pour l'API Microsoft Graph
+            types (list): Les types de médias à détecter
+            prev (bool): Active la génération de prévisualisations et hash perceptuels
+            taille_page (int): Nombre d'éléments demandés par page de listing ($top)
+            concurrence (int): Nombre de dossiers listés simultanément
+            age_cache (float): Âge maximal des listings servis depuis le cache en secondes, 0 pour toujours relister
+        """
+        super().__init__(token, types, prev, taille_page, age_cache = age_cache)
+        self.concurrence = concurrence
+
+        logger.info(f"Initialisation ParcoursAsync - concurrence: {concurrence}")
+
+    def run(self):
+        """
+        Point d'entrée du thread : exécute la boucle asyncio jusqu'à la fin du parcours.
+        """
+        logger.info("Début du parcours asynchrone des photos OneDrive")
+        self.start = time.time()
+
+        self.list_id = []
+        self.nombre_dossiers = 0
+        self.dossiers_vus = set()
+        self.relances = {}
+
+        # Toutes les écritures SQL passent par ce thread unique
+        self._ecrivain = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "parcours-sql")
+
+        try:
+            self._ecrivain.submit(self.connexion_bdd).result()
+
+        except sqlite3.Error as e:
+            logger.error(f"Erreur de connexion BDD: {e}")
+            self.progression.emit("Erreur d'accès à la base de données")
+            self._ecrivain.shutdown()
+            return
+
+        try:
+            asyncio.run(self.parcours())
+
+        except Exception as e:
+            logger.error(f"Erreur du parcours asynchrone: {e}\n{traceback.format_exc()}")
+
+        finally:
+            self._ecrivain.shutdown(wait = True)
+
+        logger.info(f"Parcours terminé - Total de dossiers traités : {self.nombre_dossiers}")
+        self.end()
+
+    def connexion_bdd(self):
+        """Ouvre la connexion SQLite dans le thread d'écriture."""
+        self.connexion = sqlite3.connect("picture_video.db")
+        self.curseur = self.connexion.cursor()
+
+    async def parcours(self):
+        """
+        Liste la racine puis distribue les dossiers découverts aux coroutines de listing.
+        """
+        limites = httpx.Limits(max_connections = self.concurrence, max_keepalive_connections = self.concurrence)
+        timeout = httpx.Timeout(TIMEOUT_LECTURE, connect = TIMEOUT_CONNEXION)
+
+        async with httpx.AsyncClient(base_url = GRAPH_URL + "/", headers = graph_client.headers(self.token), limits = limites, timeout = timeout) as client:
+            self.client = client
+            self.loop = asyncio.get_running_loop()
+            self.file = asyncio.Queue()
+
+            logger.info("Appel API pour récupérer les dossiers racine")
+
+            try:
+                items = await self.lister("me/drive/root/children", expand = self.expand)
+
+            except GraphError as e:
+                logger.error(f"Erreur lors de l'appel API des dossiers racine: {e}")
+                self.progression.emit("Impossible de lister la racine du OneDrive, réessayez plus tard")
+                return
+
+            await self.traiter(items)
+            logger.info(f"Nombre de dossiers trouvés au niveau racine : {self.nombre_dossiers}")
+
+            workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrence)]
+            await self.file.join()
+
+            for worker in workers:
+                worker.cancel()
+
+            await asyncio.gather(*workers, return_exceptions = True)
+
+    async def worker(self):
+        """
+        Coroutine de listing : prend un dossier dans la file, le liste et traite ses éléments.
+        """
+        while True:
+            folder_id = await self.file.get()
+
+            try:
+                await self.attente_pause()
+
+                # Après un arrêt, la file est simplement vidée
+                if self._stop_event.is_set():
+                    continue
+
+                logger.debug(f"Traitement du dossier ID: {folder_id}")
+
+                try:
+                    items = await self.lister_cache(folder_id, SELECT_PARCOURS, self.expand)
+                    await self.traiter(items)
+
+                except GraphError as e:
+                    logger.error(f"Listing impossible du dossier {folder_id}: {e}")
+                    self.relance_dossier(folder_id)
+
+            except Exception as e:
+                logger.error(f"Erreur sur le dossier {folder_id}: {e}\n{traceback.format_exc()}")
+
+            finally:
+                self.file.task_done()
+
+    async def attente_pause(self):
+        """Attend la reprise sans bloquer la boucle asyncio."""
+        while not self._pause_event.is_set():
+            await asyncio.sleep(0.1)
+
+    async def traiter(self, items):
+        """
+        Traite les éléments d'un dossier puis met ses sous-dossiers en file.
+
+        Args:
+            items (list): Éléments du dossier renvoyés par l'API Microsoft Graph
+        """
+        list_id, a_sonder = await self.loop.run_in_executor(self._ecrivain, self.traiter_elements, items)
+
+        if a_sonder and not self._stop_event.is_set():
+            vides = await self.dossiers_vides([object.get('id') for object in a_sonder])
+            list_id += await self.loop.run_in_executor(self._ecrivain, self.resoudre_sondes, a_sonder, vides)
+
+        for id in list_id:
+            if id not in self.dossiers_vus:
+                self.dossiers_vus.add(id)
+                self.list_id.append(id)
+                self.nombre_dossiers += 1
+                self.file.put_nowait(id)
+
+    def relance_dossier(self, id):
+        """
+        Remet un dossier en échec dans la file (voir ParcoursPhotos.relance_dossier).
+        """
+        nombre = len(self.list_id)
+        super().relance_dossier(id)
+
+        if len(self.list_id) > nombre:
+            self.file.put_nowait(id)
+
+    async def dossiers_vides(self, folder_ids):
+        """
+        Équivalent asynchrone de folders_are_empty : chaque niveau est listé en parallèle.
+
+        Args:
+            folder_ids (list): IDs des dossiers à vérifier
+
+        Returns:
+            set: IDs des dossiers effectivement vides
+        """
+        select = ["name", "folder", "id", "file", "size"]
+        racine_de, elimines, a_sonder = self.debut_sondage(folder_ids)
+
+        async def lister_ou_none(folder_id):
+            try:
+                return await self.lister_cache(folder_id, select)
+
+            except GraphError:
+                return None
+
+        while a_sonder and not self._stop_event.is_set():
+            resultats = await asyncio.gather(*(lister_ou_none(folder_id) for folder_id in a_sonder))
+            a_sonder = self.sonder_niveau(a_sonder, zip(a_sonder, resultats), racine_de, elimines)
+
+        return set(folder_ids) - elimines
+
+    async def lister_cache(self, folder_id, select, expand = None):
+        """
+        Liste les enfants d'un dossier, depuis le cache des listings si sa version n'a pas changé.
+
+        Args:
+            folder_id (str): ID du dossier
+            select (list): Champs demandés ($select)
+            expand (str): Relations incluses dans la réponse ($expand)
+
+        Returns:
+            list: Éléments du dossier
+
+        Raises:
+            GraphError: Le listing n'a pas pu être chargé
+        """
+        endpoint = f"me/drive/items/{folder_id}/children"
+        cle = cache_listing.cle(endpoint, select, expand)
+        version = self.versions.get(folder_id)
+        items = cache_listing.get(cle, version, self.age_cache)
+
+        if items is None:
+            items = await self.lister(endpoint, select, expand)
+            cache_listing.put(cle, version, items)
+
+        return items
+
+    async def lister(self, endpoint, select = SELECT_PARCOURS, expand = None):
+        """
+        Liste tous les éléments d'un endpoint en suivant @odata.nextLink.
+
+        Args:
+            endpoint (str): Endpoint relatif à GRAPH_URL
+            select (list): Champs demandés ($select)
+            expand (str): Relations incluses dans la réponse ($expand)
+
+        Returns:
+            list: Éléments de toutes les pages
+
+        Raises:
+            GraphError: Une page n'a pas pu être chargée malgré les nouvelles tentatives
+        """
+        items = []
+        url = endpoint
+        params = {'$select': ','.join(select)}
+
+        if self.taille_page:
+            params['$top'] = self.taille_page
+
+        if expand:
+            params['$expand'] = expand
+
+        while url:
+            page = await self.get_json(url, params)
+
+            if page is None:
+                raise GraphError(f"Listing impossible : {endpoint}")
+
+            items.extend(page.get('value', []))
+
+            # Le nextLink contient déjà $select et $top
+            url = page.get('@odata.nextLink')
+            params = None
+
+        return items
+
+    async def get_json(self, url, params = None):
+        """
+        Requête GET asynchrone avec la politique de nouvelles tentatives et le limiteur partagés.
+
+        Args:
+            url (str): URL absolue ou endpoint relatif à GRAPH_URL
+            params (dict): Paramètres de requête
+
+        Returns:
+            dict: Réponse JSON, None en cas d'échec définitif
+        """
+        politique = graph_client.retry
+        attente_totale = 0.0
+
+        for tentative in range(politique.tentatives + 1):
+            await limiteur.acquire_async()
+            debut = time.monotonic()
+            response = None
+
+            try:
+                response = await self.client.get(url, params = params)
+
+            except httpx.TransportError as e:
+                logger.warning(f"Erreur réseau transitoire ({e}) - Endpoint: {url}")
+
+            finally:
+                limiteur.release(time.monotonic() - debut, response.status_code if response is not None else None, response is None)
+
+            if response is not None and response.status_code not in politique.statuts:
+                if response.status_code == 200:
+                    return response.json()
+
+                logger.error(f"ERREUR API {response.status_code}: {response.text} - Endpoint: {url}")
+                return None
+
+            retry_after = politique.retry_after(response.headers) if response is not None else None
+            delai = politique.delai(tentative, retry_after)
+
+            if tentative >= politique.tentatives or attente_totale + delai > politique.attente_max:
+                break
+
+            attente_totale += delai
+            await asyncio.sleep(delai)
+
+        logger.error(f"ERREUR API : abandon après {politique.tentatives} nouvelles tentatives - Endpoint: {url}")
+        return None
@@ -0,0 +1,298 @@
+# parcours_delta.py
+
+# ===============
+# === IMPORTS ===
+# ===============
+# Système et utilitaires
+import sqlite3
+import time
+import traceback
+
+# Modules locaux
+from fonctions.graph import *
+from fonctions.cache_miniatures import cache_miniatures
+from fonctions.logger import connecteLogger
+from fonctions.sql import *
+from fonctions.threads import ParcoursPhotos, SELECT_PARCOURS, TYPES_HACHES
+
+# ==============
+# === LOGGER ===
+# ==============
+logger = connecteLogger(__name__)
+
+# Champs demandés à la requête delta (facettes de suppression et de racine en plus)
+SELECT_DELTA = SELECT_PARCOURS + ["deleted", "root"]
+
+# Chemin Graph de la racine du OneDrive, préfixe de tous les chemins en base
+CHEMIN_RACINE = "/drive/root:"
+
+class ParcoursDelta(ParcoursPhotos):
+    """
+    Synchronisation incrémentale du catalogue via me/drive/root/delta.
+
+    Le premier lancement énumère tout le OneDrive et enregistre le deltaLink
+    renvoyé par Graph. Les lancements suivants ne reçoivent que les éléments
+    ajoutés, modifiés ou supprimés depuis, qui sont mis à jour ou supprimés
+    dans picture_video et empty_folder sans vider la base.
+
+    La requête delta ne renvoie pas parentReference.path : les chemins sont
+    reconstruits à partir de l'arborescence des dossiers, conservée dans la
+    table delta_folder d'une synchronisation à l'autre.
+
+    Signaux, pause et arrêt sont hérités de ParcoursPhotos.
+
+    Attributes:
+        dossiers (dict): ID de dossier -> (nom, ID du parent)
+        chemins (dict): ID de dossier -> chemin complet déjà calculé
+    """
+    def run(self):
+        """
+        Point d'entrée du thread : applique les changements depuis la dernière synchronisation.
+        """
+        logger.info("Début de la synchronisation incrémentale du OneDrive")
+        self.start = time.time()
+        self.list_id = [] # Dossiers ajoutés ou modifiés
+        self.nombre_dossiers = 0 # Nombre de dossiers ajoutés ou modifiés (rapport de fin)
+
+        try:
+            self.connexion = sqlite3.connect("picture_video.db")
+            self.curseur = self.connexion.cursor()
+
+        except sqlite3.Error as e:
+            logger.error(f"Erreur de connexion BDD: {e}")
+            self.progression.emit("Erreur d'accès à la base de données")
+            return
+
+        lien = recup_delta_link(self.curseur)
+
+        try:
+            try:
+                self.synchroniser(lien)
+
+            except DeltaExpire as e:
+                # Graph a oublié notre position : on repart d'un catalogue vide
+                logger.warning(f"{e} - énumération complète")
+                self.progression.emit("Synchronisation expirée, nouveau parcours complet...")
+                self.synchroniser(None)
+
+        except GraphError as e:
+            logger.error(f"Synchronisation delta interrompue: {e}")
+            self.progression.emit("Synchronisation interrompue, elle reprendra au prochain lancement")
+
+        except sqlite3.Error as e:
+            # Connexion fermée par un arrêt utilisateur
+            logger.error(f"Erreur BDD pendant la synchronisation: {e}")
+
+        except Exception as e:
+            logger.error(f"Erreur de la synchronisation delta: {e}\n{traceback.format_exc()}")
+
+        logger.info(f"Synchronisation terminée - Dossiers modifiés : {self.nombre_dossiers}")
+        self.end()
+
+    def synchroniser(self, lien):
+        """
+        Parcourt les pages delta et enregistre le nouveau deltaLink une fois toutes appliquées.
+
+        Args:
+            lien (str): deltaLink de la synchronisation précédente, None pour une énumération complète
+        """
+        if not lien:
+            logger.info("Aucun jeton delta : énumération complète du OneDrive")
+            delete_sql(self.curseur, self.connexion)
+
+        self.dossiers = {id: (name, parent_id) for id, name, parent_id in recup_delta_folder(self.curseur)}
+        self.chemins = {}
+
+        for items, delta_link in iter_delta(self.token, lien, SELECT_DELTA, self.taille_page):
+            self.traiter_delta(items)
+
+            # Un arrêt en cours de page ne doit pas avancer le jeton : la page sera rejouée
+            if self._stop_event.is_set():
+                logger.info("Arrêt demandé par l'utilisateur, jeton delta conservé")
+                return
+
+            if delta_link:
+                insert_sql_delta_link(delta_link, self.curseur, self.connexion)
+                logger.info("Jeton delta enregistré")
+
+    def traiter_delta(self, items):
+        """
+        Applique les changements d'une page delta à la base.
+
+        Args:
+            items (list): Éléments de la page renvoyés par l'API Microsoft Graph
+        """
+        self.a_sonder = [] # Dossiers modifiés à vérifier avec folders_are_empty
+
+        # Les dossiers de la page sont connus avant leurs enfants
+        for object in items:
+            if (object.get('folder') or 'root' in object) and 'deleted' not in object:
+                self.maj_dossier(object)
+
+        for object in items:
+            self._pause_event.wait()
+
+            if self._stop_event.is_set():
+                break
+
+            if 'deleted' in object:
+                self.suppression(object.get('id'))
+
+            elif 'root' in object:
+                continue
+
+            elif object.get('folder'):
+                self.dossier_delta(self.avec_chemin(object))
+
+            elif object.get('file'):
+                self.fichier_delta(self.avec_chemin(object))
+
+        # Sondage groupé en fin de page, comme en fin de dossier lors d'un parcours ;
+        # un arrêt le saute, la page étant rejouée au prochain lancement
+        if self.a_sonder and not self._stop_event.is_set():
+            self.cache_empty.clear() # Les sondages des pages précédentes ne disent rien des dossiers modifiés depuis
+            vides = self.folders_are_empty([object.get('id') for object in self.a_sonder])
+
+            for object in self.a_sonder:
+                if object.get('id') in vides:
+                    self.empty_folder_treatment(object)
+
+                else:
+                    delete_sql_item(object.get('id'), self.curseur, self.connexion)
+
+    def maj_dossier(self, object):
+        """
+        Met à jour l'arborescence connue ; un dossier renommé ou déplacé répercute son nouveau chemin.
+
+        Args:
+            object (dict): Objet dossier de l'API Microsoft Graph
+        """
+        id = object.get('id')
+
+        if 'root' in object:
+            entree = (None, None)
+
+        else:
+            entree = (object.get('name'), (object.get('parentReference') or {}).get('id'))
+
+        ancienne = self.dossiers.get(id)
+
+        if ancienne == entree:
+            return
+
+        ancien_chemin = self.chemin(id) if ancienne else None
+
+        self.dossiers[id] = entree
+        self.chemins.clear()
+        insert_sql_delta_folder(id, entree[0], entree[1], self.curseur, self.connexion)
+
+        # Delta ne renvoie pas les descendants d'un dossier renommé
+        if ancien_chemin and ancien_chemin != self.chemin(id):
+            update_sql_path(ancien_chemin, self.chemin(id), self.curseur, self.connexion)
+
+    def chemin(self, id):
+        """
+        Reconstruit le chemin Graph d'un dossier (ex: /drive/root:/Photos/2020).
+
+        Args:
+            id (str): ID du dossier
+
+        Returns:
+            str: Chemin du dossier, celui de la racine s'il est inconnu
+        """
+        if id in self.chemins:
+            return self.chemins[id]
+
+        name, parent_id = self.dossiers.get(id, (None, None))
+
+        if parent_id is None or parent_id not in self.dossiers:
+            chemin = CHEMIN_RACINE if name is None else f"{CHEMIN_RACINE}/{name}"
+
+        else:
+            chemin = f"{self.chemin(parent_id)}/{name}"
+
+        self.chemins[id] = chemin
+
+        return chemin
+
+    def avec_chemin(self, object):
+        """
+        Copie d'un objet delta avec parentReference.path renseigné, comme lors d'un parcours.
+        """
+        parent = dict(object.get('parentReference') or {})
+        parent['path'] = self.chemin(parent.get('id'))
+
+        return dict(object, parentReference = parent)
+
+    def suppression(self, id):
+        """
+        Supprime un élément de la base ; pour un dossier, tout son contenu aussi.
+
+        Delta ne renvoie pas toujours les descendants d'un dossier supprimé :
+        ses sous-dossiers sont retirés de l'arborescence connue par préfixe de
+        chemin, avec leurs fichiers.
+
+        Args:
+            id (str): ID de l'élément supprimé
+        """
+        if id in self.dossiers:
+            chemin = self.chemin(id)
+            supprimes = [dossier for dossier in self.dossiers if dossier == id or self.chemin(dossier).startswith(f"{chemin}/")]
+
+            delete_sql_path(chemin, self.curseur, self.connexion)
+            delete_sql_delta_folder(supprimes, self.curseur, self.connexion)
+
+            # Les chemins des autres dossiers ne changent pas
+            for dossier in supprimes:
+                del self.dossiers[dossier]
+                self.chemins.pop(dossier, None)
+
+        delete_sql_item(id, self.curseur, self.connexion)
+        cache_miniatures.supprimer(id)
+        logger.info(f"Élément supprimé du OneDrive : {id}")
+
+    def dossier_delta(self, object):
+        """
+        Enregistre un dossier devenu vide, ou le retire de empty_folder s'il ne l'est plus.
+
+        Un dossier avec peu d'enfants est sondé en fin de page (voir
+        traiter_delta) : il est vide s'il ne contient que des dossiers vides,
+        comme lors d'un parcours.
+
+        Args:
+            object (dict): Objet dossier avec son chemin
+        """
+        self.list_id.append(object.get('id'))
+        self.nombre_dossiers += 1
+
+        if "Empty Folder" in self.types and object.get('folder').get('childCount') == 0:
+            self.empty_folder_treatment(object)
+
+        elif self.est_a_sonder(object):
+            self.a_sonder.append(object)
+
+        else:
+            delete_sql_item(object.get('id'), self.curseur, self.connexion)
+
+    def fichier_delta(self, object):
+        """
+        Met à jour un fichier ajouté ou modifié, ou le retire s'il n'est pas d'un type détecté.
+
+        Args:
+            object (dict): Objet fichier avec son chemin
+        """
+        name = object.get('name')
+        id = object.get('id')
+        path = object.get('parentReference').get('path')
+        type = self.is_picture_video_document(object)
+
+        if type not in self.types:
+            delete_sql_item(id, self.curseur, self.connexion)
+            return
+
+        self.progression.emit((f"Nom : {name} | ID : {id} | Type : {type} | Chemin : {path}/{name}\n"))
+        modifie = insert_sql(object, self.curseur, self.connexion, None)
+
+        # Fichier nouveau ou contenu modifié : son hash perceptuel est à recalculer (un renommage ou un déplacement le garde)
+        if modifie and self.prev and type in TYPES_HACHES:
+            self.mise_en_file(object)
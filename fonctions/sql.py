@@ -1,3 +1,4 @@
+import json
 import sqlite3
 from .logger import connecteLogger
 
@@ -10,6 +11,10 @@ connexion_loc = sqlite3.connect("picture_video.db")
 curseur_loc = connexion_loc.cursor()
 
 def insert_sql(object, curseur, connexion, phash:str):
+    # Le hash perceptuel et les empreintes d'un fichier déjà connu sont gardés tant que son contenu
+    # n'a pas changé (même cTag, ou même SHA-256 pour les lignes enregistrées sans cTag) : un
+    # renommage ou un déplacement ne le fait pas sortir de la recherche visuelle.
+    # Renvoie True si le fichier est nouveau ou si son contenu a changé.
     id = object.get('id')
     type = object.get('file').get('mimeType')
     name = object.get('name')
@@ -18,16 +23,146 @@ def insert_sql(object, curseur, connexion, phash:str):
     createdDateTime = object.get('createdDateTime')
     lastModifiedDateTime = object.get('lastModifiedDateTime')
     path = object.get('parentReference').get('path')
+    ctag = object.get('cTag')
+    dimensions = object.get('image') or object.get('video') or {}
+    width = dimensions.get('width')
+    height = dimensions.get('height')
+    video = object.get('video') or {}
+    duration = video.get('duration') # Millisecondes
+    bitrate = video.get('bitrate')
 
-    logger.debug(f"Insertion SQL dans picture_video: {name} (ID: {id})")
+    curseur.execute("""
+        SELECT ctag, hash FROM picture_video WHERE id = ?
+    """, (id,))
+    ancien = curseur.fetchone()
+
+    if ancien is None:
+        modifie = True
+
+    elif ancien[0] is not None:
+        modifie = ancien[0] != ctag
+
+    else:
+        modifie = hash is None or ancien[1] != hash
+
+    logger.debug(f"Insertion SQL dans picture_video: {name} (ID: {id}, contenu modifié : {modifie})")
     curseur.execute("""
         INSERT INTO picture_video (
-            id, type, name, size, hash, createdDateTime, lastModifiedDateTime, phash, path
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (id, type, name, size, hash, createdDateTime, lastModifiedDateTime, phash, path))
+            id, type, name, size, hash, createdDateTime, lastModifiedDateTime, phash, path, width, height, duration, bitrate, ctag
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            type = excluded.type, name = excluded.name, size = excluded.size, hash = excluded.hash,
+            createdDateTime = excluded.createdDateTime, lastModifiedDateTime = excluded.lastModifiedDateTime,
+            path = excluded.path, width = excluded.width, height = excluded.height,
+            duration = excluded.duration, bitrate = excluded.bitrate, ctag = excluded.ctag
+    """, (id, type, name, size, hash, createdDateTime, lastModifiedDateTime, phash, path, width, height, duration, bitrate, ctag))
+
+    # Contenu modifié : le hash perceptuel et les empreintes de l'ancienne version ne valent plus
+    if modifie and ancien is not None:
+        curseur.execute("""
+            UPDATE picture_video SET phash = ? WHERE id = ?
+        """, (phash, id))
+        curseur.execute("""
+            DELETE FROM image_hash WHERE id = ?
+        """, (id,))
+
+    connexion.commit()
+
+    return modifie
+
+def update_sql_phash(id, phash, curseur = curseur_loc, connexion = connexion_loc):
+    logger.debug(f"Mise à jour du hash perceptuel de {id}")
+    curseur.execute("""
+        UPDATE picture_video SET phash = ? WHERE id = ?
+    """, (phash, id))
+
+    connexion.commit()
+
+def insert_sql_hashes(id, hashes:dict, curseur = curseur_loc, connexion = connexion_loc):
+    logger.debug(f"Enregistrement des empreintes de {id} : {list(hashes)}")
+    curseur.executemany("""
+        INSERT OR REPLACE INTO image_hash (id, algo, taille, valeur) VALUES (?, ?, ?, ?)
+    """, [(id, algo, taille, valeur) for algo, (taille, valeur) in hashes.items()])
+
+    connexion.commit()
+
+def recup_hashes(curseur = curseur_loc):
+    logger.debug("Récupération des empreintes par algorithme")
+    curseur.execute("""
+        SELECT h.id, h.algo, h.taille, h.valeur
+        FROM image_hash h
+        JOIN picture_video p ON p.id = h.id
+    """)
+
+    # ID -> {algorithme: (taille, valeur hexadécimale)}
+    resultat = {}
+
+    for id, algo, taille, valeur in curseur.fetchall():
+        resultat.setdefault(id, {})[algo] = (taille, valeur)
+
+    logger.info(f"Récupéré les empreintes de {len(resultat)} fichiers")
+
+    return resultat
+
+def insert_sql_phash_queue(id, ctag, miniatures, curseur = curseur_loc, connexion = connexion_loc):
+    logger.debug(f"Hash perceptuel de {id} mis en file")
+    curseur.execute("""
+        INSERT OR REPLACE INTO phash_queue (id, ctag, miniatures) VALUES (?, ?, ?)
+    """, (id, ctag, json.dumps(miniatures) if miniatures else None))
 
     connexion.commit()
 
+def recup_phash_queue(limite:int, curseur = curseur_loc):
+    # Les fichiers qui partagent leur taille ou leurs dimensions avec d'autres passent en premier
+    curseur.execute("""
+        WITH tailles AS (
+            SELECT size, COUNT(*) AS n FROM picture_video GROUP BY size
+        ), dimensions AS (
+            SELECT width, height, COUNT(*) AS n FROM picture_video
+            WHERE width IS NOT NULL GROUP BY width, height
+        )
+        SELECT q.id, q.ctag, q.miniatures, p.type
+        FROM phash_queue q
+        JOIN picture_video p ON p.id = q.id
+        LEFT JOIN tailles t ON t.size = p.size
+        LEFT JOIN dimensions d ON d.width = p.width AND d.height = p.height
+        ORDER BY MAX(COALESCE(t.n, 1), COALESCE(d.n, 1)) DESC, p.width, p.height, p.size
+        LIMIT ?
+    """, (limite,))
+    resultat = [(id, ctag, json.loads(miniatures) if miniatures else None, type) for id, ctag, miniatures, type in curseur.fetchall()]
+    logger.debug(f"Récupéré {len(resultat)} fichiers à hacher")
+
+    return resultat
+
+def delete_sql_phash_queue(id, curseur = curseur_loc, connexion = connexion_loc):
+    curseur.execute("""
+        DELETE FROM phash_queue WHERE id = ?
+    """, (id,))
+
+    connexion.commit()
+
+def nettoie_phash_queue(curseur = curseur_loc, connexion = connexion_loc):
+    # Les entrées dont le fichier a disparu du catalogue ne sont plus à traiter
+    curseur.execute("""
+        DELETE FROM phash_queue WHERE id NOT IN (SELECT id FROM picture_video)
+    """)
+    file = curseur.rowcount
+    curseur.execute("""
+        DELETE FROM image_hash WHERE id NOT IN (SELECT id FROM picture_video)
+    """)
+    empreintes = curseur.rowcount
+    connexion.commit()
+
+    logger.debug(f"Nettoyage : {file} entrées de la file et {empreintes} empreintes orphelines supprimées")
+
+def compte_phash_queue(curseur = curseur_loc):
+    # Lecture seule : les entrées orphelines ne sont pas comptées (voir nettoie_phash_queue)
+    curseur.execute("""
+        SELECT COUNT(*) FROM phash_queue q JOIN picture_video p ON p.id = q.id
+    """)
+
+    return curseur.fetchone()[0]
+
 def insert_sql_empty_folder(object, curseur, connexion):
     id = object.get('id')
     name = object.get('name')
@@ -36,7 +171,7 @@ def insert_sql_empty_folder(object, curseur, connexion):
 
     logger.debug(f"Insertion SQL dans empty_folder: {name} (ID: {id})")
     curseur.execute("""
-        INSERT INTO empty_folder (
+        INSERT OR REPLACE INTO empty_folder (
             id, name, size, path
         ) VALUES (?, ?, ?, ?)
     """, (id, name, size, path))
@@ -61,10 +196,104 @@ def delete_sql(curseur = curseur_loc, connexion = connexion_loc):
     curseur.execute("""
         DELETE FROM empty_folder;
     """)
+    # Sans catalogue, le jeton delta et l'arborescence connue n'ont plus de sens
+    curseur.execute("""
+        DELETE FROM delta_state;
+    """)
+    curseur.execute("""
+        DELETE FROM delta_folder;
+    """)
+    curseur.execute("""
+        DELETE FROM phash_queue;
+    """)
+    curseur.execute("""
+        DELETE FROM image_hash;
+    """)
 
     connexion.commit()
     logger.debug("Base de données vidée avec succès")
 
+def delete_sql_item(id, curseur = curseur_loc, connexion = connexion_loc):
+    logger.debug(f"Suppression SQL de l'élément {id}")
+    curseur.execute("""
+        DELETE FROM picture_video WHERE id = ?
+    """, (id,))
+    curseur.execute("""
+        DELETE FROM empty_folder WHERE id = ?
+    """, (id,))
+    curseur.execute("""
+        DELETE FROM phash_queue WHERE id = ?
+    """, (id,))
+    curseur.execute("""
+        DELETE FROM image_hash WHERE id = ?
+    """, (id,))
+
+    connexion.commit()
+
+def delete_sql_path(path, curseur = curseur_loc, connexion = connexion_loc):
+    logger.debug(f"Suppression SQL du contenu de {path}")
+    for table in ("picture_video", "empty_folder"):
+        curseur.execute(f"""
+            DELETE FROM {table} WHERE path = ? OR path LIKE ? ESCAPE '\\'
+        """, (path, like_prefixe(path)))
+
+    connexion.commit()
+
+def update_sql_path(ancien, nouveau, curseur = curseur_loc, connexion = connexion_loc):
+    logger.debug(f"Chemin déplacé : {ancien} -> {nouveau}")
+    for table in ("picture_video", "empty_folder"):
+        curseur.execute(f"""
+            UPDATE {table} SET path = ? || substr(path, ?)
+            WHERE path = ? OR path LIKE ? ESCAPE '\\'
+        """, (nouveau, len(ancien) + 1, ancien, like_prefixe(ancien)))
+
+    connexion.commit()
+
+def like_prefixe(path):
+    # Motif LIKE des sous-dossiers de path, caractères spéciaux échappés
+    echappe = path.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    return f"{echappe}/%"
+
+def recup_delta_link(curseur = curseur_loc):
+    curseur.execute("""
+        SELECT valeur FROM delta_state WHERE cle = 'delta_link'
+    """)
+    resultat = curseur.fetchone()
+
+    return resultat[0] if resultat else None
+
+def insert_sql_delta_link(lien, curseur = curseur_loc, connexion = connexion_loc):
+    logger.debug("Enregistrement du jeton delta")
+    curseur.execute("""
+        INSERT OR REPLACE INTO delta_state (cle, valeur) VALUES ('delta_link', ?)
+    """, (lien,))
+
+    connexion.commit()
+
+def recup_delta_folder(curseur = curseur_loc):
+    curseur.execute("""
+        SELECT id, name, parent_id FROM delta_folder
+    """)
+    resultat = curseur.fetchall()
+    logger.info(f"Récupéré {len(resultat)} dossiers de la synchronisation delta")
+
+    return resultat
+
+def insert_sql_delta_folder(id, name, parent_id, curseur = curseur_loc, connexion = connexion_loc):
+    curseur.execute("""
+        INSERT OR REPLACE INTO delta_folder (id, name, parent_id) VALUES (?, ?, ?)
+    """, (id, name, parent_id))
+
+    connexion.commit()
+
+def delete_sql_delta_folder(ids, curseur = curseur_loc, connexion = connexion_loc):
+    curseur.executemany("""
+        DELETE FROM delta_folder WHERE id = ?
+    """, [(id,) for id in ids])
+
+    connexion.commit()
+
 def tri_doublons(sort_by:str, out:str = None, curseur = curseur_loc):
     if not out:
         out = sort_by
@@ -100,13 +329,25 @@ def recup_phash(curseur = curseur_loc):
     curseur.execute("""
         SELECT name, type, size, id, phash, path 
         FROM picture_video 
-        WHERE phash IS NOT NULL AND phash != ''   
+        WHERE phash IS NOT NULL AND phash != '' AND type NOT LIKE 'video/%'
     """)
     resultat = curseur.fetchall()
     logger.info(f"Récupéré {len(resultat)} fichiers avec hash perceptuel, {resultat}")
 
     return resultat
 
+def recup_videos(curseur = curseur_loc):
+    logger.debug("Récupération des empreintes vidéo")
+    curseur.execute("""
+        SELECT name, type, size, id, path, duration, width, height, bitrate
+        FROM picture_video
+        WHERE type LIKE 'video/%'
+    """)
+    resultat = curseur.fetchall()
+    logger.info(f"Récupéré {len(resultat)} vidéos")
+
+    return resultat
+
 def recup_folder(curseur = curseur_loc):
     logger.debug("Récupération des hashes perceptuels")
     curseur.execute("""
@@ -130,9 +371,23 @@ curseur_loc.execute("""
         createdDateTime TEXT,
         lastModifiedDateTime TEXT,
         phash TEXT,
-        path TEXT
+        path TEXT,
+        width INTEGER,
+        height INTEGER,
+        duration INTEGER,
+        bitrate INTEGER,
+        ctag TEXT
     )
 """)
+
+# Bases créées avant l'ajout des dimensions, de la facette vidéo et du cTag
+colonnes = [colonne[1] for colonne in curseur_loc.execute("PRAGMA table_info(picture_video)").fetchall()]
+
+for colonne, type_colonne in (("width", "INTEGER"), ("height", "INTEGER"), ("duration", "INTEGER"), ("bitrate", "INTEGER"), ("ctag", "TEXT")):
+    if colonne not in colonnes:
+        logger.info(f"Ajout de la colonne {colonne} à picture_video")
+        curseur_loc.execute(f"ALTER TABLE picture_video ADD COLUMN {colonne} {type_colonne}")
+
 curseur_loc.execute("""
     CREATE TABLE IF NOT EXISTS empty_folder (
         id TEXT PRIMARY KEY,
@@ -141,5 +396,34 @@ curseur_loc.execute("""
         path TEXT
     )
 """)
+curseur_loc.execute("""
+    CREATE TABLE IF NOT EXISTS phash_queue (
+        id TEXT PRIMARY KEY,
+        ctag TEXT,
+        miniatures TEXT
+    )
+""")
+curseur_loc.execute("""
+    CREATE TABLE IF NOT EXISTS image_hash (
+        id TEXT,
+        algo TEXT,
+        taille INTEGER,
+        valeur TEXT,
+        PRIMARY KEY (id, algo)
+    )
+""")
+curseur_loc.execute("""
+    CREATE TABLE IF NOT EXISTS delta_state (
+        cle TEXT PRIMARY KEY,
+        valeur TEXT
+    )
+""")
+curseur_loc.execute("""
+    CREATE TABLE IF NOT EXISTS delta_folder (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        parent_id TEXT
+    )
+""")
 connexion_loc.commit()
 logger.debug("Table picture_video créée ou vérifiée")
\ No newline at end of file
@@ -0,0 +1,220 @@
+# telechargement.py
+
+# ===============
+# === IMPORTS ===
+# ===============
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import requests
+
+from .graph import GraphClient, limiteur
+from .logger import connecteLogger
+
+# ==============
+# === LOGGER ===
+# ==============
+logger = connecteLogger(__name__)
+
+# ==================
+# === PARAMÈTRES ===
+# ==================
+CONCURRENCE_TELECHARGEMENT = 16 # Miniatures téléchargées simultanément
+BUDGET_OCTETS = 64 * 1024 * 1024 # Octets de miniatures en cours de réception ou en attente de traitement
+TAILLE_ESTIMEE = 256 * 1024 # Réservation d'une miniature dont la taille n'est pas annoncée
+TAILLE_BLOC = 64 * 1024 # Taille des blocs lus sur la connexion
+
+class BudgetOctets:
+    """
+    Budget d'octets partagé par les téléchargements en cours.
+
+    Une réservation attend que le total reste sous le maximum ; une réservation
+    seule est toujours acceptée pour qu'une miniature plus grosse que le
+    budget ne bloque pas indéfiniment.
+
+    Attributes:
+        maximum (int): Octets réservables simultanément
+        utilise (int): Octets actuellement réservés
+    """
+    def __init__(self, maximum:int = BUDGET_OCTETS):
+        self.maximum = maximum
+        self.utilise = 0
+        self._condition = threading.Condition()
+
+    def reserver(self, octets:int):
+        """
+        Réserve des octets, en attendant que le budget le permette.
+        """
+        with self._condition:
+            while self.utilise and self.utilise + octets > self.maximum:
+                self._condition.wait()
+
+            self.utilise += octets
+
+    def ajuster(self, octets:int):
+        """
+        Ajoute des octets à une réservation existante sans attendre (taille réelle supérieure à l'estimation).
+        """
+        with self._condition:
+            self.utilise += octets
+
+    def liberer(self, octets:int):
+        """
+        Rend des octets au budget et réveille les réservations en attente.
+        """
+        with self._condition:
+            self.utilise -= octets
+            self._condition.notify_all()
+
+class TelechargeurMiniatures:
+    """
+    Étage de téléchargement des miniatures.
+
+    Les téléchargements s'exécutent dans un pool de threads dédié, sur une
+    session HTTP distincte de celle des appels Graph, avec CONCURRENCE_TELECHARGEMENT
+    connexions. Le volume des miniatures en cours de réception ou en attente
+    de traitement est borné par un BudgetOctets : une tâche ne rend ses octets
+    qu'une fois la miniature remise à l'étape suivante (cache, hachage).
+
+    Attributes:
+        concurrence (int): Téléchargements simultanés
+        budget (BudgetOctets): Budget d'octets en vol
+        client (GraphClient): Client HTTP dédié aux miniatures, sous le limiteur partagé avec Graph
+    """
+    def __init__(self, concurrence:int = CONCURRENCE_TELECHARGEMENT, budget:int = BUDGET_OCTETS):
+        """
+        Args:
+            concurrence (int): Téléchargements simultanés
+            budget (int): Octets en vol au maximum
+        """
+        self.concurrence = max(1, concurrence)
+        self.budget = BudgetOctets(budget)
+        # Pool de connexions dédié, mais même budget de concurrence que le reste du trafic Graph
+        self.client = GraphClient(workers = self.concurrence, limiteur = limiteur)
+        self._executeur = ThreadPoolExecutor(max_workers = self.concurrence, thread_name_prefix = "miniatures")
+
+        self._lock = threading.Lock()
+        self.octets = 0
+        self.elements = 0
+        self.echecs = 0
+        self.debut = None
+
+    def soumettre(self, tache, *args):
+        """
+        Exécute une tâche de téléchargement dans le pool dédié.
+
+        Args:
+            tache (callable): Fonction utilisant reception() pour ses téléchargements
+            *args: Arguments de la tâche
+
+        Returns:
+            Future: Futur du résultat de la tâche
+        """
+        return self._executeur.submit(tache, *args)
+
+    @contextmanager
+    def reception(self, url:str):
+        """
+        Télécharge une miniature dans le budget d'octets.
+
+        Les octets restent réservés jusqu'à la sortie du bloc with : la
+        miniature doit y être remise à l'étape suivante.
+
+        Args:
+            url (str): URL pré-authentifiée de la miniature
+
+        Yields:
+            bytes: Contenu de la miniature, None en cas d'erreur
+        """
+        if not url:
+            yield None
+            return
+
+        reservation = [TAILLE_ESTIMEE] # Octets réservés par ce téléchargement
+        self.budget.reserver(TAILLE_ESTIMEE)
+
+        try:
+            yield self._telecharger(url, reservation)
+
+        finally:
+            self.budget.liberer(reservation[0])
+
+    def _telecharger(self, url, reservation):
+        """
+        Lit une miniature par blocs en ajustant la réservation à sa taille réelle.
+        """
+        with self._lock:
+            if self.debut is None:
+                self.debut = time.monotonic()
+
+        try:
+            response = self.client.request("get", url, stream = True)
+
+        except requests.RequestException as e:
+            logger.error(f"ERREUR de téléchargement : {e}")
+            self._compter(0, False)
+            return None
+
+        with response:
+            if response.status_code != 200:
+                logger.error(f"ERREUR de téléchargement {response.status_code} - URL: {url}")
+                self._compter(0, False)
+                return None
+
+            contenu = bytearray()
+
+            try:
+                for bloc in response.iter_content(TAILLE_BLOC):
+                    contenu += bloc
+
+                    if len(contenu) > reservation[0]:
+                        self.budget.ajuster(len(contenu) - reservation[0])
+                        reservation[0] = len(contenu)
+
+            except requests.RequestException as e:
+                logger.error(f"ERREUR de téléchargement : {e}")
+                self._compter(0, False)
+                return None
+
+        self._compter(len(contenu), True)
+
+        return bytes(contenu)
+
+    def _compter(self, octets, reussi):
+        """
+        Met à jour les compteurs de débit.
+        """
+        with self._lock:
+            self.octets += octets
+            self.elements += 1 if reussi else 0
+            self.echecs += 0 if reussi else 1
+
+    def remise_a_zero(self):
+        """
+        Remet les compteurs de débit à zéro (début d'un parcours).
+        """
+        with self._lock:
+            self.octets = 0
+            self.elements = 0
+            self.echecs = 0
+            self.debut = None
+
+    def stats(self):
+        """
+        Retourne les compteurs de l'étage (octets, miniatures, débits par seconde).
+        """
+        with self._lock:
+            duree = time.monotonic() - self.debut if self.debut else 0.0
+
+            return {
+                'octets': self.octets,
+                'miniatures': self.elements,
+                'echecs': self.echecs,
+                'octets_par_s': self.octets / duree if duree else 0.0,
+                'miniatures_par_s': self.elements / duree if duree else 0.0,
+                'en_vol': self.budget.utilise
+            }
+
+telechargeur = TelechargeurMiniatures()
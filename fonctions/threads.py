@@ -13,10 +13,12 @@ from PyQt5.QtGui import QPixmap
 # Système et utilitaires
 import sys
 from io import BytesIO, StringIO
-import requests
 import time
 import traceback
+import heapq
+import zlib
 import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
 
 # Correction des flux standards pour PyInstaller
@@ -31,12 +33,20 @@ if sys.stdin is None:
 
 # Traitement d'images et détection de doublons
 import imagehash
+import numpy
 from PIL import Image
 from itertools import combinations
 
 # Modules locaux
 from widgets import *
 from fonctions.graph import *
+from fonctions.cache_listing import cache_listing, iter_batch_children_cache, validateur, AGE_MAX_CACHE
+from fonctions.cache_miniatures import cache_miniatures, miniature
+from fonctions.hachage import pool_hachage, hash_depuis_hex, bits_hash, TAILLE_HASH
+from fonctions.hamming import matrice, tuiles, nombre_tuiles, planifier, paires_index
+from fonctions.comparaison import Empreintes, pool_comparaison
+from fonctions.graphe_distances import graphe_distances, version_catalogue, revoter, SEUIL_GRAPHE, VOTANTS
+from fonctions.telechargement import telechargeur
 from fonctions.logger import connecteLogger
 from fonctions.sql import *
 
@@ -45,6 +55,61 @@ from fonctions.sql import *
 # ==============
 logger = connecteLogger(__name__)
 
+# Nombre de fois qu'un dossier en échec est remis en fin de file
+RELANCES_DOSSIER = 2
+
+# Nombre de workers du mode de parcours parallèle
+WORKERS_PARCOURS = NOMBRE_WORKERS
+
+# Champs demandés pour chaque élément lors du parcours
+SELECT_PARCOURS = ["name", "folder", "id", "file", "size", "createdDateTime", "lastModifiedDateTime", "parentReference", "eTag", "cTag", "image", "video"]
+
+# Rendu de miniature utilisé pour le hash perceptuel (small : 96 px, quelques Ko)
+MINIATURE_HASH = "small"
+
+# Rendu de miniature affiché dans l'aperçu en direct
+MINIATURE_APERCU = "large"
+
+# Secondes minimales entre deux aperçus : les autres grandes miniatures ne sont pas téléchargées
+INTERVALLE_APERCU = 0.5
+
+# Types de fichiers dont la miniature est hachée (file phash_queue)
+TYPES_HACHES = ["Images", "Videos"]
+
+# Nombre d'entrées de la file des hash traitées avant de demander les suivantes
+TAILLE_LOT_HACHAGE = 200
+
+# Modes de la recherche visuelle : toutes les paires proches, cascade 64 puis 256 bits, ou toutes les recherches mesurées
+MODES_VISUEL = ["Exhaustif", "Cascade", "Comparaison"]
+
+# Marge appliquée au seuil rapporté aux hash 64 bits (leur distance est plus bruitée)
+MARGE_CASCADE = 2.0
+
+# Seuil minimal du premier étage de la cascade, en bits
+SEUIL_CASCADE_MIN = 4
+
+# Doublons visuels émis ensemble vers l'interface
+TAILLE_LOT_DOUBLONS = 200
+
+# Lots de doublons visuels émis mais pas encore affichés : au-delà, la recherche attend l'interface
+LOTS_DOUBLONS_EN_ATTENTE = 4
+
+# Doublons de la force brute gardés pour l'affichage en mode Comparaison (les autres ne sont que comptés)
+DOUBLONS_COMPARAISON = 5000
+
+# Paires de la force brute tirées au hasard pour mesurer le rappel en mode Comparaison
+ECHANTILLON_RAPPEL = 10000
+
+# Écart de durée toléré entre deux vidéos candidates : relatif (copies coupées) et absolu (ms)
+TOLERANCE_DUREE = 0.05
+MARGE_DUREE = 2000
+
+# Écart relatif toléré entre les formats (largeur/hauteur) de deux vidéos candidates
+TOLERANCE_FORMAT = 0.01
+
+# URLs des miniatures incluses dans les listings quand la prévisualisation est active
+EXPAND_MINIATURES = f"thumbnails($select={MINIATURE_HASH},{MINIATURE_APERCU})"
+
 # ===============
 # === THREADS ===
 # ===============
@@ -66,6 +131,8 @@ class ParcoursPhotos(QObject):
         token (str): Token d'authentification Microsoft Graph API
         max_child (int): Nombre maximum d'enfants par dossier à traiter
         prev (bool): Active/désactive la génération de prévisualisations
+        taille_page (int): Nombre d'éléments par page de listing ($top)
+        workers (int): Nombre de lots de dossiers listés simultanément
         _pause_event (threading.Event): Contrôle la pause du traitement
         _stop_event (threading.Event): Contrôle l'arrêt du traitement
     """
@@ -73,7 +140,7 @@ class ParcoursPhotos(QObject):
     image_ready = pyqtSignal(bytes)
     finished = pyqtSignal()
 
-    def __init__(self, token:str, types:list, prev:bool):
+    def __init__(self, token:str, types:list, prev:bool, taille_page:int = TAILLE_PAGE, workers:int = 1, age_cache:float = AGE_MAX_CACHE):
         """
         Initialise le worker de parcours des photos OneDrive.
         
@@ -81,12 +148,20 @@ class ParcoursPhotos(QObject):
             token (str): Token d'authentification pour l'API Microsoft Graph
             types (list): Les types de médias à détecter
             prev (bool): Active la génération de prévisualisations et hash perceptuels
+            taille_page (int): Nombre d'éléments demandés par page de listing ($top)
+            workers (int): Nombre de lots de dossiers listés simultanément
+            age_cache (float): Âge maximal des listings servis depuis le cache en secondes, 0 pour toujours relister
         """
         super().__init__()
         self.token = token # Token d'authentification Microsoft Graph
         self.types = types # Les types de médias à détecter
         self.prev = prev # Previsualisation des images activé TRUE/FALSE
-        self.cache_empty = []
+        self.taille_page = taille_page # Taille des pages de listing
+        self.workers = max(1, workers) # Nombre de workers de listing
+        self.cache_empty = set() # Dossiers déjà sondés par folders_are_empty
+        self.versions = {} # ID de dossier -> version vue dans le listing parent (cache des listings)
+        self.age_cache = age_cache # Ancienneté maximale d'un listing en cache (voir cache_listing.validateur)
+        self.expand = EXPAND_MINIATURES if prev else None # Miniatures demandées avec les listings
         
         # Événements de contrôle pour pause/arrêt
         self._pause_event = threading.Event()
@@ -124,25 +199,40 @@ class ParcoursPhotos(QObject):
 
         # Liste des IDs de dossiers à traiter
         self.list_id = []
+        self.nombre_dossiers = 0 # Dossiers découverts, sans compter les relances
+        self.dossiers_vus = set() # Évite de lister deux fois un dossier relancé
+        self.relances = {} # Nombre de relances par dossier en échec
         
         # Configuration de l'appel API initial (dossiers racine)
         endpoint = "me/drive/root/children/"
-        select = ["name", "folder", "id", "file", "size", "createdDateTime", "lastModifiedDateTime", "parentReference"]
+        select = SELECT_PARCOURS
 
         logger.info("Appel API pour récupérer les dossiers racine")
 
-        data = call_web_api(endpoint, self.token, select)
+        # Les éléments arrivent page par page (@odata.nextLink suivi automatiquement)
+        try:
+            items = iter_children(endpoint, self.token, select, self.taille_page, expand = self.expand)
+
+            # Traitement des dossiers racine
+            add_list_id = self.folder_list(items)
 
-        if not data:
-            logger.error(f"Erreur lors de l'appel API dossier {id}: {e}\n{traceback.format_exc()}")
+        except GraphError as e:
+            logger.error(f"Erreur lors de l'appel API des dossiers racine: {e}")
+            self.progression.emit("Impossible de lister la racine du OneDrive, réessayez plus tard")
+            self.end()
+            return
 
-        # Traitement des dossiers racine
-        add_list_id = self.folder_list(data)
-        self.list_id += add_list_id
+        self.ajout_dossiers(add_list_id)
         logger.info(f"Nombre de dossiers trouvés au niveau racine : {len(add_list_id)}")
 
-        # Parcours récursif de tous les dossiers trouvés
-        for id in self.list_id:
+        # Parcours en largeur : les lots de dossiers sont listés par le pool de workers,
+        # leurs éléments sont enregistrés ici, dans le seul thread qui écrit en base
+        index = 0
+        en_cours = {} # Futur -> lot de dossiers en cours de listing
+        executeur = ThreadPoolExecutor(max_workers = self.workers, thread_name_prefix = "parcours")
+
+        try:
+            while index < len(self.list_id) or en_cours:
                 # Vérification des événements de contrôle
                 self._pause_event.wait()  # Attend si en pause
 
@@ -150,23 +240,134 @@ class ParcoursPhotos(QObject):
                     logger.info("Arrêt demandé par l'utilisateur")
                     break
 
-                # Traitement du dossier courant
-                endpoint = f"/me/drive/items/{id}/children"
-                logger.debug(f"Traitement du dossier ID: {id}")
+                # Alimentation des workers libres, le reste de la file étant réparti entre eux
+                while index < len(self.list_id) and len(en_cours) < self.workers:
+                    restant = len(self.list_id) - index
+                    libres = self.workers - len(en_cours)
+                    taille = min(TAILLE_BATCH, -(-restant // libres))
+
+                    lot = self.list_id[index:index + taille]
+                    index += len(lot)
+                    logger.debug(f"Traitement d'un lot de {len(lot)} dossiers")
+                    en_cours[executeur.submit(self.lister_lot, lot)] = lot
 
-                data = call_web_api(endpoint, self.token, select)
+                termines, _ = wait(en_cours, return_when = FIRST_COMPLETED)
 
-                if not data:
-                    logger.error(f"Erreur lors de l'appel API dossier {id}: {e}\n{traceback.format_exc()}")
+                for futur in termines:
+                    lot = en_cours.pop(futur)
 
-                # Ajout des nouveaux dossiers trouvés à la liste
-                add_id = self.folder_list(data)
-                self.list_id += add_id
+                    try:
+                        resultats = futur.result()
 
-        logger.info(f"Parcours terminé - Total de dossiers traités : {len(self.list_id)}")
+                    except Exception as e:
+                        logger.error(f"Erreur du worker de parcours: {e}\n{traceback.format_exc()}")
+                        resultats = [(id, None, set()) for id in lot]
+
+                    for id, items, vides in resultats:
+                        if self._stop_event.is_set():
+                            break
+
+                        if items is None:
+                            self.relance_dossier(id)
+                            continue
+
+                        # Ajout des nouveaux dossiers trouvés à la liste
+                        list_id, a_sonder = self.traiter_elements(items)
+                        self.ajout_dossiers(list_id + self.resoudre_sondes(a_sonder, vides))
+
+        finally:
+            executeur.shutdown(wait = False, cancel_futures = True)
+
+        logger.info(f"Parcours terminé - Total de dossiers traités : {self.nombre_dossiers}")
         self.end()
 
-    def folder_list(self, data):
+    def lister_lot(self, lot):
+        """
+        Tâche d'un worker : liste un lot de dossiers et sonde leurs petits sous-dossiers.
+
+        Seules des requêtes réseau sont faites ici ; l'enregistrement en base est
+        laissé au thread du parcours.
+
+        Args:
+            lot (list): IDs des dossiers à lister (au plus TAILLE_BATCH)
+
+        Returns:
+            list: Tuples (folder_id, éléments ou None si échec, IDs des sous-dossiers vides)
+        """
+        resultats = []
+
+        # Un seul aller-retour /$batch pour les dossiers du lot absents du cache
+        for id, items in iter_batch_children_cache(lot, self.token, SELECT_PARCOURS, self.taille_page, self.versions, self.expand, age_max = self.age_cache):
+            if self._stop_event.is_set():
+                break
+
+            if items is None:
+                resultats.append((id, None, set()))
+                continue
+
+            try:
+                items = list(items)
+                a_sonder = [object.get('id') for object in items if self.est_a_sonder(object)]
+                vides = self.folders_are_empty(a_sonder) if a_sonder else set()
+
+            except GraphError as e:
+                logger.error(f"Listing incomplet du dossier {id}: {e}")
+                resultats.append((id, None, set()))
+                continue
+
+            resultats.append((id, items, vides))
+
+        return resultats
+
+    def est_a_sonder(self, object):
+        """
+        Indique si un élément est un dossier à vérifier avec folders_are_empty.
+
+        Seuls les dossiers avec peu d'enfants sont sondés, et uniquement si les
+        dossiers vides font partie des types détectés.
+        """
+        if not object.get('folder') or "Empty Folder" not in self.types:
+            return False
+
+        child = object.get('folder').get('childCount')
+
+        return child != 0 and child < 5
+
+    def ajout_dossiers(self, ids):
+        """
+        Ajoute à la file de parcours les dossiers qui n'y sont pas encore.
+
+        Args:
+            ids (list): IDs des dossiers découverts
+        """
+        for id in ids:
+            if id not in self.dossiers_vus:
+                self.dossiers_vus.add(id)
+                self.list_id.append(id)
+                self.nombre_dossiers += 1
+
+    def relance_dossier(self, id):
+        """
+        Remet en fin de file un dossier dont le listing a échoué.
+
+        Le parcours continue avec les autres dossiers : le dossier est relancé
+        plus tard, au plus RELANCES_DOSSIER fois, avant d'être abandonné. Il
+        n'est compté qu'une fois dans nombre_dossiers.
+
+        Args:
+            id (str): ID du dossier en échec
+        """
+        self.relances[id] = self.relances.get(id, 0) + 1
+
+        if self.relances[id] <= RELANCES_DOSSIER:
+            logger.warning(f"Listing du dossier {id} en échec, relance {self.relances[id]}/{RELANCES_DOSSIER} en fin de parcours")
+            self.list_id.append(id)
+
+        else:
+            logger.error(f"Erreur lors de l'appel API dossier {id}, dossier abandonné")
+            self.progression.emit(f"Dossier ignoré après {RELANCES_DOSSIER} relances : {id}\n")
+
+    def folder_list(self, items):
         """
         Traite les éléments d'un dossier OneDrive et détermine lesquels traiter.
         
@@ -176,16 +377,37 @@ class ParcoursPhotos(QObject):
         - Sinon: ignore l'élément
         
         Args:
-            data (dict): Réponse JSON de l'API Microsoft Graph contenant les éléments du dossier
+            items (iterable): Éléments du dossier renvoyés par l'API Microsoft Graph,
+                              toutes pages confondues (voir iter_children)
             
         Returns:
             list: Liste des IDs de dossiers à traiter récursivement
         """
+        list_id, a_sonder = self.traiter_elements(items)
+
+        # Les dossiers avec peu d'enfants sont sondés ensemble via /$batch
+        if a_sonder and not self._stop_event.is_set():
+            vides = self.folders_are_empty([object.get('id') for object in a_sonder])
+            list_id += self.resoudre_sondes(a_sonder, vides)
+
+        return list_id
+
+    def traiter_elements(self, items):
+        """
+        Enregistre les fichiers d'un dossier et trie ses sous-dossiers.
+
+        Args:
+            items (iterable): Éléments du dossier renvoyés par l'API Microsoft Graph
+
+        Returns:
+            tuple: (IDs des dossiers à parcourir, objets dossiers à sonder avec folders_are_empty)
+        """
         list_id = []
+        a_sonder = [] # Dossiers à vérifier avec folders_are_empty
 
-        if data:
-            # Parcours de chaque élément retourné par l'API
-            for object in data.get('value', []):
+        if items:
+            # Parcours de chaque élément retourné par l'API, page après page
+            for object in items:
                 # Vérification des événements de contrôle
                 self._pause_event.wait()
 
@@ -205,24 +427,21 @@ class ParcoursPhotos(QObject):
                 # Traitement des dossiers
                 if object.get('folder'):
                     child = object.get('folder').get('childCount')
-
-                    def emtpy_folder_treatment():
-                        insert_sql_empty_folder(object, self.curseur, self.connexion)
-                        self.progression.emit((f"NE CONTIENT AUCUN ENFANT : \n\nNom : {name} | ID : {id} | Type : {type} | Chemin : {path}/{name}\n"))
-                        logger.info(f"{name} ne contient aucun enfant")
+                    self.versions[id] = validateur(object)
 
                     # Seulement les dossiers avec un nombre raisonnable d'enfants
                     if "Empty Folder" in self.types:
                         if child != 0:
-                            if child < 5 and self.folder_is_empty(id):
-                                emtpy_folder_treatment()
+                            if self.est_a_sonder(object):
+                                # Sondage groupé en fin de dossier (voir folders_are_empty)
+                                a_sonder.append(object)
 
                             else:
                                 logger.info(f"Nom : {name} | ID : {id} | Childs : {child}\n")
                                 list_id.append(id)
 
                         elif child == 0 :
-                            emtpy_folder_treatment()
+                            self.empty_folder_treatment(object)
 
                     else:
                         logger.info(f"Nom : {name} | ID : {id} | Childs : {child}\n")
@@ -230,28 +449,67 @@ class ParcoursPhotos(QObject):
 
                 # Traitement des fichiers images/vidéos/document
                 elif object.get('file') and type in self.types:
-                    phash = None
-
-                    if type:
-                        # Génération du hash perceptuel si prévisualisation activée
-                        if self.prev:
-                            try:
-                                phash = self.preview(id, type)
-                                logger.debug("La prévisualisation a fonctionné")
-
-                            except Exception as e:
-                                logger.error(f"La prévisualisation de {name} n'a pas fonctionné : {e}")
-
                     # Émission du signal de progression avec les détails du fichier
                     self.progression.emit((f"Nom : {name} | ID : {id} | Type : {type} | Chemin : {path}/{name}\n"))
                     
                     # Enregistrement en base de données
-                    insert_sql(object, self.curseur, self.connexion, phash)
+                    insert_sql(object, self.curseur, self.connexion, None)
+
+                    # Le hash perceptuel est calculé après le parcours (voir HachageDiffere)
+                    if self.prev and type in TYPES_HACHES:
+                        self.mise_en_file(object)
 
                 else:
                     logger.info(f"{name} n'est ni une photo ni une vidéo")
 
+        return list_id, a_sonder
+
+    def mise_en_file(self, object):
+        """
+        Inscrit une image dans la file des hash perceptuels à calculer.
+
+        Args:
+            object (dict): Objet fichier de l'API Microsoft Graph
+        """
+        insert_sql_phash_queue(object.get('id'), object.get('cTag'), object.get('thumbnails'), self.curseur, self.connexion)
+
+    def resoudre_sondes(self, a_sonder, vides):
+        """
+        Enregistre les dossiers sondés vides et renvoie les autres pour parcours.
+
+        Args:
+            a_sonder (list): Objets dossiers sondés
+            vides (set): IDs des dossiers reconnus vides
+
+        Returns:
+            list: IDs des dossiers à parcourir
+        """
+        list_id = []
+
+        for object in a_sonder:
+            if object.get('id') in vides:
+                self.empty_folder_treatment(object)
+
+            else:
+                logger.info(f"Nom : {object.get('name')} | ID : {object.get('id')} | Childs : {object.get('folder').get('childCount')}\n")
+                list_id.append(object.get('id'))
+
         return list_id
+
+    def empty_folder_treatment(self, object):
+        """
+        Enregistre un dossier vide en base et l'affiche dans la progression.
+
+        Args:
+            object (dict): Objet dossier de l'API Microsoft Graph
+        """
+        name = object.get('name')
+        id = object.get('id')
+        path = object.get('parentReference').get('path')
+
+        insert_sql_empty_folder(object, self.curseur, self.connexion)
+        self.progression.emit((f"NE CONTIENT AUCUN ENFANT : \n\nNom : {name} | ID : {id} | Type :  | Chemin : {path}/{name}\n"))
+        logger.info(f"{name} ne contient aucun enfant")
     
     def is_picture_video_document(self, object):
         """
@@ -271,7 +529,7 @@ class ParcoursPhotos(QObject):
             return "Images"
         
         elif mime_type.startswith("video/") == True:
-            return "Vidéos"
+            return "Videos"
         
         elif mime_type.startswith("application/") == True:
             return "Documents"
@@ -279,115 +537,115 @@ class ParcoursPhotos(QObject):
         else:
             return None
         
-    def folder_is_empty(self, folder_id):
+    def folders_are_empty(self, folder_ids):
         """
-        Vérifie récursivement si un dossier ne contient que des dossiers vides.
-        
+        Vérifie récursivement quels dossiers ne contiennent que des dossiers vides.
+
+        Les dossiers sont sondés niveau par niveau : tous les listings d'un même
+        niveau partent ensemble dans des requêtes /$batch.
+
         Args:
-            folder_id (str): ID du dossier à vérifier
-            
+            folder_ids (list): IDs des dossiers à vérifier
+
         Returns:
-            bool: True si le dossier est effectivement vide (ne contient que des dossiers vides), False sinon
+            set: IDs des dossiers effectivement vides (ne contenant que des dossiers vides)
         """
-        if folder_id in self.cache_empty:
-            return False
-        
-        else:
-            self.cache_empty.append(folder_id)
-            endpoint = f"/me/drive/items/{folder_id}/children"
-            select = ["name", "folder", "id", "file", "size"]
-        
-            data = call_web_api(endpoint, self.token, select)
+        select = ["name", "folder", "id", "file", "size"]
+        racine_de, elimines, a_sonder = self.debut_sondage(folder_ids)
+
+        while a_sonder and not self._stop_event.is_set():
+            resultats = iter_batch_children_cache(a_sonder, self.token, select, self.taille_page, self.versions, age_max = self.age_cache)
+            a_sonder = self.sonder_niveau(a_sonder, resultats, racine_de, elimines)
+
+        return set(folder_ids) - elimines
+
+    def debut_sondage(self, folder_ids):
+        """
+        Prépare l'état d'un sondage de dossiers vides.
+
+        Returns:
+            tuple: (dossier sondé -> candidat d'origine, candidats éliminés, premier niveau à sonder)
+        """
+        racine_de = {}
+        elimines = set()
+        a_sonder = []
+
+        for folder_id in folder_ids:
+            # Un dossier déjà sondé n'est pas considéré comme vide
+            if folder_id in self.cache_empty:
+                elimines.add(folder_id)
+
+            else:
+                racine_de[folder_id] = folder_id
+                a_sonder.append(folder_id)
+
+        return racine_de, elimines, a_sonder
+
+    def sonder_niveau(self, a_sonder, resultats, racine_de, elimines):
+        """
+        Analyse les listings d'un niveau de sondage.
+
+        Un candidat est éliminé dès qu'un de ses descendants contient un fichier,
+        qu'un listing échoue ou revient vide.
+
+        Args:
+            a_sonder (list): IDs des dossiers du niveau
+            resultats (iterable): Tuples (folder_id, éléments ou None) de ce niveau
+            racine_de (dict): Dossier sondé -> candidat d'origine, complété ici
+            elimines (set): Candidats éliminés, complété ici
+
+        Returns:
+            list: IDs des dossiers du niveau suivant
+        """
+        niveau_suivant = []
+        self.cache_empty.update(a_sonder)
+
+        for folder_id, items in resultats:
+            racine = racine_de[folder_id]
+
+            if racine in elimines:
+                continue
+
+            if items is None:
+                elimines.add(racine)
+                continue
 
-            if not data or not data.get("value"):
-                return False
-            
             logger.debug(f"Vérification de la capacité de {folder_id}")
+            nombre_enfants = 0
 
-            for child in data.get("value"):
+            for child in items:
+                nombre_enfants += 1
                 nom = child.get("name")
                 logger.info(f"Test de {nom}")
 
                 if child.get("file"):
                     logger.debug(f"{nom} contient un fichier")
+                    elimines.add(racine)
+                    break
 
-                    return False
-                
                 elif child.get("folder"):
                     childcount = child.get("folder").get("childCount")
 
                     if childcount == 0:
                         logger.debug(f"{nom} contient {childcount} fichier")
 
-                        continue
-
-                    elif childcount > 0:
-                        if not self.folder_is_empty(child.get("id")):
-                            return False
-            
-            logger.debug(f"{folder_id} est vide avec {len(data.get("value"))} childs")
-            return True
-
-    def preview(self, id, type):
-        """
-        Génère une prévisualisation et un hash perceptuel pour un fichier.
-        
-        Cette méthode:
-        1. Récupère une miniature via l'API Microsoft Graph
-        2. Télécharge l'image de prévisualisation
-        3. Émet un signal avec les données d'image pour l'interface
-        4. Calcule un hash perceptuel pour les images (détection de doublons visuels)
-        
-        Args:
-            id (str): ID unique du fichier OneDrive
-            type (str): Type de fichier ("picture" ou "video")
-            
-        Returns:
-            str: Hash perceptuel pour les images, None pour les vidéos ou en cas d'erreur
-        """
-        endpoint = f"me/drive/items/{id}/thumbnails"
-
-        # Récupération des métadonnées de miniature
-        data = call_web_api(endpoint, self.token)
-        
-        if not data:
-            logger.warning(f"ERREUR : Aucune miniature disponible pour l'ID {id}\n{traceback.format_exc()}")
-            return None 
-            
-        # URL de la miniature en grande taille
-        url = data["value"][0]["large"]["url"]
+                    elif child.get("id") in self.cache_empty:
+                        elimines.add(racine)
+                        break
 
-        # Téléchargement de l'image de prévisualisation
-        response = requests.get(url)
-        image_data = response.content
+                    else:
+                        racine_de[child.get("id")] = racine
+                        self.versions[child.get("id")] = validateur(child)
+                        niveau_suivant.append(child.get("id"))
 
-        if image_data:
-            logger.debug(f"Image data reçue, taille: {len(image_data)} bytes")
-            
-            # Émission du signal pour affichage dans l'interface
-            self.image_ready.emit(image_data)
-            
-            # Calcul du hash perceptuel uniquement pour les images
-            if type == "Images":
-                logger.debug("Début traitement imagehash...")
+            if not nombre_enfants:
+                elimines.add(racine)
 
-                try:
-                    img = Image.open(BytesIO(image_data))
-                    
-                    # Génération d'un hash perceptuel 16x16 pour la détection de doublons
-                    hash_result = str(imagehash.phash(img, hash_size=16))
-                    logger.debug(f"Hash calculé: {hash_result}")
-                    return hash_result
-                
-                except Exception as e:
-                    logger.error(f"Erreur conversion hash: {e}\n{traceback.format_exc()}")
+            elif racine not in elimines:
+                logger.debug(f"{folder_id} ne contient que des dossiers vides ({nombre_enfants} childs)")
 
-            else:
-                logger.debug("Type vidéo, pas de hash")
-                return None       
-        else:
-            logger.warning(f"ERREUR : La preview de {id} n'a pas marché\n{traceback.format_exc()}")
-            return None
+        # Inutile de descendre dans les dossiers dont la racine est déjà éliminée
+        return [folder_id for folder_id in niveau_suivant if racine_de[folder_id] not in elimines]
 
     def end(self):
         """
@@ -414,11 +672,19 @@ class ParcoursPhotos(QObject):
 
         # Génération du rapport de fin
         texte = ""
-        texte += f"Nombre de dossiers : {len(self.list_id)}"
+        texte += f"Nombre de dossiers : {self.nombre_dossiers}"
         texte += f"\nNombre d'images et des videos : {compte_db(curseur)}"
         texte += f"\nCompte des photos fait en {duration:.2f} secondes"
 
-        logger.info(f"Fin du parcours - Durée: {duration:.2f}s, Dossiers: {len(self.list_id)}, Fichiers: {compte_db(curseur)}")
+        logger.info(f"Fin du parcours - Durée: {duration:.2f}s, Dossiers: {self.nombre_dossiers}, Fichiers: {compte_db(curseur)}")
+        logger.info(f"Concurrence Graph en fin de parcours : {limiteur.stats()}")
+        logger.info(f"Cache des listings en fin de parcours : {cache_listing.stats()}")
+
+        # Parcours complet : les miniatures des fichiers disparus n'ont plus d'utilité
+        if not self._stop_event.is_set():
+            cache_miniatures.gc(id for (id,) in curseur.execute("SELECT id FROM picture_video").fetchall())
+
+        logger.info(f"Cache des miniatures en fin de parcours : {cache_miniatures.stats()}")
         
         # Émission du résumé vers l'interface
         self.progression.emit(texte)
@@ -467,104 +733,444 @@ class ParcoursPhotos(QObject):
         """
         self.prev = prev
 
-class ThreadPreview(QObject):
+class HachageDiffere(ParcoursPhotos):
     """
-    Thread worker pour générer des prévisualisations de comparaison de doublons.
-    
-    Cette classe génère les images de prévisualisation pour deux fichiers OneDrive
-    afin de permettre à l'utilisateur de comparer visuellement les doublons potentiels.
-    
-    Signaux:
-        image (tuple): Émet un tuple contenant (pixmap1, pixmap2, chemin1, chemin2)
-        finished (): Signal émis à la fin de la génération des prévisualisations
-        
+    Calcul différé des hash perceptuels, séparé du parcours des métadonnées.
+
+    Le parcours inscrit les images et les vidéos à hacher dans la table
+    phash_queue ; ce worker vide la file par lots de TAILLE_LOT_HACHAGE, en
+    commençant par les fichiers qui partagent leur taille ou leurs dimensions avec d'autres
+    (voir recup_phash_queue). Une entrée ne quitte la file qu'une fois son
+    hash enregistré : un arrêt, même au redémarrage de l'application, reprend
+    là où le calcul s'était arrêté.
+
+    Les miniatures passent par le téléchargeur et le cache des miniatures,
+    les hash par le pool de processus. Signaux, pause et arrêt sont hérités
+    de ParcoursPhotos.
+
     Attributes:
-        token (str): Token d'authentification Microsoft Graph API
-        id1, id2 (str): IDs des deux fichiers à comparer
-        path1, path2 (str): Chemins complets des deux fichiers
+        faits (int): Hash traités depuis le lancement
+        dernier_apercu (float): Instant du dernier aperçu émis (time.monotonic)
+        hashes_en_attente (dict): Futur en cours -> ID du fichier
     """
-    image = pyqtSignal(tuple)    
-    finished = pyqtSignal()
-
-    def __init__(self, token, id1, id2, path1, path2):
+    def __init__(self, token:str, prev:bool = True):
         """
-        Initialise le générateur de prévisualisations de comparaison.
-        
         Args:
-            token (str): Token d'authentification Microsoft Graph
-            id1 (str): ID OneDrive du premier fichier
-            id2 (str): ID OneDrive du second fichier  
-            path1 (str): Chemin complet du premier fichier
-            path2 (str): Chemin complet du second fichier
+            token (str): Token d'authentification pour l'API Microsoft Graph
+            prev (bool): Affiche l'aperçu en direct des miniatures
         """
-        super().__init__()
+        super().__init__(token, TYPES_HACHES, prev)
+        self.faits = 0
+        self.dernier_apercu = 0.0
+        self.hashes_en_attente = {}
 
-        self.token = token
-        self.id1 = id1
-        self.id2 = id2
-        self.path1 = path1
-        self.path2 = path2
-        logger.debug(f"ThreadPreview initialisé")
+        # Débits de téléchargement des miniatures mesurés pour ce calcul
+        telechargeur.remise_a_zero()
 
-    def preview(self):
-        """
-        Génère les prévisualisations des deux fichiers et émet le résultat.
-        
-        Cette méthode télécharge les miniatures des deux fichiers via l'API
-        Microsoft Graph et les convertit en objets QPixmap pour l'affichage.
-        """
-        logger.info("Début de génération des previews")
-        
-        # Génération des deux prévisualisations
-        img1 = None
-        if self.id1:
-            img1 = self.preview_call(self.id1)
-        
-        img2 = None
-        if self.id2:
-            img2 = self.preview_call(self.id2)
-        
-        # Assemblage du tuple de résultat
-        imgs_and_paths = (img1, img2, self.path1, self.path2)
+        logger.info("Initialisation HachageDiffere")
 
-        # Émission vers l'interface utilisateur
-        self.image.emit(imgs_and_paths)
-        logger.info("Previews générés et signal émis")
-        self.finished.emit()
-        
-    def preview_call(self, id):
+    def run(self):
         """
-        Génère une prévisualisation pour un fichier OneDrive spécifique.
-        
-        Args:
-            id (str): ID unique du fichier OneDrive
-            
-        Returns:
-            QPixmap: Image de prévisualisation, ou None en cas d'erreur
+        Point d'entrée du thread : vide la file des hash perceptuels.
         """
-        endpoint = f"me/drive/items/{id}/thumbnails"
-
-        # Récupération des métadonnées de miniature
-        data = call_web_api(endpoint, self.token)
-        
-        if not data or "value" not in data or not data["value"]:
-            logger.warning(f"ERREUR : Aucune miniature disponible pour l'ID {id}\n{traceback.format_exc()}")
-            return None 
-            
-        # URL de la miniature en grande taille
-        url = data["value"][0]["large"]["url"]
+        logger.info("Début du calcul différé des hash perceptuels")
+        self.start = time.time()
+        self.list_id = []
 
-        # Téléchargement de l'image
-        response = requests.get(url)
-        image_data = response.content
+        try:
+            self.connexion = sqlite3.connect("picture_video.db")
+            self.curseur = self.connexion.cursor()
 
-        if image_data:
+        except sqlite3.Error as e:
+            logger.error(f"Erreur de connexion BDD: {e}")
+            self.progression.emit("Erreur d'accès à la base de données")
+            return
+
+        try:
+            nettoie_phash_queue(self.curseur, self.connexion)
+            total = compte_phash_queue(self.curseur)
+
+            while not self._stop_event.is_set():
+                self._pause_event.wait()
+                lot = recup_phash_queue(TAILLE_LOT_HACHAGE, self.curseur)
+
+                if not lot:
+                    break
+
+                for id, ctag, miniatures, mime in lot:
+                    if self._stop_event.is_set():
+                        break
+
+                    futur = None
+                    type = "Videos" if (mime or "").startswith("video/") else "Images"
+
+                    try:
+                        futur = self.preview(id, type, miniatures, ctag)
+
+                    except Exception as e:
+                        logger.error(f"La prévisualisation de {id} n'a pas fonctionné : {e}")
+
+                    # Sans miniature possible, l'entrée est retirée tout de suite
+                    self.hashes_en_attente[futur or _futur_vide()] = id
+
+                # Le lot est terminé avant de demander le suivant
+                self.recolter_hashes(attendre = True)
+                self.progression.emit(f"Hash perceptuels calculés : {self.faits} / {total}")
+
+        except sqlite3.Error as e:
+            # Connexion fermée par un arrêt utilisateur
+            logger.error(f"Erreur BDD pendant le calcul des hash: {e}")
+
+        logger.info(f"Calcul des hash terminé - {self.faits} traités")
+        self.end()
+
+    def preview(self, id, type, miniatures = None, ctag = None):
+        """
+        Génère une prévisualisation et un hash perceptuel pour un fichier.
+        
+        Les miniatures sont lues à travers le cache des miniatures : seules
+        celles absentes ou dont le cTag a changé sont téléchargées.
+
+        Les téléchargements sont confiés au téléchargeur de miniatures : cette
+        méthode rend la main sans attendre le réseau.
+
+        Cette méthode:
+        1. Obtient la petite miniature MINIATURE_HASH des images et des vidéos
+        2. Lance ses empreintes dès réception (détection de doublons visuels,
+           empreinte des vidéos avec la facette video)
+        3. Si l'aperçu en direct peut être rafraîchi, obtient la miniature
+           MINIATURE_APERCU et émet un signal avec ses données pour l'interface
+        
+        Args:
+            id (str): ID unique du fichier OneDrive
+            type (str): Type de fichier ("picture" ou "video")
+            miniatures (list): Miniatures renvoyées par le listing ($expand=thumbnails), si présentes
+            ctag (str): cTag du fichier, version de ses miniatures en cache
+            
+        Returns:
+            Future: Futur des empreintes (pool de hachage), None en cas d'erreur
+        """
+        hash_result = None
+        incluses = bool(miniatures)
+
+        # La grande miniature n'est téléchargée que si l'aperçu sera effectivement affiché
+        apercu = self.prev and time.monotonic() - self.dernier_apercu >= INTERVALLE_APERCU
+
+        rendus = ([MINIATURE_HASH] if type in TYPES_HACHES else []) + ([MINIATURE_APERCU] if apercu else [])
+        donnees = {rendu: cache_miniatures.get(id, rendu, ctag) for rendu in rendus}
+        manquants = [rendu for rendu in rendus if donnees[rendu] is None]
+
+        if manquants and not incluses:
+            # Une seule demande à Graph pour tous les rendus de miniature
+            miniatures = self.miniatures_api(id)
+
+        # Empreintes de la miniature des images et des vidéos
+        if type in TYPES_HACHES:
+            if donnees[MINIATURE_HASH] is not None:
+                # Hash perceptuel 16x16 calculé par le pool de processus, hors de ce thread
+                hash_result = pool_hachage.soumettre(donnees[MINIATURE_HASH])
+
+            else:
+                # Téléchargement en arrière-plan, le hash est lancé dès réception
+                hash_result = telechargeur.soumettre(self.tache_miniature, id, MINIATURE_HASH, miniatures, incluses, ctag, pool_hachage.soumettre)
+
+        else:
+            logger.debug(f"Type {type}, pas de hash")
+
+        if apercu:
+            self.dernier_apercu = time.monotonic()
+
+            if donnees[MINIATURE_APERCU] is not None:
+                # Émission du signal pour affichage dans l'interface
+                self.image_ready.emit(donnees[MINIATURE_APERCU])
+
+            else:
+                telechargeur.soumettre(self.tache_miniature, id, MINIATURE_APERCU, miniatures, incluses, ctag, self.image_ready.emit)
+
+        return hash_result
+
+    def tache_miniature(self, id, rendu, miniatures, incluses, ctag, suite):
+        """
+        Tâche du téléchargeur : télécharge un rendu, le met en cache et le remet à l'étape suivante.
+
+        Args:
+            id (str): ID unique du fichier OneDrive
+            rendu (str): Rendu de miniature voulu (small, large, c64x64...)
+            miniatures (list): Miniatures déjà connues
+            incluses (bool): Les miniatures viennent du listing et peuvent être périmées
+            ctag (str): cTag du fichier
+            suite (callable): Étape suivante, appelée avec le contenu de la miniature
+
+        Returns:
+            Résultat de suite, None si la miniature est indisponible
+        """
+        if self._stop_event.is_set():
+            return None
+
+        url = self.url_miniature(id, miniatures, rendu)
+
+        # Les octets restent dans le budget du téléchargeur jusqu'à la remise à suite
+        with telechargeur.reception(url) as image_data:
+            if image_data:
+                cache_miniatures.put(id, rendu, ctag, image_data)
+                return suite(image_data)
+
+        if incluses:
+            # URL incluse périmée (listing servi par le cache) : nouvelle demande à Graph
+            logger.debug(f"URL de miniature incluse inutilisable pour {id}, nouvelle demande")
+
+            return self.tache_miniature(id, rendu, None, False, ctag, suite)
+
+        logger.warning(f"ERREUR : La miniature {rendu} de {id} n'a pas pu être téléchargée")
+        return None
+
+    def recolter_hashes(self, attendre:bool = False):
+        """
+        Enregistre les empreintes calculées par le pool de hachage : le phash
+        dans picture_video, toutes les empreintes dans image_hash.
+
+        Doit être appelée depuis le thread qui détient la connexion SQLite.
+
+        Args:
+            attendre (bool): Attend la fin de tous les calculs en cours (fin de parcours)
+        """
+        if self._stop_event.is_set():
+            # Connexion fermée par l'arrêt : les calculs restants sont abandonnés
+            for futur in self.hashes_en_attente:
+                futur.cancel()
+
+            self.hashes_en_attente.clear()
+            return
+
+        if attendre and self.hashes_en_attente:
+            logger.info(f"Attente de {len(self.hashes_en_attente)} hash perceptuels")
+            wait(self.hashes_en_attente)
+
+        for futur in [futur for futur in self.hashes_en_attente if futur.done()]:
+            id = self.hashes_en_attente.pop(futur)
+
+            try:
+                hashes = futur.result()
+
+            except Exception as e:
+                logger.error(f"Erreur conversion hash de {id}: {e}")
+                hashes = None
+
+            if isinstance(hashes, Future):
+                # Téléchargement terminé, le hash est maintenant en cours de calcul
+                self.hashes_en_attente[hashes] = id
+                continue
+
+            if hashes:
+                logger.debug(f"Empreintes calculées pour {id}: {hashes}")
+                update_sql_phash(id, hashes['phash'][1], self.curseur, self.connexion)
+                insert_sql_hashes(id, hashes, self.curseur, self.connexion)
+
+            # Traité, même sans miniature : l'entrée quitte la file
+            delete_sql_phash_queue(id, self.curseur, self.connexion)
+            self.faits += 1
+
+        if attendre and self.hashes_en_attente:
+            self.recolter_hashes(attendre = True)
+
+    def url_miniature(self, id, miniatures = None, taille = MINIATURE_APERCU):
+        """
+        Retourne l'URL de téléchargement d'une miniature.
+
+        Les miniatures déjà connues (listing avec $expand=thumbnails) sont utilisées
+        en priorité ; sinon elles sont demandées à me/drive/items/{id}/thumbnails.
+
+        Args:
+            id (str): ID unique du fichier OneDrive
+            miniatures (list): Miniatures déjà connues, None pour les demander à Graph
+            taille (str): Rendu de miniature voulu
+
+        Returns:
+            str: URL de la miniature, None si aucune n'est disponible
+        """
+        if miniatures is None:
+            miniatures = self.miniatures_api(id)
+
+        for jeu in miniatures:
+            url = (jeu.get(taille) or {}).get('url')
+
+            if url:
+                return url
+
+        logger.warning(f"ERREUR : Aucune miniature {taille} disponible pour l'ID {id}")
+        return None
+
+    def miniatures_api(self, id):
+        """
+        Demande les miniatures d'un fichier à me/drive/items/{id}/thumbnails.
+
+        Args:
+            id (str): ID unique du fichier OneDrive
+
+        Returns:
+            list: Jeux de miniatures (vide si aucune n'est disponible)
+        """
+        # Récupération des métadonnées de miniature
+        data = call_web_api(f"me/drive/items/{id}/thumbnails", self.token)
+
+        return (data or {}).get('value') or []
+
+    def end(self):
+        """
+        Émet le résumé du calcul des hash et le signal de fin.
+        """
+        duration = time.time() - self.start
+
+        texte = f"Hash perceptuels calculés : {self.faits}"
+        texte += f"\nCalcul fait en {duration:.2f} secondes"
+
+        if self._stop_event.is_set():
+            texte += "\nCalcul interrompu, il reprendra au prochain lancement"
+
+        logger.info(f"Fin du calcul des hash - Durée: {duration:.2f}s, Hash: {self.faits}")
+        logger.info(f"Téléchargement des miniatures : {telechargeur.stats()}")
+        logger.info(f"Cache des miniatures : {cache_miniatures.stats()}")
+
+        self.progression.emit(texte)
+        self.finished.emit()
+
+def _futur_vide():
+    """
+    Futur déjà terminé sans résultat (fichier sans miniature).
+    """
+    futur = Future()
+    futur.set_result(None)
+
+    return futur
+
+class ThreadPreview(QObject):
+    """
+    Thread worker pour générer des prévisualisations de comparaison de doublons.
+    
+    Cette classe génère les images de prévisualisation pour deux fichiers OneDrive
+    afin de permettre à l'utilisateur de comparer visuellement les doublons potentiels.
+    
+    Signaux:
+        image (tuple): Émet un tuple contenant (pixmap1, pixmap2, chemin1, chemin2)
+        finished (): Signal émis à la fin de la génération des prévisualisations
+        
+    Attributes:
+        token (str): Token d'authentification Microsoft Graph API
+        id1, id2 (str): IDs des deux fichiers à comparer
+        path1, path2 (str): Chemins complets des deux fichiers
+    """
+    image = pyqtSignal(tuple)    
+    finished = pyqtSignal()
+
+    def __init__(self, token, id1, id2, path1, path2):
+        """
+        Initialise le générateur de prévisualisations de comparaison.
+        
+        Args:
+            token (str): Token d'authentification Microsoft Graph
+            id1 (str): ID OneDrive du premier fichier
+            id2 (str): ID OneDrive du second fichier  
+            path1 (str): Chemin complet du premier fichier
+            path2 (str): Chemin complet du second fichier
+        """
+        super().__init__()
+
+        self.token = token
+        self.id1 = id1
+        self.id2 = id2
+        self.path1 = path1
+        self.path2 = path2
+        logger.debug(f"ThreadPreview initialisé")
+
+    def preview(self):
+        """
+        Génère les prévisualisations des deux fichiers et émet le résultat.
+        
+        Cette méthode télécharge les miniatures des deux fichiers via l'API
+        Microsoft Graph et les convertit en objets QPixmap pour l'affichage.
+        """
+        logger.info("Début de génération des previews")
+        
+        # Génération des deux prévisualisations
+        img1 = None
+        if self.id1:
+            img1 = self.preview_call(self.id1)
+        
+        img2 = None
+        if self.id2:
+            img2 = self.preview_call(self.id2)
+        
+        # Assemblage du tuple de résultat
+        imgs_and_paths = (img1, img2, self.path1, self.path2)
+
+        # Émission vers l'interface utilisateur
+        self.image.emit(imgs_and_paths)
+        logger.info("Previews générés et signal émis")
+        self.finished.emit()
+        
+    def preview_call(self, id):
+        """
+        Génère une prévisualisation pour un fichier OneDrive spécifique.
+        
+        Args:
+            id (str): ID unique du fichier OneDrive
+            
+        Returns:
+            QPixmap: Image de prévisualisation, ou None en cas d'erreur
+        """
+        # Miniature lue à travers le cache, téléchargée si absente ou si le fichier a changé depuis
+        image_data = miniature(id, MINIATURE_APERCU, lambda: self.telecharger(id), self.ctag(id))
+
+        if image_data:
             # Conversion en QPixmap pour PyQt5
             pixmap = QPixmap()
             
             if pixmap.loadFromData(image_data):
                 return pixmap
 
+    def ctag(self, id):
+        """
+        cTag actuel d'un fichier OneDrive, version de ses miniatures en cache.
+
+        Args:
+            id (str): ID unique du fichier OneDrive
+
+        Returns:
+            str: cTag du fichier, None s'il n'a pas pu être lu (la miniature en cache est alors acceptée)
+        """
+        data = call_web_api(f"me/drive/items/{id}", self.token, ["cTag"])
+
+        if not isinstance(data, dict):
+            logger.warning(f"cTag de {id} indisponible, miniature en cache acceptée")
+            return None
+
+        return data.get('cTag')
+
+    def telecharger(self, id):
+        """
+        Télécharge la grande miniature d'un fichier OneDrive.
+
+        Args:
+            id (str): ID unique du fichier OneDrive
+
+        Returns:
+            bytes: Contenu de la miniature, None en cas d'erreur
+        """
+        endpoint = f"me/drive/items/{id}/thumbnails"
+
+        # Récupération des métadonnées de miniature
+        data = call_web_api(endpoint, self.token)
+        
+        if not data or "value" not in data or not data["value"]:
+            logger.warning(f"ERREUR : Aucune miniature disponible pour l'ID {id}\n{traceback.format_exc()}")
+            return None 
+            
+        # URL de la miniature en grande taille
+        url = data["value"][0][MINIATURE_APERCU]["url"]
+
+        # Téléchargement de l'image via le client partagé
+        return graph_client.download(url)
+
 class ThreadHashNomTaille(QObject):
     """
     Thread worker pour la détection de doublons par critères exacts.
@@ -713,32 +1319,96 @@ class ThreadVisuel(QObject):
     visuellement similaires même si elles ont été modifiées (compression,
     redimensionnement, légers ajustements, etc.).
     
+    Chaque empreinte disponible (phash, dhash, whash, colorhash) vote pour
+    une paire si sa distance, rapportée à son nombre de bits, reste sous le
+    seuil fixé pour le phash. Une paire est retenue à la majorité des votes ;
+    sans empreintes supplémentaires, le phash décide seul.
+
+    Les empreintes dépendent de l'orientation : une paire rejetée par le vote
+    est encore retenue si son phash invariant (identique pour les huit
+    rotations et miroirs d'une image) est sous le seuil. Une seule
+    comparaison supplémentaire par paire suffit donc à retrouver les images
+    pivotées ou retournées.
+
+    Un planificateur choisit, selon le nombre d'empreintes et le seuil,
+    entre la force brute et des index de hachage multiple qui ne proposent
+    que les paires proches : le résultat est le même, seul le coût change.
+
+    En mode Cascade, les hash grossiers (phash 64 bits et son invariant)
+    écartent d'abord, par un simple XOR d'entiers, les paires trop éloignées ;
+    seules les autres passent par la comparaison complète. Le mode
+    Comparaison exécute les recherches et rapporte rappel et vitesse.
+
+    Les hash sont chargés une fois dans des matrices de mots de 64 bits ;
+    les images aux empreintes identiques sont regroupées, et les paires sont
+    comparées par tuiles (XOR et comptage des bits vectorisés avec NumPy),
+    réparties entre les processus du pool de comparaison.
+
+    En mode Exhaustif, les paires proches sont calculées une fois par version
+    du catalogue, à un seuil d'au moins SEUIL_GRAPHE, et enregistrées dans le
+    graphe des distances : tant que le catalogue ne change pas, un seuil plus
+    petit est servi par une simple requête sur ce graphe. Pendant la
+    construction du graphe, les doublons au seuil demandé sont émis au fil
+    des lots.
+
+    Les doublons sont émis par lots au fil de la recherche : au plus
+    LOTS_DOUBLONS_EN_ATTENTE lots attendent d'être affichés, la recherche
+    patiente au-delà, et aucune liste de tous les doublons n'est gardée
+    (le mode Comparaison ne garde que les paires d'IDs de la force brute,
+    pour mesurer le rappel). La pause et l'arrêt sont vérifiés entre deux
+    lots de paires.
+
     L'algorithme calcule plusieurs métriques de similarité:
     - Similarité de base basée sur la distance de Hamming
     - Similarité fine bit par bit
     - Similarité par clusters de bits
     
     Signaux:
-        progression (str, tuple, tuple): Émet les détails d'un doublon visuel trouvé
+        progression (str, tuple, tuple): Émet le message affiché si aucun doublon n'est trouvé
+        lot_doublons (list): Lot de doublons (texte, ids, chemins) ; le récepteur appelle
+                             lot_affiche() une fois le lot affiché
+        avancement (int, int): Lots de paires (tuiles ou candidats d'un index) comparés et total
+        rapport (str): Rapport du mode Comparaison (rappel et vitesse de chaque recherche)
         finished (): Signal émis à la fin de la recherche
         
     Attributes:
         seuil (int): Seuil de distance maximale pour considérer deux images similaires
+        mode (str): Mode de recherche (voir MODES_VISUEL)
+        emis (int): Doublons émis vers l'interface
+        _pause_event (threading.Event): Contrôle la pause de la recherche
+        _stop_event (threading.Event): Contrôle l'arrêt de la recherche
+        _assez (threading.Event): L'interface n'affiche plus de doublons (voir assez)
+        _places (threading.Semaphore): Lots de doublons pouvant encore être émis sans être affichés
     """
     progression = pyqtSignal(str, tuple, tuple)
+    lot_doublons = pyqtSignal(list)
+    avancement = pyqtSignal(int, int)
+    rapport = pyqtSignal(str)
     finished = pyqtSignal()
 
-    def __init__(self, seuil):
+    def __init__(self, seuil, mode:str = MODES_VISUEL[0]):
         """
         Initialise le détecteur de doublons visuels.
         
         Args:
             seuil (int): Distance maximale entre hash pour considérer deux images similaires
                         (plus le seuil est bas, plus la détection est stricte)
+            mode (str): Exhaustif, Cascade ou Comparaison (voir MODES_VISUEL)
         """
         super().__init__()
         self.seuil = seuil
-        logger.debug(f"ThreadVisuel initialisé avec seuil: {seuil}")
+        self.mode = mode
+        self.emis = 0
+        self.tampon = [] # Doublons pas encore émis, TAILLE_LOT_DOUBLONS au plus
+
+        # Événements de contrôle pour pause/arrêt
+        self._pause_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._assez = threading.Event()
+        self._pause_event.set()  # Démarrage en mode actif
+        self._places = threading.Semaphore(LOTS_DOUBLONS_EN_ATTENTE)
+
+        logger.debug(f"ThreadVisuel initialisé avec seuil: {seuil}, mode: {mode}")
 
     def distance(self):
         """
@@ -747,97 +1417,49 @@ class ThreadVisuel(QObject):
         Cette méthode:
         1. Récupère tous les hash perceptuels depuis la base de données
         2. Compare chaque paire d'images via leur hash perceptuel
+           (en mode Exhaustif, par le graphe des distances ; en mode
+           Cascade, seulement les paires retenues par les hash 64 bits)
         3. Calcule plusieurs métriques de similarité pour chaque paire
         4. Identifie les doublons selon le seuil configuré
-        5. Émet un signal pour chaque doublon visuel trouvé
+        5. Émet les doublons par lots au fil de la recherche
         """
-        logger.info(f"Début de la recherche de doublons visuels avec seuil: {self.seuil}")
+        logger.info(f"Début de la recherche de doublons visuels avec seuil: {self.seuil}, mode: {self.mode}")
         self.connexion = sqlite3.connect("picture_video.db")
         self.curseur = self.connexion.cursor()
 
         # Récupération de toutes les images avec hash perceptuel
         self.image_phash = recup_phash(self.curseur)
         logger.info(f"Nombre d'images avec hash perceptuel: {len(self.image_phash)}")
-        self.doublons_trouve = []
+        self.charger_empreintes()
 
-        # Comparaison de toutes les paires possibles d'images
-        for img1, img2 in combinations(self.image_phash, 2):
-            name1, type1, size1, id1, phash1, path1 = img1
-            name2, type2, size2, id2, phash2, path2 = img2
+        if self.mode == "Exhaustif":
+            doublons = self.recherche_graphe()
 
-            # Conversion des hash hexadécimaux en objets ImageHash
-            hash1 = imagehash.hex_to_hash(phash1)
-            hash2 = imagehash.hex_to_hash(phash2)
-            
-            # Calcul de la distance de Hamming entre les deux hash
-            distance = hash1 - hash2
+        else:
+            self.plan = self.plan_recherche()
+            doublons = self.comparaison() if self.mode == "Comparaison" else self.recherche(cascade = True)
 
-            # Si la distance est inférieure au seuil, c'est un doublon potentiel
-            if distance <= self.seuil:
-                hash_size = len(hash1.hash.flat)
-                
-                # === CALCUL DE SIMILARITÉ BASE ===
-                # Pourcentage basé sur la distance de Hamming
-                similarite_base = max(0.0, (hash_size - float(distance)) / hash_size * 100.0)
-                
-                # === CALCUL DE SIMILARITÉ FINE ===
-                # Comparaison bit par bit pour plus de précision
-                bits_identiques = sum(1 for i in range(hash_size) if hash1.hash.flat[i] == hash2.hash.flat[i])
-                similarite_fine = (bits_identiques / hash_size) * 100.0
-                
-                # === CALCUL DE SIMILARITÉ PAR CLUSTERS ===
-                # Analyse par groupes de bits pour détecter les similitudes locales
-                clusters_similaires = 0
-                cluster_size = 4 
-                for i in range(0, hash_size, cluster_size):
-                    cluster1 = hash1.hash.flat[i:i+cluster_size]
-                    cluster2 = hash2.hash.flat[i:i+cluster_size]
-                    # Un cluster est similaire si 75% de ses bits correspondent
-                    if sum(cluster1 == cluster2) >= cluster_size * 0.75:
-                        clusters_similaires += 1
-                
-                similarite_clusters = (clusters_similaires / (hash_size // cluster_size)) * 100.0
-                
-                # === CALCUL DE SIMILARITÉ GLOBALE ===
-                # Moyenne pondérée des trois métriques
-                if similarite_clusters and similarite_fine and similarite_base:
-                    similarite = (similarite_base * 0.5 + similarite_fine * 0.3 + similarite_clusters * 0.2)
-                else:
-                    similarite = similarite_base
+        # Émission des résultats vers l'interface, au fil de la recherche
+        try:
+            for doublon in doublons:
+                if self._stop_event.is_set():
+                    break
 
-                # Ajout du doublon à la liste
-                self.doublons_trouve.append({
-                        'photo1': (name1, type1, size1, id1, path1),
-                        'photo2': (name2, type2, size2, id2, path2),
-                        'distance': distance,
-                        'similarite': similarite
-                    })
-                
-                logger.info(f"Doublon trouvé : {name1} avec {name2}")
+                if not self._assez.is_set():
+                    self.emettre(doublon)
 
-        # Émission des résultats vers l'interface
-        if self.doublons_trouve:
-            logger.info(f"Total de {len(self.doublons_trouve)} doublons visuels trouvés")
-            
-            for doublon in self.doublons_trouve:
-                doublon1 = doublon["photo1"]
-                doublon2 = doublon["photo2"]
-                nom1 = doublon1[0]
-                nom2 = doublon2[0]
-                id1 = doublon1[3]
-                id2 = doublon2[3]
-                ids = (id1, id2)
+        finally:
+            # Recherche terminée ou arrêtée : les lots de paires en cours sont abandonnés
+            doublons.close()
 
-                # Génération du texte descriptif avec métriques de similarité
-                texte = ""
-                texte += f"{verification_len(doublon1[0])} ↔ {verification_len(doublon2[0])}\n"
-                texte += f"Similarité: {doublon['similarite']:.2f}% | Distance: {doublon['distance']}\n"
-                texte += f"Types: {doublon1[1]} - {doublon2[1]} | Tailles: {doublon1[2]} - {doublon2[2]}\n"
-                texte += f"IDs: {id1} - {id2}\n"
-                texte += f"Chemins: {verification_len(f"{doublon1[4]}/{nom1}")} - {verification_len(f"{doublon2[4]}/{nom2}")}\n"
+        self.envoyer()
+
+        if self._stop_event.is_set():
+            logger.info(f"Recherche visuelle arrêtée après {self.emis} doublons")
+
+        elif self.emis:
+            logger.info(f"Total de {self.emis} doublons visuels trouvés")
 
-                chemins = (f"{doublon1[4]}/{nom1}", f"{doublon2[4]}/{nom2}")
-                self.progression.emit(texte, ids, chemins)
         else:
             # Aucun doublon visuel trouvé
             logger.warning("Aucun doublon visuel trouvé")
@@ -854,6 +1476,775 @@ class ThreadVisuel(QObject):
         logger.info("ThreadVisuel terminé")
         self.finished.emit()
 
+    def emettre(self, doublon:dict):
+        """
+        Met en forme un doublon et l'ajoute au lot suivant, émis dès qu'il est plein.
+
+        Args:
+            doublon (dict): Doublon trouvé (voir doublon)
+        """
+        doublon1 = doublon["photo1"]
+        doublon2 = doublon["photo2"]
+        nom1 = doublon1[0]
+        nom2 = doublon2[0]
+        id1 = doublon1[3]
+        id2 = doublon2[3]
+        ids = (id1, id2)
+
+        # Génération du texte descriptif avec métriques de similarité
+        texte = ""
+        texte += f"{verification_len(doublon1[0])} ↔ {verification_len(doublon2[0])}\n"
+        texte += f"Similarité: {doublon['similarite']:.2f}% | Distance: {doublon['distance']} | Votes: {doublon['votes'][0]}/{doublon['votes'][1]}\n"
+
+        if doublon['orientation']:
+            texte += "Orientation différente (rotation ou miroir)\n"
+
+        texte += f"Types: {doublon1[1]} - {doublon2[1]} | Tailles: {doublon1[2]} - {doublon2[2]}\n"
+        texte += f"IDs: {id1} - {id2}\n"
+        texte += f"Chemins: {verification_len(f"{doublon1[4]}/{nom1}")} - {verification_len(f"{doublon2[4]}/{nom2}")}\n"
+
+        chemins = (f"{doublon1[4]}/{nom1}", f"{doublon2[4]}/{nom2}")
+        self.tampon.append((texte, ids, chemins))
+
+        if len(self.tampon) >= TAILLE_LOT_DOUBLONS:
+            self.envoyer()
+
+    def envoyer(self):
+        """
+        Émet le lot de doublons en attente, une fois qu'une place se libère dans l'interface.
+
+        Au plus LOTS_DOUBLONS_EN_ATTENTE lots sont émis sans avoir été affichés
+        (voir lot_affiche) : au-delà, la recherche attend l'interface. Un arrêt
+        abandonne le lot.
+        """
+        if not self.tampon:
+            return
+
+        if self._assez.is_set():
+            self.tampon = []
+            return
+
+        while not self._places.acquire(timeout = 0.2):
+            if self._stop_event.is_set():
+                self.tampon = []
+                return
+
+        self.lot_doublons.emit(self.tampon)
+        self.emis += len(self.tampon)
+        logger.debug(f"Lot de {len(self.tampon)} doublons visuels émis ({self.emis} au total)")
+        self.tampon = []
+
+    def lot_affiche(self):
+        """Libère une place pour le lot de doublons suivant, une fois le précédent affiché."""
+        self._places.release()
+
+    def actif(self):
+        """
+        Attend la fin d'une éventuelle pause, entre deux lots de paires.
+
+        Returns:
+            bool: False si l'arrêt de la recherche a été demandé ou si l'interface n'affiche plus de doublons
+        """
+        self._pause_event.wait()
+
+        return not self._stop_event.is_set() and not self._assez.is_set()
+
+    def pause_clear(self):
+        """Met en pause la recherche visuelle en bloquant l'événement de pause."""
+        self._pause_event.clear()
+        logger.info("Pause de la recherche visuelle")
+
+    def pause_set(self):
+        """Reprend la recherche visuelle en libérant l'événement de pause."""
+        self._pause_event.set()
+        logger.info("Reprise de la recherche visuelle")
+
+    def stop(self):
+        """
+        Demande l'arrêt de la recherche visuelle.
+
+        La recherche s'arrête au lot de paires suivant, puis se termine
+        normalement (signal finished).
+        """
+        self._stop_event.set()
+        logger.info("Arrêt de la recherche visuelle demandé")
+
+        # Force la libération des événements de pause pour permettre l'arrêt
+        self._pause_event.set()
+
+    def assez(self):
+        """
+        L'interface n'affiche plus de doublons : plus rien n'est émis et la recherche s'arrête.
+
+        Seule une construction du graphe des distances en cours se poursuit,
+        sans rien émettre, pour que les recherches suivantes soient servies
+        par le graphe ; stop l'interrompt toujours.
+        """
+        self._assez.set()
+        logger.info("Affichage des doublons visuels complet, émission arrêtée")
+
+    def charger_empreintes(self):
+        """
+        Convertit une fois pour toutes les hash enregistrés en matrices de mots de 64 bits.
+
+        Les images aux empreintes strictement identiques sont regroupées :
+        seul un représentant par groupe est comparé aux autres, les paires
+        internes à un groupe sont des doublons d'office. Remplit groupes,
+        version (version du catalogue pour le graphe des distances) et
+        empreintes : phashes (matrice des phash des représentants), autres
+        (matrice, présence et bits par algorithme votant), invariant et
+        grossiers (hash 64 bits et invariant grossier, pour la cascade).
+        """
+        empreintes = recup_hashes(self.curseur)
+        self.version = version_catalogue((img[3], img[4], empreintes.get(img[3], {})) for img in self.image_phash)
+
+        # Regroupement par empreintes identiques, dans l'ordre de image_phash
+        signatures = {}
+
+        for position, img in enumerate(self.image_phash):
+            hashes = empreintes.get(img[3], {})
+            signature = (img[4], tuple(sorted(hashes.items())))
+            signatures.setdefault(signature, []).append(position)
+
+        self.groupes = list(signatures.values())
+        representants = [empreintes.get(self.image_phash[groupe[0]][3], {}) for groupe in self.groupes]
+
+        bits = len(self.image_phash[0][4]) * 4 if self.image_phash else TAILLE_HASH * TAILLE_HASH
+        phashes = matrice([self.image_phash[groupe[0]][4] for groupe in self.groupes], bits)
+
+        autres = {algo: self.matrice_algo(representants, algo) for algo in VOTANTS}
+
+        # Votants d'une paire de représentants identiques : le phash et chaque empreinte présente
+        self.votants = 1 + sum(presence.astype(numpy.int32) for _, presence, _ in autres.values())
+
+        grossier, presence_grossier, _ = self.matrice_algo(representants, "phash_grossier")
+        invariant_grossier, presence_invariant, _ = self.matrice_algo(representants, "invariant_grossier")
+
+        self.empreintes = Empreintes(
+            self.seuil,
+            bits,
+            phashes,
+            autres,
+            # Le hash invariant ne vote pas : il rattrape les paires d'orientations différentes
+            self.matrice_algo(representants, "phash_invariant"),
+            (grossier, invariant_grossier, presence_grossier & presence_invariant),
+            # Seuils de la cascade : seuil du phash rapporté à la taille des hash grossiers, avec marge
+            max(SEUIL_CASCADE_MIN, MARGE_CASCADE * self.seuil * 64 / bits),
+            max(SEUIL_CASCADE_MIN, MARGE_CASCADE * self.seuil * 36 / bits)
+        )
+
+        logger.info(f"{len(self.image_phash)} images, {len(self.groupes)} empreintes distinctes")
+
+    def matrice_algo(self, representants, algo):
+        """
+        Matrice des hash d'un algorithme pour les représentants des groupes.
+
+        Un représentant sans ce hash, ou avec une taille différente de celle
+        du premier hash trouvé, a une ligne nulle et n'est pas marqué présent.
+
+        Args:
+            representants (list): Empreintes (voir recup_hashes) de chaque représentant
+            algo (str): Algorithme (voir ALGORITHMES)
+
+        Returns:
+            tuple: (matrice uint64, présence par ligne, bits du hash)
+        """
+        taille = next((hashes[algo][0] for hashes in representants if algo in hashes), None)
+        valeurs = [hashes[algo][1] if algo in hashes and hashes[algo][0] == taille else None for hashes in representants]
+        bits = bits_hash(algo, taille if taille is not None else TAILLE_HASH)
+
+        return matrice(valeurs, bits), numpy.array([valeur is not None for valeur in valeurs], dtype = bool), bits
+
+    def plan_recherche(self, empreintes:Empreintes = None):
+        """
+        Choisit entre la force brute et des index de hachage multiple (voir planifier).
+
+        Une paire retenue par le vote a un phash sous le seuil, ou bien toutes
+        ses autres empreintes sous le seuil, dhash compris (les empreintes
+        d'une image sont enregistrées ensemble). Une paire rattrapée a un hash
+        invariant sous le seuil. Les paires proches pour le phash, le dhash ou
+        le hash invariant contiennent donc tous les doublons : la recherche par
+        index trouve exactement les mêmes doublons que la force brute.
+
+        Args:
+            empreintes (Empreintes): Empreintes et seuil de la recherche (celles du thread si None)
+
+        Returns:
+            dict: Plan (voir planifier)
+        """
+        empreintes = empreintes or self.empreintes
+        seuil_relatif = empreintes.seuil / empreintes.bits
+        recherches = [("phash", empreintes.phashes, numpy.arange(len(self.groupes)), empreintes.bits, empreintes.seuil)]
+
+        for nom, (hashes, presence, bits) in (("dhash", empreintes.autres["dhash"]), ("phash_invariant", empreintes.invariant)):
+            recherches.append((nom, hashes, numpy.flatnonzero(presence), bits, int(seuil_relatif * bits)))
+
+        # Force brute : phash, empreintes votantes et hash invariant pour chaque paire
+        return planifier(recherches, len(self.groupes), 2 + len(empreintes.autres))
+
+    def recherche(self, cascade:bool = False, index:bool = True):
+        """
+        Compare les paires d'empreintes distinctes, toutes ou seulement celles retenues par la cascade.
+
+        Les paires viennent des index du plan quand il en a, sinon de tuiles
+        couvrant toutes les paires : XOR des matrices et comptage des bits en
+        bloc, puis métriques de similarité calculées en bloc pour les paires
+        retenues. Le nombre de paires comparées en 256 bits est tenu dans comparees.
+
+        Args:
+            cascade (bool): Écarte d'abord les paires dont les hash 64 bits sont trop éloignés
+            index (bool): Utilise les index du plan s'il en a (sinon force brute)
+
+        Yields:
+            dict: Doublons trouvés (voir doublon), lot de paires après lot de paires
+        """
+        self.comparees = 0
+        lots, total = self.lots(self.plan, index)
+
+        yield from self.doublons_identiques()
+
+        # Comparaison des représentants, par tuile ou par lot de candidats, dans les processus de comparaison
+        comparaisons = pool_comparaison.comparer(self.empreintes, lots, cascade)
+
+        try:
+            for faits, (resultats, comparees) in enumerate(comparaisons, 1):
+                self.comparees += comparees
+
+                for i, j, distance, similarite, votes, votants, orientation in zip(*resultats):
+                    yield from self.developper(int(i), int(j), int(distance), float(similarite), int(votes), int(votants), bool(orientation))
+
+                self.avancement.emit(faits, total)
+
+                if not self.actif():
+                    break
+
+        finally:
+            comparaisons.close()
+
+    def lots(self, plan:dict, index:bool = True):
+        """
+        Lots de paires de représentants à comparer : candidats des index du plan, ou tuiles.
+
+        Args:
+            plan (dict): Plan de la recherche (voir plan_recherche)
+            index (bool): Utilise les index du plan s'il en a (sinon force brute)
+
+        Returns:
+            tuple: (itérateur des lots (ii, jj), nombre de lots)
+        """
+        if index and plan['index']:
+            # Candidats des index ; une paire candidate de plusieurs index n'est comparée que par le premier
+            return paires_index(plan['index']), sum(indexe.nombre_lots() for indexe in plan['index'])
+
+        return tuiles(len(self.groupes)), nombre_tuiles(len(self.groupes))
+
+    def doublons_identiques(self):
+        """
+        Paires internes aux groupes d'empreintes identiques : doublons sans comparaison.
+
+        Yields:
+            dict: Doublons (voir doublon)
+        """
+        for representant, groupe in enumerate(self.groupes):
+            votants = int(self.votants[representant])
+
+            for position1, position2 in combinations(groupe, 2):
+                yield self.doublon(position1, position2, 0, 100.0, votants, votants, False)
+
+    def developper(self, i:int, j:int, *resultat):
+        """
+        Doublons des images de deux groupes à partir de la paire de leurs représentants.
+
+        Args:
+            i, j (int): Groupes (voir charger_empreintes) des deux représentants
+            *resultat: distance, similarité, votes, votants et orientation de la paire
+
+        Yields:
+            dict: Doublons (voir doublon), un par paire d'images des deux groupes
+        """
+        for position1 in self.groupes[i]:
+            for position2 in self.groupes[j]:
+                yield self.doublon(min(position1, position2), max(position1, position2), *resultat)
+
+    def doublon(self, position1:int, position2:int, distance:int, similarite:float, votes:int, votants:int, orientation:bool):
+        """
+        Doublon entre deux images de image_phash.
+
+        Returns:
+            dict: photo1 et photo2 (nom, type, taille, ID, chemin), distance, similarite,
+                  votes (votes, votants) et orientation
+        """
+        name1, type1, size1, id1, _, path1 = self.image_phash[position1]
+        name2, type2, size2, id2, _, path2 = self.image_phash[position2]
+
+        return {
+            'photo1': (name1, type1, size1, id1, path1),
+            'photo2': (name2, type2, size2, id2, path2),
+            'distance': distance,
+            'similarite': similarite,
+            'votes': (votes, votants),
+            'orientation': orientation
+        }
+
+    def recherche_graphe(self):
+        """
+        Doublons au seuil demandé, servis par le graphe des distances de la version du catalogue.
+
+        Si le graphe n'existe pas pour cette version ou s'il a été calculé à
+        un seuil plus petit, il est construit et les doublons sont émis au fil
+        de sa construction (voir construire_graphe). Sinon, ses arêtes sont
+        lues par lots, les paires les plus proches en premier.
+
+        Yields:
+            dict: Doublons trouvés (voir doublon)
+        """
+        if not graphe_distances.couvre(self.version, self.seuil):
+            yield from self.construire_graphe()
+            return
+
+        # Une arête désigne chaque groupe par l'ID de l'une de ses images
+        groupe_de = {self.image_phash[position][3]: numero for numero, groupe in enumerate(self.groupes) for position in groupe}
+
+        yield from self.doublons_identiques()
+
+        lots = graphe_distances.requete(self.version, self.seuil)
+
+        try:
+            for aretes in lots:
+                for id1, id2, distance, similarite, votes, votants, orientation in zip(
+                        aretes['ids1'], aretes['ids2'], aretes['distance'], aretes['similarite'],
+                        aretes['votes'], aretes['votants'], aretes['orientation']):
+                    i, j = sorted((groupe_de[id1], groupe_de[id2]))
+                    yield from self.developper(i, j, int(distance), float(similarite), int(votes), int(votants), bool(orientation))
+
+                if not self.actif():
+                    break
+
+        finally:
+            lots.close()
+
+    def construire_graphe(self):
+        """
+        Calcule et enregistre le graphe des distances de la version du catalogue, en émettant les doublons.
+
+        Toutes les paires de représentants similaires au seuil du graphe
+        (au moins SEUIL_GRAPHE) sont comparées une fois, par les index ou la
+        force brute selon le plan. Chaque lot est écrit dans le graphe avec
+        l'histogramme des paires de fichiers par seuil minimal, puis ses
+        arêtes retenues au seuil demandé (seuil minimal au plus seuil, vote
+        refait comme pour une requête) sont développées en doublons.
+
+        Un arrêt abandonne le graphe. Une fois que l'interface n'affiche plus
+        de doublons (voir assez), la construction se poursuit sans rien émettre.
+
+        Yields:
+            dict: Doublons trouvés (voir doublon)
+        """
+        seuil_graphe = max(self.seuil, SEUIL_GRAPHE)
+        empreintes = self.empreintes.au_seuil(seuil_graphe)
+        parametres = empreintes.parametres()
+        debut = time.perf_counter()
+        lots, total = self.lots(self.plan_recherche(empreintes))
+        representants = [self.image_phash[groupe[0]][3] for groupe in self.groupes]
+        tailles = numpy.array([len(groupe) for groupe in self.groupes], dtype = numpy.int64)
+        construction = graphe_distances.construction(self.version, seuil_graphe, parametres)
+        comparaisons = pool_comparaison.comparer(empreintes, lots, graphe = True)
+        termine = False
+
+        try:
+            # Paires des groupes d'empreintes identiques : aucune arête, retenues dès le seuil 0
+            identiques = numpy.zeros(seuil_graphe + 1, dtype = numpy.int64)
+            identiques[0] = int((tailles * (tailles - 1) // 2).sum())
+            construction.ajouter([], [], None, identiques)
+
+            yield from self.doublons_identiques()
+
+            for faits, ((ii, jj, seuil_min, distance, similarite, distance_invariant, similarite_invariant, votants), _) in enumerate(comparaisons, 1):
+                # Paires de fichiers par seuil minimal : chaque arête vaut pour toutes les images des deux groupes
+                histogramme = numpy.bincount(seuil_min, weights = tailles[ii] * tailles[jj], minlength = seuil_graphe + 1)
+                construction.ajouter([representants[i] for i in ii], [representants[j] for j in jj],
+                                     (seuil_min, distance, similarite, distance_invariant, similarite_invariant, votants), histogramme)
+
+                retenues = seuil_min <= self.seuil
+
+                if not self._assez.is_set() and retenues.any():
+                    aretes = revoter(self.seuil, parametres, distance[retenues], similarite[retenues], distance_invariant[retenues],
+                                     similarite_invariant[retenues], [votants[algo][retenues] for algo in VOTANTS])
+
+                    for i, j, distance_paire, similarite_paire, votes, votants_paire, orientation in zip(
+                            ii[retenues], jj[retenues], aretes['distance'], aretes['similarite'],
+                            aretes['votes'], aretes['votants'], aretes['orientation']):
+                        yield from self.developper(int(i), int(j), int(distance_paire), float(similarite_paire),
+                                                   int(votes), int(votants_paire), bool(orientation))
+
+                self.avancement.emit(faits, total)
+
+                # Pause entre deux lots : la construction ne tient ni verrou ni transaction en attendant le suivant
+                self._pause_event.wait()
+
+                if self._stop_event.is_set():
+                    break
+
+            else:
+                construction.terminer()
+                termine = True
+                logger.info(f"Graphe des distances construit au seuil {seuil_graphe} en {time.perf_counter() - debut:.3f} s")
+
+        finally:
+            comparaisons.close()
+
+            # Arrêt, erreur ou générateur fermé : aucune version partielle n'est conservée
+            if not termine:
+                construction.abandonner()
+
+    def comparaison(self):
+        """
+        Mode Comparaison : exécute la force brute, la cascade et, si le plan en a, les index, et mesure l'écart.
+
+        La requête sur le graphe des distances est mesurée aussi s'il en
+        existe un pour ce catalogue et ce seuil (il n'est pas construit ici).
+        Le rappel est la part des doublons de la force brute que chaque autre
+        recherche retrouve. Il est mesuré sur un échantillon d'au plus
+        ECHANTILLON_RAPPEL paires de la force brute, celles dont le CRC32 est
+        le plus petit : l'échantillon est uniforme, reproductible d'une
+        exécution à l'autre et sa taille ne dépend pas du nombre de doublons.
+        Le rapport est journalisé et émis par le signal rapport, sauf si la
+        recherche est arrêtée.
+
+        Yields:
+            dict: Doublons de la force brute (référence), DOUBLONS_COMPARAISON au plus
+        """
+        recherches = [("Force brute (256 bits)", False, False), ("Cascade (64 puis 256 bits)", True, False)]
+
+        if self.plan['index']:
+            recherches += [("Index", False, True), ("Index et cascade", True, True)]
+
+        reference = set() # Paires (ID, ID) de l'échantillon de la force brute
+        exhaustifs = [] # Premiers doublons de la force brute, pour l'affichage
+        resultats = []
+
+        for nom, cascade, index in recherches:
+            debut = time.perf_counter()
+            nombre, retrouves = self.mesurer(self.recherche(cascade = cascade, index = index), reference, None if resultats else exhaustifs)
+            resultats.append((nom, nombre, retrouves, self.comparees, time.perf_counter() - debut))
+
+        if graphe_distances.couvre(self.version, self.seuil):
+            debut = time.perf_counter()
+            nombre, retrouves = self.mesurer(self.recherche_graphe(), reference)
+            resultats.append(("Graphe des distances (requête)", nombre, retrouves, 0, time.perf_counter() - debut))
+
+        _, exhaustif, _, paires, duree_exhaustif = resultats[0]
+
+        if self._stop_event.is_set():
+            return
+
+        texte = "Comparaison des recherches\n"
+        texte += f"Plan : {self.plan['texte']}\n"
+        texte += f"Paires d'empreintes distinctes : {paires}\n"
+
+        for nom, nombre, retrouves, completes, duree in resultats:
+            rappel = retrouves / len(reference) if reference else 1.0
+
+            texte += f"{nom} : {nombre} doublons en {duree:.3f} s, {completes} paires comparées, "
+            texte += f"rappel {rappel * 100:.2f}%, accélération x{duree_exhaustif / duree if duree else 0:.1f}\n"
+
+        if exhaustif > len(reference):
+            texte += f"Rappel mesuré sur un échantillon de {len(reference)} paires sur {exhaustif}\n"
+
+        if exhaustif > len(exhaustifs):
+            texte += f"Doublons affichés : {len(exhaustifs)} sur {exhaustif}\n"
+
+        texte = texte.rstrip("\n")
+        logger.info(texte.replace("\n", " | "))
+        self.rapport.emit(texte)
+
+        yield from exhaustifs
+
+    def mesurer(self, doublons, reference:set, gardes:list = None):
+        """
+        Compte les doublons d'une recherche du mode Comparaison sans les garder.
+
+        Args:
+            doublons (iterable): Doublons de la recherche (voir doublon)
+            reference (set): Échantillon de paires (ID, ID) de la force brute ; rempli par la recherche de référence
+            gardes (list): Pour la recherche de référence, reçoit ses DOUBLONS_COMPARAISON premiers doublons
+
+        Returns:
+            tuple: (nombre de doublons, nombre de paires de l'échantillon retrouvées)
+        """
+        nombre = retrouves = 0
+        tas = [] # (-CRC32, paire) : les ECHANTILLON_RAPPEL plus petits CRC32, le plus grand en tête
+
+        for doublon in doublons:
+            paire = (doublon['photo1'][3], doublon['photo2'][3])
+            nombre += 1
+
+            if gardes is None:
+                retrouves += paire in reference
+                continue
+
+            cle = zlib.crc32(f"{paire[0]}|{paire[1]}".encode())
+
+            if len(tas) < ECHANTILLON_RAPPEL:
+                heapq.heappush(tas, (-cle, paire))
+            elif cle < -tas[0][0]:
+                heapq.heapreplace(tas, (-cle, paire))
+
+            if len(gardes) < DOUBLONS_COMPARAISON:
+                gardes.append(doublon)
+
+        if gardes is not None:
+            reference.update(paire for _, paire in tas)
+            retrouves = len(reference)
+
+        return nombre, retrouves
+
+class ThreadVideo(QObject):
+    """
+    Thread worker pour la détection de vidéos quasi identiques.
+
+    L'empreinte d'une vidéo réunit sa facette video (durée, dimensions,
+    débit) et les hash de sa miniature. Les candidats sont d'abord groupés
+    par format (rapport largeur/hauteur, insensible à l'orientation) à
+    TOLERANCE_FORMAT près, pour qu'un recadrage de quelques pixels (1920x1080
+    et 1920x1088) ne sépare pas deux copies, puis, dans chaque groupe triés
+    par durée, seules les vidéos de durées proches (TOLERANCE_DUREE,
+    MARGE_DUREE) sont comparées : une vidéo réencodée ou légèrement coupée
+    reste candidate, sans comparer toute la bibliothèque deux à deux.
+
+    Une paire candidate est un doublon si le phash de ses miniatures est sous
+    le seuil ; sans miniature hachée, il faut des dimensions identiques, des
+    durées à moins d'une seconde et des débits à 10 % près.
+
+    Signaux:
+        progression (str, tuple, tuple): Émet les détails d'un doublon vidéo trouvé
+        finished (): Signal émis à la fin de la recherche
+
+    Attributes:
+        seuil (int): Distance maximale entre les phash des miniatures
+    """
+    progression = pyqtSignal(str, tuple, tuple)
+    finished = pyqtSignal()
+
+    def __init__(self, seuil):
+        """
+        Args:
+            seuil (int): Distance maximale entre les phash des miniatures
+        """
+        super().__init__()
+        self.seuil = seuil
+        logger.debug(f"ThreadVideo initialisé avec seuil: {seuil}")
+
+    def recherche(self):
+        """
+        Lance la recherche de doublons vidéo et émet chaque doublon dès qu'il est trouvé.
+        """
+        logger.info(f"Début de la recherche de doublons vidéo avec seuil: {self.seuil}")
+        self.connexion = sqlite3.connect("picture_video.db")
+        self.curseur = self.connexion.cursor()
+
+        videos = recup_videos(self.curseur)
+        self.phashes = {
+            id: hash_depuis_hex("phash", *hashes["phash"])
+            for id, hashes in recup_hashes(self.curseur).items() if "phash" in hashes
+        }
+
+        # Blocage par format, puis par durée dans chaque format
+        blocs = self.blocs(videos)
+        trouves = 0
+        comparaisons = 0
+
+        for bloc in blocs:
+            for video1, video2 in self.candidats(bloc):
+                comparaisons += 1
+                doublon = self.comparer(video1, video2)
+
+                if doublon:
+                    trouves += 1
+                    logger.info(f"Doublon vidéo trouvé : {video1[0]} avec {video2[0]}")
+                    self.emettre(doublon)
+
+        paires = len(videos) * (len(videos) - 1) // 2
+        logger.info(f"{len(videos)} vidéos, {len(blocs)} formats : {comparaisons} paires comparées sur {paires}")
+
+        if trouves:
+            logger.info(f"Total de {trouves} doublons vidéo trouvés")
+
+        else:
+            logger.warning("Aucun doublon vidéo trouvé")
+            texte = "Aucun doublon vidéo n'a été trouvé !\n"
+            texte += "Les miniatures des vidéos sont hachées lorsque la prévisualisation est activée.\n"
+            self.progression.emit(texte, (None, None), (None, None))
+
+        # Nettoyage
+        if self.connexion:
+            self.connexion.close()
+
+        logger.info("ThreadVideo terminé")
+        self.finished.emit()
+
+    def emettre(self, doublon):
+        """
+        Émet un doublon vidéo vers l'interface avec sa facette vidéo.
+
+        Args:
+            doublon (dict): Doublon trouvé (voir comparer)
+        """
+        video1 = doublon["video1"]
+        video2 = doublon["video2"]
+        nom1, nom2 = video1[0], video2[0]
+        id1, id2 = video1[3], video2[3]
+        distance = "-" if doublon['distance'] is None else doublon['distance']
+
+        # Génération du texte descriptif avec la facette vidéo
+        texte = ""
+        texte += f"{verification_len(nom1)} ↔ {verification_len(nom2)}\n"
+        texte += f"Distance miniatures: {distance} | Durées: {duree_texte(video1[5])} - {duree_texte(video2[5])}\n"
+        texte += f"Dimensions: {video1[6]}x{video1[7]} - {video2[6]}x{video2[7]} | Débits: {video1[8]} - {video2[8]}\n"
+        texte += f"Types: {video1[1]} - {video2[1]} | Tailles: {video1[2]} - {video2[2]}\n"
+        texte += f"IDs: {id1} - {id2}\n"
+        texte += f"Chemins: {verification_len(f"{video1[4]}/{nom1}")} - {verification_len(f"{video2[4]}/{nom2}")}\n"
+
+        chemins = (f"{video1[4]}/{nom1}", f"{video2[4]}/{nom2}")
+        self.progression.emit(texte, (id1, id2), chemins)
+
+    @staticmethod
+    def format(video):
+        """
+        Format d'une vidéo : rapport grand côté / petit côté, None si inconnu.
+        """
+        width, height = video[6], video[7]
+
+        if not width or not height:
+            return None
+
+        return max(width, height) / min(width, height)
+
+    @staticmethod
+    def formats_proches(format1, format2):
+        """
+        Indique si deux formats connus sont égaux à TOLERANCE_FORMAT près.
+        """
+        return abs(format1 - format2) <= TOLERANCE_FORMAT * max(format1, format2)
+
+    @classmethod
+    def blocs(cls, videos):
+        """
+        Groupe les vidéos par format à TOLERANCE_FORMAT près.
+
+        Les vidéos sont triées par format et un nouveau bloc commence dès que
+        deux voisines s'écartent de plus de la tolérance : deux formats
+        proches sont toujours dans le même bloc, même de part et d'autre d'un
+        arrondi. Les vidéos de format inconnu forment leur propre bloc.
+
+        Args:
+            videos (list): Vidéos (lignes de recup_videos)
+
+        Returns:
+            list: Blocs de vidéos (listes)
+        """
+        connues = sorted((video for video in videos if cls.format(video)), key = cls.format)
+        inconnues = [video for video in videos if not cls.format(video)]
+        blocs = []
+
+        for video in connues:
+            if blocs and cls.formats_proches(cls.format(blocs[-1][-1]), cls.format(video)):
+                blocs[-1].append(video)
+
+            else:
+                blocs.append([video])
+
+        if inconnues:
+            blocs.append(inconnues)
+
+        return blocs
+
+    @classmethod
+    def candidats(cls, bloc):
+        """
+        Paires d'un même bloc de formats dont les formats et les durées sont compatibles.
+
+        Un bloc pouvant enchaîner des formats de proche en proche, les paires
+        dont les formats s'écartent de plus de TOLERANCE_FORMAT sont écartées.
+        Les vidéos de durée inconnue sont comparées entre elles uniquement.
+
+        Args:
+            bloc (list): Vidéos d'un même bloc (voir blocs)
+
+        Yields:
+            tuple: (video1, video2)
+        """
+        connues = sorted((video for video in bloc if video[5]), key = lambda video: video[5])
+        inconnues = [video for video in bloc if not video[5]]
+
+        # Fenêtre glissante sur les durées triées
+        for i, video1 in enumerate(connues):
+            limite = video1[5] * (1 + TOLERANCE_DUREE) + MARGE_DUREE
+
+            for video2 in connues[i + 1:]:
+                if video2[5] > limite:
+                    break
+
+                if cls.compatibles(video1, video2):
+                    yield video1, video2
+
+        for video1, video2 in combinations(inconnues, 2):
+            if cls.compatibles(video1, video2):
+                yield video1, video2
+
+    @classmethod
+    def compatibles(cls, video1, video2):
+        """
+        Indique si deux vidéos d'un même bloc ont des formats compatibles (ou tous deux inconnus).
+        """
+        format1, format2 = cls.format(video1), cls.format(video2)
+
+        if format1 is None or format2 is None:
+            return format1 is format2
+
+        return cls.formats_proches(format1, format2)
+
+    def comparer(self, video1, video2):
+        """
+        Compare deux vidéos candidates.
+
+        Returns:
+            dict: Doublon trouvé, None si les vidéos diffèrent
+        """
+        hash1 = self.phashes.get(video1[3])
+        hash2 = self.phashes.get(video2[3])
+        distance = None
+
+        if hash1 is not None and hash2 is not None:
+            distance = hash1 - hash2
+
+            if distance > self.seuil:
+                return None
+
+        # Sans miniature hachée, seule une facette quasi identique est retenue
+        elif (video1[6], video1[7]) != (video2[6], video2[7]) or abs((video1[5] or 0) - (video2[5] or 0)) > 1000:
+            return None
+
+        elif video1[8] and video2[8] and abs(video1[8] - video2[8]) > 0.1 * max(video1[8], video2[8]):
+            return None
+
+        return {
+            'video1': video1,
+            'video2': video2,
+            'distance': distance
+        }
+
+def duree_texte(duree):
+    """
+    Durée en millisecondes affichée en minutes:secondes ("?" si inconnue).
+    """
+    if not duree:
+        return "?"
+
+    secondes = duree // 1000
+
+    return f"{secondes // 60}:{secondes % 60:02d}"
+
 class ThreadUseless(QObject):
     progression = pyqtSignal(str, tuple, tuple)    
     finished = pyqtSignal()
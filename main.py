@@ -25,6 +25,7 @@ from PyQt5.QtGui import QIcon, QKeySequence
 # Système et utilitaires
 import sys
 import os
+import multiprocessing
 from io import StringIO
 import traceback
 
@@ -47,6 +48,8 @@ from fonctions.token_manager import *
 from fonctions.server import *
 from fonctions.sql import *
 from fonctions.threads import *
+from fonctions.hachage import pool_hachage
+from fonctions.comparaison import pool_comparaison
 from fonctions.doublons import *
 from fonctions.compte_photos import *
 
@@ -502,6 +505,9 @@ if __name__ == "__main__":
     - Configuration de la fenêtre (titre, mode maximisé)
     - Entrée dans la boucle d'événements Qt jusqu'à fermeture
     """
+    # Processus du pool de hachage : indispensable dans l'exécutable PyInstaller
+    multiprocessing.freeze_support()
+
     # Configuration du système de logging
     logger = connecteLogger(__name__)
 
@@ -518,4 +524,8 @@ if __name__ == "__main__":
     window.showFullScreen()
 
     logger.info("Entrée dans la boucle principale de l'application")
-    sys.exit(app.exec_())
\ No newline at end of file
+    code = app.exec_()
+
+    pool_hachage.arreter()
+    pool_comparaison.arreter()
+    sys.exit(code)
\ No newline at end of file